@@ -12,6 +12,7 @@ from airport.models import (
     Route,
     Crew,
     Flight,
+    Job,
     Order
 )
 
@@ -174,3 +175,10 @@ class AdminRoute(admin.ModelAdmin):
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related("source", "destination")
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_after", "created_at")
+    list_filter = ("status", "name")
+    ordering = ("-created_at",)
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class AirportConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "airport"
+
+    def ready(self):
+        import airport.signals  # noqa: F401
+        from airport_api.db_router import check_shared_cache
+
+        checks.register(check_shared_cache)
@@ -0,0 +1,103 @@
+import functools
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from airport.caching import not_modified, set_etag
+from airport.models import Flight
+from airport.pagination import FlightCursorPagination
+from airport.serializers import FlightListSerializer, FlightRetrieveSerializer, RouteListSerializer
+from airport.views import FlightViewSet, RouteViewSet
+
+# Read-only flight and route search for ASGI servers. The responses are the
+# same as the ones of FlightViewSet and RouteViewSet, but the database waits
+# do not hold a worker thread.
+
+
+def json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=status_code,
+        content_type="application/json",
+        headers=headers,
+    )
+
+
+async def authenticate(request):
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        raise NotAuthenticated()
+
+    validated_token = authentication.get_validated_token(raw_token)
+    try:
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise AuthenticationFailed("Token contained no recognizable user identification")
+    user = await get_user_model().objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+    if user is None or not user.is_active:
+        raise AuthenticationFailed("User not found")
+    return user
+
+
+def async_read_view(view):
+    # GET only, for authenticated users, as IsAdminOrIsAuthenticatedReadOnly
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return json_response(
+                {"detail": f'Method "{request.method}" not allowed.'},
+                status.HTTP_405_METHOD_NOT_ALLOWED,
+                {"Allow": "GET"},
+            )
+        try:
+            request.user = await authenticate(request)
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            headers = None
+            if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                headers = {"WWW-Authenticate": 'Bearer realm="api"'}
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            return json_response(data, exc.status_code, headers)
+
+    return wrapper
+
+
+@async_read_view
+async def flight_list(request):
+    queryset = FlightViewSet.filter_flights(FlightViewSet.queryset, request.GET).select_related("inventory")
+    paginator = FlightCursorPagination()
+    flights = await paginator.apaginate_queryset(queryset, Request(request))
+    serializer = FlightListSerializer(flights, many=True, context={"request": request})
+    return json_response(paginator.get_paginated_response(serializer.data).data)
+
+
+@async_read_view
+async def flight_detail(request, pk):
+    version = await FlightViewSet.version_query(pk, request.GET).afirst()
+    etag = FlightViewSet.get_etag(pk, version, JSONRenderer.format) if version is not None else None
+    if etag is not None and not_modified(request, etag):
+        return set_etag(HttpResponse(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+    queryset = FlightViewSet.filter_flights(FlightViewSet.queryset, request.GET).prefetch_related("crew")
+    try:
+        flight = await queryset.aget(pk=pk)
+    except Flight.DoesNotExist:
+        raise NotFound("No Flight matches the given query.")
+
+    response = json_response(FlightRetrieveSerializer(flight, context={"request": request}).data)
+    return set_etag(response, etag) if etag is not None else response
+
+
+@async_read_view
+async def route_list(request):
+    queryset = RouteViewSet.filter_routes(RouteViewSet.queryset, request.GET)
+    routes = [route async for route in queryset.aiterator(chunk_size=500)]
+    return json_response(RouteListSerializer(routes, many=True, context={"request": request}).data)
@@ -0,0 +1,100 @@
+import io
+import json
+
+from django.db import models, transaction
+
+
+def copy_text(value):
+    # a value of PostgreSQL's COPY text format
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        value = "t" if value else "f"
+    elif isinstance(value, (bytes, memoryview)):
+        value = "\\x" + bytes(value).hex()
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def prepare_value(field, value, connection):
+    # COPY gets JSON as text, get_db_prep_save would wrap it in an adapter of the driver
+    if isinstance(field, models.JSONField) and connection.vendor == "postgresql":
+        return json.dumps(value, cls=field.encoder)
+    return field.get_db_prep_save(value, connection)
+
+
+def insert_rows(connection, table, columns, rows, on_conflict=""):
+    """
+    Inserts rows of database values with COPY on PostgreSQL and a multi-row
+    INSERT elsewhere, without any model code. ``on_conflict`` is an
+    ``ON CONFLICT ...`` clause for the rows that may already exist.
+    """
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    table = quote(table)
+    columns = ", ".join(quote(column) for column in columns)
+
+    with connection.cursor() as cursor:
+        if connection.vendor != "postgresql":
+            placeholders = ", ".join(["%s"] * len(rows[0]))
+            cursor.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) {on_conflict}", rows)
+            return
+
+        # COPY cannot resolve conflicts, the rows that may exist go through a temporary table
+        copy_table = "bulk_rows" if on_conflict else table
+        if on_conflict:
+            cursor.execute(f"CREATE TEMPORARY TABLE bulk_rows (LIKE {table} INCLUDING DEFAULTS)")
+        data = io.StringIO("".join("\t".join(map(copy_text, row)) + "\n" for row in rows))
+        copy_sql = f"COPY {copy_table} ({columns}) FROM STDIN"
+        if hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(copy_sql, data)
+        else:
+            with cursor.copy(copy_sql) as copy:
+                copy.write(data.getvalue())
+        if on_conflict:
+            cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM bulk_rows {on_conflict}")
+            cursor.execute("DROP TABLE bulk_rows")
+
+
+class BulkWriter:
+    """
+    Buffers new rows by model and inserts them with ``insert_rows``. Rows are
+    keyword values by attname, the fields left out get their defaults. Every
+    flush writes all the buffered models in one transaction, so a parent is
+    never committed after its children.
+    """
+
+    def __init__(self, connection, batch_size=10000):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.pending = {}
+        self.plans = {}
+        self.written = {}
+
+    def add(self, model, **values):
+        plan = self.plans.get(model)
+        if plan is None:
+            plan = self.plans[model] = [
+                (field.attname, field.column, prepare_value(field, field.get_default(), self.connection))
+                for field in model._meta.local_concrete_fields
+                # an auto primary key left out is given by the database
+                if not (field.primary_key and field.attname not in values)
+            ]
+            self.pending[model] = []
+            self.written[model] = 0
+
+        rows = self.pending[model]
+        rows.append(tuple([values.get(attname, default) for attname, _, default in plan]))
+        if len(rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with transaction.atomic(using=self.connection.alias):
+            for model, rows in self.pending.items():
+                insert_rows(
+                    self.connection, model._meta.db_table, [column for _, column, _ in self.plans[model]], rows
+                )
+                self.written[model] += len(rows)
+                rows.clear()
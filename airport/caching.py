@@ -0,0 +1,61 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from airport.models import CatalogVersion
+from airport_api.metrics import CACHE_REQUESTS
+
+
+def not_modified(request, etag) -> bool:
+    return etag in parse_etags(request.headers.get("If-None-Match", ""))
+
+
+def set_etag(response, etag):
+    # the responses depend on the user being authenticated, so only the client may keep them
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class CatalogCacheMixin:
+    """
+    Caches the list of a catalog viewset under the catalog version, so any
+    write to the catalog model makes the cached lists unreachable. The key
+    also holds the filter params of ``cache_query_params`` and the host
+    (the image urls are absolute). Every list carries a strong ETag and
+    ``If-None-Match`` is answered with 304 without touching the cache.
+    """
+
+    cache_query_params = ()
+    cache_timeout = 60 * 60 * 24
+
+    def get_cache_key(self, request, version) -> str:
+        # empty params are ignored by the filters as well
+        params = sorted(
+            (name, request.query_params[name])
+            for name in self.cache_query_params
+            if request.query_params.get(name)
+        )
+        key = f"{request.scheme}://{request.get_host()}|{self.basename}|{version}|{urlencode(params)}"
+        return "catalog:" + hashlib.sha256(key.encode()).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        version = CatalogVersion.current(self.queryset.model)
+        cache_key = self.get_cache_key(request, version)
+        # one representation per renderer, the cached data is shared
+        etag = f'"{cache_key[-32:]}-{request.accepted_renderer.format}"'
+
+        if not_modified(request, etag):
+            return set_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+        data = cache.get(cache_key)
+        CACHE_REQUESTS.inc(cache="catalog", result="miss" if data is None else "hit")
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, data, self.cache_timeout)
+        return set_etag(Response(data), etag)
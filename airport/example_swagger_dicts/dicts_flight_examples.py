@@ -130,11 +130,32 @@ dict_retrieve_example = {
     "price_economy": 350,
     "price_business": 700,
     "rows_economy_from": 11,
-    "luggage_price_1_kg": "5.50",
-    "all_free_places": [
-        "Economy: [{'row': 12, 'letter': 'B'}, {'row': 12, 'letter': 'D'}, {'row': 12, 'letter': 'E'}, {'row': 13, 'letter': 'A'}, {'row': 13, 'letter': 'B'}, {'row': 13, 'letter': 'D'}, {'row': 13, 'letter': 'E'}, {'row': 13, 'letter': 'F'}, {'row': 14, 'letter': 'A'}, {'row': 14, 'letter': 'B'}, {'row': 14, 'letter': 'C'}, {'row': 14, 'letter': 'D'}, {'row': 14, 'letter': 'E'}, {'row': 14, 'letter': 'F'}, {'row': 15, 'letter': 'B'}, {'row': 15, 'letter': 'D'}, {'row': 15, 'letter': 'E'}, {'row': 15, 'letter': 'F'}, {'row': 16, 'letter': 'A'}, {'row': 16, 'letter': 'B'}, {'row': 16, 'letter': 'C'}, {'row': 16, 'letter': 'D'}, {'row': 16, 'letter': 'E'}, {'row': 16, 'letter': 'F'}, {'row': 17, 'letter': 'B'}, {'row': 17, 'letter': 'C'}, {'row': 17, 'letter': 'D'}, {'row': 17, 'letter': 'E'}, {'row': 17, 'letter': 'F'}, {'row': 18, 'letter': 'A'}, {'row': 18, 'letter': 'B'}, {'row': 18, 'letter': 'C'}, {'row': 18, 'letter': 'E'}, {'row': 18, 'letter': 'F'}, {'row': 19, 'letter': 'A'}, {'row': 19, 'letter': 'B'}, {'row': 19, 'letter': 'C'}, {'row': 19, 'letter': 'D'}, {'row': 19, 'letter': 'E'}, {'row': 19, 'letter': 'F'}, {'row': 20, 'letter': 'A'}, {'row': 20, 'letter': 'B'}, {'row': 20, 'letter': 'C'}, {'row': 20, 'letter': 'D'}, {'row': 20, 'letter': 'E'}, {'row': 20, 'letter': 'F'}, {'row': 21, 'letter': 'A'}, {'row': 21, 'letter': 'B'}, {'row': 21, 'letter': 'C'}, {'row': 21, 'letter': 'D'}, {'row': 21, 'letter': 'E'}, {'row': 21, 'letter': 'F'}, {'row': 22, 'letter': 'A'}, {'row': 22, 'letter': 'B'}, {'row': 22, 'letter': 'C'}, {'row': 22, 'letter': 'D'}, {'row': 22, 'letter': 'E'}, {'row': 22, 'letter': 'F'}, {'row': 23, 'letter': 'A'}, {'row': 23, 'letter': 'B'}, {'row': 23, 'letter': 'C'}, {'row': 23, 'letter': 'D'}, {'row': 23, 'letter': 'E'}, {'row': 23, 'letter': 'F'}, {'row': 24, 'letter': 'A'}, {'row': 24, 'letter': 'B'}, {'row': 24, 'letter': 'C'}, {'row': 24, 'letter': 'D'}, {'row': 24, 'letter': 'E'}, {'row': 24, 'letter': 'F'}, {'row': 25, 'letter': 'A'}, {'row': 25, 'letter': 'B'}, {'row': 25, 'letter': 'C'}, {'row': 25, 'letter': 'D'}, {'row': 25, 'letter': 'E'}, {'row': 26, 'letter': 'A'}, {'row': 26, 'letter': 'B'}, {'row': 26, 'letter': 'C'}, {'row': 26, 'letter': 'D'}, {'row': 26, 'letter': 'E'}, {'row': 26, 'letter': 'F'}, {'row': 27, 'letter': 'A'}, {'row': 27, 'letter': 'B'}, {'row': 27, 'letter': 'C'}, {'row': 27, 'letter': 'D'}, {'row': 27, 'letter': 'E'}, {'row': 27, 'letter': 'F'}, {'row': 28, 'letter': 'A'}, {'row': 28, 'letter': 'B'}, {'row': 28, 'letter': 'C'}, {'row': 28, 'letter': 'D'}, {'row': 28, 'letter': 'E'}, {'row': 28, 'letter': 'F'}, {'row': 29, 'letter': 'A'}, {'row': 29, 'letter': 'B'}, {'row': 29, 'letter': 'C'}, {'row': 29, 'letter': 'D'}, {'row': 29, 'letter': 'E'}, {'row': 29, 'letter': 'F'}, {'row': 30, 'letter': 'A'}, {'row': 30, 'letter': 'B'}, {'row': 30, 'letter': 'C'}, {'row': 30, 'letter': 'D'}, {'row': 30, 'letter': 'E'}, {'row': 30, 'letter': 'F'}]",
-        "Business: [{'row': 1, 'letter': 'A'}, {'row': 1, 'letter': 'B'}, {'row': 1, 'letter': 'C'}, {'row': 1, 'letter': 'D'}, {'row': 1, 'letter': 'E'}, {'row': 2, 'letter': 'A'}, {'row': 2, 'letter': 'B'}, {'row': 2, 'letter': 'C'}, {'row': 2, 'letter': 'E'}, {'row': 3, 'letter': 'A'}, {'row': 3, 'letter': 'B'}, {'row': 3, 'letter': 'C'}, {'row': 3, 'letter': 'D'}, {'row': 3, 'letter': 'E'}, {'row': 4, 'letter': 'A'}, {'row': 4, 'letter': 'B'}, {'row': 4, 'letter': 'C'}, {'row': 4, 'letter': 'D'}, {'row': 4, 'letter': 'E'}, {'row': 5, 'letter': 'A'}, {'row': 5, 'letter': 'C'}, {'row': 5, 'letter': 'D'}, {'row': 5, 'letter': 'E'}, {'row': 6, 'letter': 'A'}, {'row': 6, 'letter': 'B'}, {'row': 6, 'letter': 'D'}, {'row': 6, 'letter': 'E'}, {'row': 7, 'letter': 'A'}, {'row': 7, 'letter': 'B'}, {'row': 7, 'letter': 'C'}, {'row': 7, 'letter': 'D'}, {'row': 7, 'letter': 'F'}, {'row': 8, 'letter': 'A'}, {'row': 8, 'letter': 'B'}, {'row': 8, 'letter': 'D'}, {'row': 8, 'letter': 'E'}, {'row': 8, 'letter': 'F'}, {'row': 9, 'letter': 'A'}, {'row': 9, 'letter': 'B'}, {'row': 9, 'letter': 'D'}, {'row': 9, 'letter': 'E'}, {'row': 9, 'letter': 'F'}, {'row': 10, 'letter': 'A'}, {'row': 10, 'letter': 'B'}, {'row': 10, 'letter': 'D'}, {'row': 10, 'letter': 'E'}, {'row': 10, 'letter': 'F'}, {'row': 11, 'letter': 'A'}, {'row': 11, 'letter': 'B'}, {'row': 11, 'letter': 'C'}, {'row': 11, 'letter': 'D'}, {'row': 11, 'letter': 'E'}, {'row': 11, 'letter': 'F'}]"
-    ]
+    "luggage_price_1_kg": "5.50"
+}
+
+dict_seat_map_example = {
+    "id": 1,
+    "layout": {
+        "rows": 30,
+        "letters": "ABCDEF",
+        "aisles": [3]
+    },
+    "cabins": {
+        "business": {"first_row": 1, "last_row": 11, "free": 61},
+        "economy": {"first_row": 12, "last_row": 30, "free": 112}
+    },
+    "occupancy": {
+        "encoding": "rle",
+        "rows": [
+            [1, [5, 1]],
+            [1, [3, 1, 1, 1]],
+            [2, [5, 1]],
+            [1, [1, 1, 4]],
+            [7, [6]],
+            [1, [0, 1, 1, 1, 3]],
+            [17, [6]]
+        ]
+    }
 }
 
 dict_flight_update_empty_example = {
@@ -0,0 +1,91 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from airport.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for another request."
+    default_code = "idempotency_key_reused"
+
+
+def fingerprint(request) -> str:
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def replay(record) -> Response:
+    return Response(record.response, status=record.status_code, headers={REPLAYED_HEADER: "true"})
+
+
+def idempotent(view_method):
+    """
+    Runs a view method (e.g. ``create``) at most once per ``Idempotency-Key``
+    header of the user. The key is inserted before the view runs, in the
+    same transaction, so a concurrent retry waits for it on the unique index
+    and then replays its answer. Only successful answers are kept: when the
+    view raises (invalid data, seat conflict) the key is rolled back with
+    the rest and the request can be retried.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        if not 0 < len(key) <= IdempotencyKey._meta.get_field("key").max_length:
+            raise ValidationError({HEADER: "Must have 1 to 255 characters."})
+
+        digest = fingerprint(request)
+        now = timezone.now()
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record is not None and record.expires_at > now:
+            if record.fingerprint != digest:
+                raise IdempotencyKeyReused()
+            return replay(record)
+
+        with transaction.atomic():
+            if record is not None:
+                record.delete()
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user,
+                        key=key,
+                        fingerprint=digest,
+                        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_SECONDS),
+                    )
+            except IntegrityError:
+                record = None
+
+            if record is not None:
+                response = view_method(self, request, *args, **kwargs)
+                if status.is_success(response.status_code):
+                    record.status_code = response.status_code
+                    record.response = response.data
+                    record.save(update_fields=["status_code", "response"])
+                else:
+                    transaction.set_rollback(True)
+                return response
+
+        # a concurrent request with the key has committed first
+        record = IdempotencyKey.objects.get(user=request.user, key=key)
+        if record.fingerprint != digest:
+            raise IdempotencyKeyReused()
+        return replay(record)
+
+    return wrapper
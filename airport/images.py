@@ -0,0 +1,42 @@
+import os.path
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+VARIANT_WIDTHS = (160, 480, 1024)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def make_variants(name, storage=default_storage) -> dict:
+    """
+    Saves resized copies of the image ``name`` and returns their names by
+    format and width. An image is never scaled up, a narrow one gets a
+    single copy of its own width.
+    """
+    with storage.open(name) as file:
+        original = ImageOps.exif_transpose(Image.open(file))
+        original.load()
+
+    root, _ = os.path.splitext(name)
+    widths = sorted({min(width, original.width) for width in VARIANT_WIDTHS})
+    variants = {}
+    for extension, (image_format, options) in VARIANT_FORMATS.items():
+        variants[extension] = {}
+        for width in widths:
+            image = original.copy()
+            image.thumbnail((width, original.height))
+            mode = "RGBA" if image_format == "WEBP" and image.has_transparency_data else "RGB"
+            if image.mode != mode:
+                image = image.convert(mode)
+
+            buffer = BytesIO()
+            image.save(buffer, image_format, **options)
+            variants[extension][str(width)] = storage.save(
+                f"{root}-{width}w.{extension}", ContentFile(buffer.getvalue())
+            )
+    return variants
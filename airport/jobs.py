@@ -0,0 +1,132 @@
+import time
+import traceback
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.mail import send_mail
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from airport.images import make_variants
+from airport.models import Job, Order
+
+JOBS = {}
+
+RETRY_DELAY_SECONDS = 30
+MAX_RETRY_DELAY_SECONDS = 60 * 60
+# a RUNNING job this old belongs to a worker that died, it is run again
+STALE_AFTER = timedelta(minutes=15)
+
+
+def job(name):
+    def register(function):
+        JOBS[name] = function
+        return function
+    return register
+
+
+def enqueue(name, run_after=None, **payload) -> Job:
+    # called inside the transaction of the work it follows, the job is only seen once that commits
+    if name not in JOBS:
+        raise ValueError(f"Unknown job: {name}")
+    return Job.objects.create(name=name, payload=payload, run_after=run_after or timezone.now())
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(RETRY_DELAY_SECONDS * 2 ** (attempts - 1), MAX_RETRY_DELAY_SECONDS))
+
+
+def claim_jobs(batch_size: int) -> list[Job]:
+    # the attempt is counted when the job is claimed, so a job killing or hanging its worker is not retried forever
+    now = timezone.now()
+    stale = Q(status="RUNNING", locked_at__lt=now - STALE_AFTER)
+    Job.objects.filter(stale, attempts__gte=F("max_attempts")).update(
+        status="FAILED", locked_at=None, last_error="The worker running the last attempt stopped or timed out"
+    )
+    ready = Job.objects.filter(
+        Q(status="PENDING", run_after__lte=now) | stale
+    ).order_by("run_after", "id")
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            jobs = list(ready.select_for_update(skip_locked=True)[:batch_size])
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status="RUNNING", locked_at=now, attempts=F("attempts") + 1
+            )
+        for job in jobs:
+            job.attempts += 1
+        return jobs
+
+    # no SKIP LOCKED (SQLite), the workers race for every job with a conditional update
+    claimed = []
+    for job in ready[:batch_size]:
+        if Job.objects.filter(pk=job.pk, status=job.status, locked_at=job.locked_at).update(
+            status="RUNNING", locked_at=now, attempts=F("attempts") + 1
+        ):
+            job.attempts += 1
+            claimed.append(job)
+    return claimed
+
+
+def run_job(job: Job):
+    try:
+        JOBS[job.name](**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = "FAILED"
+        else:
+            job.status = "PENDING"
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+    else:
+        job.status = "DONE"
+        job.last_error = ""
+    job.locked_at = None
+    job.save(update_fields=["status", "run_after", "locked_at", "last_error"])
+
+
+def work(batch_size: int = 10, poll_interval: float = 1.0, once: bool = False) -> int:
+    done = 0
+    while True:
+        jobs = claim_jobs(batch_size)
+        for claimed_job in jobs:
+            run_job(claimed_job)
+        done += len(jobs)
+        if not jobs:
+            if once:
+                return done
+            time.sleep(poll_interval)
+
+
+@job("send_order_receipt")
+def send_order_receipt(order_id):
+    order = (
+        Order.objects.select_related("user")
+        .prefetch_related("tickets__flight__route__source", "tickets__flight__route__destination")
+        .filter(pk=order_id)
+        .first()
+    )
+    if order is None:
+        return
+
+    lines = [f"Order #{order.id} from {order}"]
+    for ticket in order.tickets.all():
+        flight = ticket.flight
+        if flight is not None:
+            lines.append(
+                f"{flight.route.source.closest_big_city} -> {flight.route.destination.closest_big_city}, "
+                f"{flight.departure_time:%Y-%m-%d %H:%M}, seat {ticket.row}{ticket.letter}: {ticket.price}$"
+            )
+    lines.append(f"Total: {order.total_price}$")
+    send_mail(f"Your order #{order.id}", "\n".join(lines), None, [order.user.email])
+
+
+@job("make_image_variants")
+def make_image_variants(model, pk, image):
+    obj = apps.get_model(model).objects.filter(pk=pk).first()
+    # deleted, or replaced by a newer upload that has a job of its own
+    if obj is None or obj.image.name != image:
+        return
+    obj.image_variants = make_variants(image)
+    obj.save(update_fields=["image_variants"])
@@ -0,0 +1,258 @@
+import json
+import random
+import statistics
+import time
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.backends.utils import CursorDebugWrapper, CursorWrapper
+from django.db.models import Count, F
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from airport.models import ExtraEntertainmentAndComfort, Flight, MealOption, Order, SnacksAndDrinks
+from airport.seat_map import SeatLayout
+
+
+class Rollback(Exception):
+    pass
+
+
+class CountingMixin:
+    """Counts the queries and the rows fetched into the QueryStats of the connection"""
+
+    def execute(self, *args, **kwargs):
+        self.db.query_stats.queries += 1
+        return super().execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self.db.query_stats.queries += 1
+        return super().executemany(*args, **kwargs)
+
+    def fetchone(self):
+        row = super().__getattr__("fetchone")()
+        self.db.query_stats.rows += row is not None
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().__getattr__("fetchmany")(*args, **kwargs)
+        self.db.query_stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().__getattr__("fetchall")()
+        self.db.query_stats.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        for row in super().__iter__():
+            self.db.query_stats.rows += 1
+            yield row
+
+
+class CountingCursor(CountingMixin, CursorWrapper):
+    pass
+
+
+class CountingDebugCursor(CountingMixin, CursorDebugWrapper):
+    pass
+
+
+class QueryStats:
+    """Counts the queries and the rows fetched on every database connection inside the block"""
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+    def __enter__(self):
+        for connection in connections.all():
+            connection.query_stats = self
+            connection.make_cursor = partial(CountingCursor, db=connection)
+            connection.make_debug_cursor = partial(CountingDebugCursor, db=connection)
+        return self
+
+    def __exit__(self, *exc_info):
+        for connection in connections.all():
+            del connection.query_stats, connection.make_cursor, connection.make_debug_cursor
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the p50/p95 latency, SQL queries and rows fetched per request of the main endpoints "
+        "in-process (no network), on a dataset from generate_dataset. Orders are created in rolled back "
+        "transactions. --save writes a JSON baseline, --compare fails on a regression against one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--only", nargs="+", help="Names of the endpoints to measure")
+        parser.add_argument("--save", metavar="PATH", help="Write the results as a JSON baseline")
+        parser.add_argument("--compare", metavar="PATH", help="Fail when the results regress against a baseline")
+        parser.add_argument(
+            "--threshold", type=float, default=0.2, help="Allowed growth of latency and rows fetched, 0.2 = 20%%"
+        )
+        parser.add_argument(
+            "--latency-slack-ms", type=float, default=1.0, help="Latency changes below this are never a regression"
+        )
+
+    def handle(self, *args, **options):
+        self.prepare()
+        endpoints = self.endpoints()
+        names = options["only"] or list(endpoints)
+        unknown = set(names) - set(endpoints)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}. Known: {', '.join(endpoints)}")
+
+        results = {}
+        self.stdout.write(f"{'endpoint':<22} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} {'rows':>8}")
+        # the host of the test client, as in the test runner
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for name in names:
+                results[name] = self.measure(endpoints[name], options["iterations"], options["warmup"])
+                result = results[name]
+                self.stdout.write(
+                    f"{name:<22} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                    f"{result['queries']:>8} {result['rows']:>8}"
+                )
+
+        if options["save"]:
+            with open(options["save"], "w", encoding="utf-8") as file:
+                json.dump({"iterations": options["iterations"], "endpoints": results}, file, indent=2)
+                file.write("\n")
+            self.stdout.write(f"Saved the baseline to {options['save']}")
+        if options["compare"]:
+            self.compare(results, options)
+
+    def prepare(self):
+        rng = random.Random(0)
+        # the user with most orders, for the order list
+        row = Order.objects.values("user").annotate(orders=Count("id")).order_by("-orders", "user").first()
+        self.flight = (
+            Flight.objects.select_related("airplane", "inventory", "route__source")
+            .annotate(
+                free=F("inventory__total_seats") - F("inventory__business_taken") - F("inventory__economy_taken")
+            )
+            .order_by("-free", "id")
+            .first()
+        )
+        if row is None or self.flight is None:
+            raise CommandError("The database needs flights and orders, run generate_dataset first")
+
+        user = get_user_model().objects.get(id=row["user"])
+        # not from INTERNAL_IPS, the debug toolbar would record every query with its stack
+        self.client = Client(REMOTE_ADDR="192.0.2.1", HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        flight_ids = list(Flight.objects.order_by("id").values_list("id", flat=True))
+        self.flight_ids = rng.sample(flight_ids, min(len(flight_ids), 100))
+        order_ids = list(Order.objects.filter(user_id=row["user"]).order_by("id").values_list("id", flat=True))
+        self.order_ids = rng.sample(order_ids, min(len(order_ids), 100))
+
+        layout = SeatLayout.for_airplane(self.flight.airplane)
+        self.free_seats = layout.free_seats(self.flight.inventory.occupied, 1, layout.rows)
+        meal_option = MealOption.objects.order_by("id").first()
+        self.ticket_extras = {
+            "flight": self.flight.id,
+            "has_luggage": True,
+            "luggage_weight": 10,
+            "meal_option": meal_option.id if meal_option else None,
+            "extra_entertainment_and_comfort": list(
+                ExtraEntertainmentAndComfort.objects.order_by("id").values_list("id", flat=True)[:2]
+            ),
+            "snacks_and_drinks": list(SnacksAndDrinks.objects.order_by("id").values_list("id", flat=True)[:2]),
+        }
+
+    def endpoints(self):
+        flight_list = reverse("airport:flight-list")
+        filters = {
+            "source": self.flight.route.source.closest_big_city,
+            "departure_time_from": self.flight.departure_time.replace(hour=0, minute=0, second=0).isoformat(),
+        }
+
+        def detail(view, ids):
+            return lambda index: self.client.get(reverse(view, args=[ids[index % len(ids)]]))
+
+        endpoints = {
+            "flight-list": lambda index: self.client.get(flight_list),
+            "flight-list-filtered": lambda index: self.client.get(flight_list, filters),
+            "flight-detail": detail("airport:flight-detail", self.flight_ids),
+            "route-list": lambda index: self.client.get(reverse("airport:route-list")),
+            "order-list": lambda index: self.client.get(reverse("airport:order-list")),
+            "order-retrieve": detail("airport:order-detail", self.order_ids),
+        }
+        for count in (1, 5, 20):
+            if len(self.free_seats) >= count:
+                endpoints[f"order-create-{count}"] = lambda index, count=count: self.create_order(count)
+        return endpoints
+
+    def create_order(self, count):
+        payload = {"tickets": [{**seat, **self.ticket_extras} for seat in self.free_seats[:count]]}
+        try:
+            with transaction.atomic():
+                response = self.client.post(reverse("airport:order-list"), payload, content_type="application/json")
+                raise Rollback
+        except Rollback:
+            pass
+        return response
+
+    def measure(self, request, iterations, warmup):
+        for index in range(warmup):
+            request(index)
+
+        latencies, queries, rows = [], [], []
+        for index in range(iterations):
+            with QueryStats() as stats:
+                started = time.perf_counter()
+                response = request(index)
+                latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                raise CommandError(f"{response.request['PATH_INFO']} answered {response.status_code}")
+            queries.append(stats.queries)
+            rows.append(stats.rows)
+
+        percentiles = statistics.quantiles(latencies, n=20) if len(latencies) > 1 else latencies * 19
+        return {
+            "p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "p95_ms": round(percentiles[18] * 1000, 3),
+            "queries": round(statistics.median(queries)),
+            "rows": round(statistics.median(rows)),
+        }
+
+    def compare(self, results, options):
+        try:
+            with open(options["compare"], encoding="utf-8") as file:
+                baseline = json.load(file)["endpoints"]
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f"Cannot read the baseline {options['compare']}: {error}")
+
+        threshold = options["threshold"]
+        regressions = []
+        self.stdout.write(f"\n{'endpoint':<22} {'metric':<8} {'baseline':>10} {'now':>10} {'change':>8}")
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            for metric, value in result.items():
+                old = baseline[name][metric]
+                if metric == "queries":
+                    # the query count of a request does not depend on the machine
+                    regressed = value > old
+                elif metric == "rows":
+                    regressed = value > old * (1 + threshold)
+                else:
+                    regressed = value > old * (1 + threshold) and value - old > options["latency_slack_ms"]
+                change = f"{(value - old) / old:+.0%}" if old else ""
+                self.stdout.write(
+                    f"{name:<22} {metric:<8} {old:>10} {value:>10} {change:>8}" + ("  REGRESSION" if regressed else "")
+                )
+                if regressed:
+                    regressions.append(f"{name} {metric} {old} -> {value}")
+
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} regressions against {options['compare']}: " + "; ".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
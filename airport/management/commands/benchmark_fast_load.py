@@ -0,0 +1,77 @@
+import json
+import tempfile
+import time
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import BaseCommand, call_command
+from django.db import transaction
+
+
+class Rollback(Exception):
+    pass
+
+
+def scale_fixture(objects, scale):
+    # copy N of every object gets its primary key, foreign keys and unique strings moved past copy N - 1
+    offsets = {}
+    for obj in objects:
+        offsets[obj["model"]] = max(offsets.get(obj["model"], 0), obj["pk"])
+
+    for copy in range(scale):
+        for obj in objects:
+            model = apps.get_model(obj["model"])
+            fields = {}
+            for name, value in obj["fields"].items():
+                field = model._meta.get_field(name)
+                if field.is_relation and value is not None:
+                    offset = copy * offsets.get(field.related_model._meta.label_lower, 0)
+                    value = [pk + offset for pk in value] if field.many_to_many else value + offset
+                elif copy and field.unique and isinstance(value, str):
+                    value = f"{copy}.{value}"
+                fields[name] = value
+            yield {"model": obj["model"], "pk": obj["pk"] + copy * offsets[obj["model"]], "fields": fields}
+
+
+class Command(BaseCommand):
+    help = "Compare the time of loaddata and fast_load for N copies of a fixture (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fixture", default="airport_fixture_db.json")
+        parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+        parser.add_argument(
+            "--loaddata-max-scale",
+            type=int,
+            default=10,
+            help="Larger copies are only loaded with fast_load, loaddata takes too long",
+        )
+
+    def handle(self, *args, **options):
+        with open(options["fixture"], encoding="utf-8") as file:
+            objects = json.load(file)
+
+        self.stdout.write(f"{'scale':>6} {'objects':>8} {'command':>10} {'seconds':>8} {'objects/s':>10}")
+        for scale in options["scales"]:
+            with tempfile.NamedTemporaryFile("w", suffix=".json") as fixture:
+                fixture.write("[\n")
+                for index, obj in enumerate(scale_fixture(objects, scale)):
+                    fixture.write((",\n" if index else "") + json.dumps(obj))
+                fixture.write("\n]\n")
+                fixture.flush()
+
+                commands = ["fast_load"]
+                if scale <= options["loaddata_max_scale"]:
+                    commands.insert(0, "loaddata")
+                for command in commands:
+                    try:
+                        with transaction.atomic():
+                            started = time.perf_counter()
+                            call_command(command, fixture.name, stdout=StringIO())
+                            elapsed = time.perf_counter() - started
+                            raise Rollback
+                    except Rollback:
+                        pass
+                    count = len(objects) * scale
+                    self.stdout.write(
+                        f"{scale:>6} {count:>8} {command:>10} {elapsed:>8.2f} {count / elapsed:>10.0f}"
+                    )
@@ -0,0 +1,79 @@
+import random
+import timeit
+
+from django.core.management import BaseCommand
+
+from airport.seat_map import SeatLayout
+
+
+def free_places_with_loop(taken_seats_and_letters, rows, letters_in_row, rows_economy_from):
+    # the previous FlightRetrieveSerializer.get_all_free_places implementation
+    list_of_free_seats = []
+    list_of_free_business_seats = []
+
+    for row in range(1, rows + 1):
+        for letter in letters_in_row:
+            if not letter == " ":
+                if (row, letter) not in taken_seats_and_letters:
+                    if row > rows_economy_from:
+                        list_of_free_seats.append({"row": row, "letter": letter})
+                    elif row <= rows_economy_from:
+                        list_of_free_business_seats.append({"row": row, "letter": letter})
+    return list_of_free_seats, list_of_free_business_seats
+
+
+def free_places_with_bitmap(layout, occupied, rows_economy_from):
+    return (
+        layout.free_seats(occupied, rows_economy_from + 1, layout.rows),
+        layout.free_seats(occupied, 1, rows_economy_from),
+    )
+
+
+class Command(BaseCommand):
+    help = "Compare the nested loop and the seat bitmap for the free seats of one flight"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200)
+        parser.add_argument("--letters", default="ABC DEFG HIJ")
+        parser.add_argument("--rows-economy-from", type=int, default=20)
+        parser.add_argument("--occupancy", type=float, default=0.5)
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        letters_in_row = options["letters"]
+        rows_economy_from = options["rows_economy_from"]
+        repeat = options["repeat"]
+
+        layout = SeatLayout(rows, letters_in_row)
+        all_seats = [(row, letter) for row in range(1, rows + 1) for letter in layout.letters]
+        taken_seats = random.Random(options["seed"]).sample(
+            all_seats, int(len(all_seats) * options["occupancy"])
+        )
+        taken_seats_and_letters = set(taken_seats)
+        occupied = layout.to_bitmap(taken_seats)
+
+        loop_result = free_places_with_loop(taken_seats_and_letters, rows, letters_in_row, rows_economy_from)
+        bitmap_result = free_places_with_bitmap(layout, occupied, rows_economy_from)
+        if loop_result != bitmap_result:
+            self.stderr.write(self.style.ERROR("Loop and bitmap results differ"))
+            return
+
+        results = {
+            "loop (free seat lists)": lambda: free_places_with_loop(
+                taken_seats_and_letters, rows, letters_in_row, rows_economy_from
+            ),
+            "bitmap (free seat lists)": lambda: free_places_with_bitmap(layout, occupied, rows_economy_from),
+            "bitmap (free seat counts)": lambda: (
+                layout.count_free(occupied, rows_economy_from + 1, rows),
+                layout.count_free(occupied, 1, rows_economy_from),
+            ),
+        }
+
+        self.stdout.write(
+            f"{rows} rows x {layout.width} seats, {len(taken_seats)} taken, {repeat} runs each"
+        )
+        for name, function in results.items():
+            seconds = min(timeit.repeat(function, number=repeat, repeat=3)) / repeat
+            self.stdout.write(f"{name:<28} {seconds * 1_000_000:>10.1f} us per flight")
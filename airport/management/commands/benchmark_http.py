@@ -0,0 +1,91 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+async def fetch(url, token) -> int:
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=parts.scheme == "https" or None)
+    writer.write(
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {parts.netloc}\r\n"
+        f"Authorization: Bearer {token}\r\n"
+        f"Connection: close\r\n\r\n".encode()
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    return int(response.split(b" ", 2)[1])
+
+
+async def run_load(url, token, concurrency, total):
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                status_code = await fetch(url, token)
+            except (OSError, ValueError, IndexError):
+                status_code = None
+            latencies.append(time.perf_counter() - started)
+            if status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the sync and the async flight search views under many "
+        "concurrent clients. By default both urls are served by the same server, the docker-compose "
+        "'uvicorn airport_api.asgi:application --workers 4' on port 8002, so only the views differ. "
+        "Urls on different servers also compare the servers and their worker counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sync-url", default="http://localhost:8002/api/airport/flight/")
+        parser.add_argument("--async-url", default="http://localhost:8002/api/airport/async/flight/")
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--email", help="User of the access token, by default the first user")
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by("id")
+        user = users.filter(email=options["email"]).first() if options["email"] else users.first()
+        if user is None:
+            raise CommandError("The database needs a user for the access token")
+        token = str(AccessToken.for_user(user))
+        if urlsplit(options["sync_url"]).netloc != urlsplit(options["async_url"]).netloc:
+            self.stderr.write(
+                "The urls are served by different servers, the numbers compare the servers too, "
+                "not only the sync and async views"
+            )
+
+        self.stdout.write(
+            f"{options['requests']} requests, {options['concurrency']} concurrent clients\n"
+            f"{'stack':<14} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}"
+        )
+        for name, url in (("sync views", options["sync_url"]), ("async views", options["async_url"])):
+            elapsed, latencies, errors = asyncio.run(
+                run_load(url, token, options["concurrency"], options["requests"])
+            )
+            percentiles = statistics.quantiles(latencies, n=20) if len(latencies) > 1 else latencies * 19
+            self.stdout.write(
+                f"{name:<14} {len(latencies) / elapsed:>8.1f} {percentiles[9] * 1000:>8.1f} "
+                f"{percentiles[18] * 1000:>8.1f} {errors:>7}"
+            )
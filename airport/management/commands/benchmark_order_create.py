@@ -0,0 +1,74 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from airport.models import ExtraEntertainmentAndComfort, Flight, MealOption, SnacksAndDrinks
+from airport.seat_map import SeatLayout
+from airport.serializers import OrderSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Count the database round trips and the time of creating orders with N tickets (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tickets", type=int, nargs="+", default=[1, 5, 9])
+        parser.add_argument("--flight", type=int, help="Flight id, by default the flight with most free seats")
+
+    def find_flight(self, flight_id):
+        flights = Flight.objects.select_related("airplane", "inventory")
+        if flight_id:
+            return flights.get(id=flight_id)
+        return max(flights, key=lambda flight: flight.inventory.places_available, default=None)
+
+    def build_payload(self, flight, count):
+        layout = SeatLayout.for_airplane(flight.airplane)
+        free_seats = layout.free_seats(flight.inventory.occupied, 1, layout.rows)
+        if len(free_seats) < count:
+            raise CommandError(f"Flight {flight.id} has only {len(free_seats)} free seats")
+
+        meal_option = MealOption.objects.first()
+        extras = list(ExtraEntertainmentAndComfort.objects.values_list("id", flat=True)[:2])
+        snacks = list(SnacksAndDrinks.objects.values_list("id", flat=True)[:2])
+        return {
+            "tickets": [
+                {
+                    **seat,
+                    "flight": flight.id,
+                    "has_luggage": True,
+                    "luggage_weight": 10,
+                    "meal_option": meal_option.id,
+                    "extra_entertainment_and_comfort": extras,
+                    "snacks_and_drinks": snacks,
+                }
+                for seat in free_seats[:count]
+            ]
+        }
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.first()
+        flight = self.find_flight(options["flight"])
+        if user is None or flight is None or MealOption.objects.first() is None:
+            raise CommandError("The database needs at least one user, flight and meal option")
+
+        self.stdout.write(f"{'tickets':>8} {'queries':>8} {'ms':>8}")
+        for count in options["tickets"]:
+            payload = self.build_payload(flight, count)
+            try:
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        serializer = OrderSerializer(data=payload)
+                        serializer.is_valid(raise_exception=True)
+                        serializer.save(user=user)
+                        elapsed = time.perf_counter() - started
+                    raise Rollback
+            except Rollback:
+                pass
+            self.stdout.write(f"{count:>8} {len(queries):>8} {elapsed * 1000:>8.1f}")
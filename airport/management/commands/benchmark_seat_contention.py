@@ -0,0 +1,143 @@
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from airport.models import Flight, FlightInventory, MealOption, Order, SeatHold, Ticket
+from airport.seat_map import SeatLayout
+
+
+class Command(BaseCommand):
+    help = (
+        "Start N buyers at once in threads, each booking a few of the same hot seats of one flight, and report "
+        "the answers (201, 409, errors), the latency and the throughput. Checks that no seat was sold twice and "
+        "that the seat inventory matches the tickets, then deletes the created orders (unless --keep)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buyers", type=int, default=100)
+        parser.add_argument("--tickets", type=int, default=2, help="Tickets of every order")
+        parser.add_argument("--hot-seats", type=int, default=40, help="The free seats the buyers choose from")
+        parser.add_argument("--flight", type=int, help="Flight id, by default the flight with most free seats")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keep", action="store_true", help="Keep the created orders")
+
+    def handle(self, *args, **options):
+        flight = self.find_flight(options["flight"])
+        user = get_user_model().objects.order_by("id").first()
+        meal_option = MealOption.objects.order_by("id").first()
+        if flight is None or user is None or meal_option is None:
+            raise CommandError("The database needs at least one flight, user and meal option")
+
+        layout = SeatLayout.for_airplane(flight.airplane)
+        hot_seats = layout.free_seats(flight.inventory.occupied, 1, layout.rows)[:options["hot_seats"]]
+        if len(hot_seats) < options["tickets"]:
+            raise CommandError(f"Flight {flight.id} has only {len(hot_seats)} free seats")
+
+        rng = random.Random(options["seed"])
+        payloads = [
+            {
+                "tickets": [
+                    {**seat, "flight": flight.id, "meal_option": meal_option.id}
+                    for seat in rng.sample(hot_seats, options["tickets"])
+                ]
+            }
+            for _ in range(options["buyers"])
+        ]
+        token = str(AccessToken.for_user(user))
+        orders_before = set(Order.objects.filter(user=user).values_list("id", flat=True))
+
+        self.stdout.write(
+            f"{options['buyers']} buyers, {options['tickets']} tickets each from {len(hot_seats)} "
+            f"free seats of flight {flight.id} on {connections['default'].vendor}"
+        )
+        # the host of the test client, as in the test runner
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            results, elapsed = self.run_buyers(payloads, token)
+
+        try:
+            self.report(results, elapsed, len(hot_seats) // options["tickets"])
+            self.check_seats(flight)
+        finally:
+            if not options["keep"]:
+                # the deleted tickets release their seats in the inventory
+                Order.objects.filter(user=user).exclude(id__in=orders_before).delete()
+
+    @staticmethod
+    def find_flight(flight_id):
+        flights = Flight.objects.select_related("airplane", "inventory")
+        if flight_id:
+            return flights.get(id=flight_id)
+        return max(flights, key=lambda flight: flight.inventory.places_available, default=None)
+
+    @staticmethod
+    def run_buyers(payloads, token):
+        url = reverse("airport:order-list")
+        start = threading.Barrier(len(payloads))
+        results = [None] * len(payloads)
+
+        def buy(index):
+            # not from INTERNAL_IPS, the debug toolbar would record every query with its stack
+            client = Client(REMOTE_ADDR="192.0.2.1", HTTP_AUTHORIZATION=f"Bearer {token}",
+                            raise_request_exception=False)
+            try:
+                start.wait()
+                started = time.perf_counter()
+                try:
+                    outcome = client.post(url, payloads[index], content_type="application/json").status_code
+                except Exception as error:
+                    outcome = type(error).__name__
+                results[index] = (outcome, time.perf_counter() - started)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buy, args=(index,)) for index in range(len(payloads))]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, time.perf_counter() - started
+
+    def report(self, results, elapsed, most_orders):
+        outcomes = Counter(outcome for outcome, _ in results)
+        latencies = sorted(latency for _, latency in results)
+        percentiles = statistics.quantiles(latencies, n=20) if len(latencies) > 1 else latencies * 19
+
+        self.stdout.write(f"{'answer':<22} {'orders':>8}")
+        for outcome, count in sorted(outcomes.items(), key=lambda item: str(item[0])):
+            meaning = {201: "created", 409: "seat conflict", 400: "invalid", 500: "server error"}.get(outcome, "")
+            self.stdout.write(f"{f'{outcome} {meaning}'.strip():<22} {count:>8}")
+        self.stdout.write(
+            f"p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {percentiles[18] * 1000:.1f} ms, "
+            f"{len(results) / elapsed:.1f} answers/s, {outcomes[201] / elapsed:.1f} orders/s "
+            f"({outcomes[201]} created, at most {most_orders} fit in the hot seats)"
+        )
+
+    def check_seats(self, flight):
+        sold_twice = (
+            Ticket.objects.filter(flight=flight).values("row", "letter").annotate(tickets=Count("id"))
+            .filter(tickets__gt=1).count()
+        )
+        inventory = FlightInventory.objects.select_related("flight__airplane").get(flight=flight)
+        layout = SeatLayout.for_airplane(inventory.flight.airplane)
+        expected = layout.to_bitmap([
+            *Ticket.objects.filter(flight=flight).values_list("row", "letter"),
+            *SeatHold.objects.filter(flight=flight).values_list("row", "letter"),
+        ])
+        if sold_twice or inventory.occupied != expected:
+            raise CommandError(
+                f"{sold_twice} seats sold twice, the inventory "
+                f"{'matches' if inventory.occupied == expected else 'does not match'} the tickets"
+            )
+        self.stdout.write(self.style.SUCCESS("No seat sold twice, the inventory matches the tickets and holds"))
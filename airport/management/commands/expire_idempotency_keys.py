@@ -0,0 +1,22 @@
+import time
+
+from django.core.management import BaseCommand
+
+from airport.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete the expired idempotency keys of the created orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Keys per delete query")
+        parser.add_argument("--every", type=float, help="Keep running, sweeping every this many seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = IdempotencyKey.expire(options["batch_size"])
+            if expired or not options["every"]:
+                self.stdout.write(self.style.SUCCESS(f"Deleted {expired} expired idempotency keys"))
+            if not options["every"]:
+                return
+            time.sleep(options["every"])
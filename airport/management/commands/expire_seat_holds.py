@@ -0,0 +1,22 @@
+import time
+
+from django.core.management import BaseCommand
+
+from airport.models import SeatHold
+
+
+class Command(BaseCommand):
+    help = "Delete the expired seat holds and free their seats in the flight inventories"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Flights per transaction")
+        parser.add_argument("--every", type=float, help="Keep running, sweeping every this many seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = SeatHold.expire(options["batch_size"])
+            if expired or not options["every"]:
+                self.stdout.write(self.style.SUCCESS(f"Expired {expired} seat holds"))
+            if not options["every"]:
+                return
+            time.sleep(options["every"])
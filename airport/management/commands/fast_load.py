@@ -0,0 +1,163 @@
+import io
+import json
+import time
+from collections import defaultdict
+
+from django.core.management import BaseCommand, CommandError, call_command
+from django.core.management.color import no_style
+from django.core.serializers import sort_dependencies
+from django.core.serializers.base import DeserializationError
+from django.core.serializers.python import Deserializer
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Prefetch
+
+from airport.bulk import insert_rows, prepare_value
+from airport.models import CatalogVersion, Flight, FlightInventory, Order, Ticket
+from airport.signals import CATALOG_MODELS
+
+
+def iter_fixture(file, chunk_size=1 << 16):
+    """Yields the objects of a JSON array one by one without reading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise CommandError("A fixture has to be a JSON array")
+    buffer = buffer[1:]
+    end_of_file = False
+    while True:
+        buffer = buffer.lstrip()
+        if buffer.startswith(","):
+            buffer = buffer[1:].lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if end_of_file:
+                raise CommandError("The fixture ends in the middle of an object")
+            chunk = file.read(chunk_size)
+            end_of_file = not chunk
+            buffer += chunk
+            continue
+        yield obj
+        buffer = buffer[end:]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load JSON fixtures with bulk inserts (COPY on PostgreSQL) instead of a save() per object. "
+        "Existing rows with the same primary keys are overwritten, as with loaddata, so it can run on every start."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("fixtures", nargs="+", help="Paths of the JSON fixtures")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.connection = connections[DEFAULT_DB_ALIAS]
+        self.batch_size = options["batch_size"]
+        self.loaded = defaultdict(set)
+        self.m2m = defaultdict(list)
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            for fixture in options["fixtures"]:
+                self.load_fixture(fixture)
+            self.write_m2m()
+            self.reset_sequences()
+            self.refresh_derived_data()
+
+        rows = sum(len(pks) for pks in self.loaded.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {rows} objects of {len(self.loaded)} models in {time.perf_counter() - started:.2f}s"
+        ))
+
+    def load_fixture(self, path):
+        pending = defaultdict(list)
+        try:
+            with open(path, encoding="utf-8") as file:
+                objects = Deserializer(iter_fixture(file))
+                for deserialized in objects:
+                    model = type(deserialized.object)
+                    pending[model].append(deserialized.object)
+                    if deserialized.m2m_data:
+                        self.m2m[model].append((deserialized.object.pk, deserialized.m2m_data))
+                    # the foreign keys are checked on commit, so a full batch is written right away
+                    if len(pending[model]) >= self.batch_size:
+                        self.write_rows(model, pending.pop(model))
+        except (OSError, DeserializationError) as error:
+            raise CommandError(f"Cannot load {path}: {error}")
+
+        for model in sort_dependencies([(None, list(pending))]):
+            self.write_rows(model, pending[model])
+
+    def write_rows(self, model, objects):
+        fields = model._meta.local_concrete_fields
+        self.loaded[model].update(obj.pk for obj in objects)
+        rows = [
+            [prepare_value(field, getattr(obj, field.attname), self.connection) for field in fields]
+            for obj in objects
+        ]
+
+        quote = self.connection.ops.quote_name
+        updates = ", ".join(
+            f"{quote(field.column)} = EXCLUDED.{quote(field.column)}" for field in fields if not field.primary_key
+        )
+        on_conflict = f"ON CONFLICT ({quote(model._meta.pk.column)}) " + (
+            f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        )
+        insert_rows(self.connection, model._meta.db_table, [field.column for field in fields], rows, on_conflict)
+
+    def write_m2m(self):
+        # the fixture holds the whole relation, as loaddata the old rows are replaced
+        for model, objects in self.m2m.items():
+            for field in model._meta.many_to_many:
+                through = field.remote_field.through
+                source = through._meta.get_field(field.m2m_field_name())
+                target = through._meta.get_field(field.m2m_reverse_field_name())
+                for start in range(0, len(objects), self.batch_size):
+                    batch = [(pk, m2m_data) for pk, m2m_data in objects[start:start + self.batch_size]
+                             if field.name in m2m_data]
+                    through.objects.filter(**{f"{source.name}__in": [pk for pk, _ in batch]}).delete()
+                    insert_rows(
+                        self.connection,
+                        through._meta.db_table,
+                        [source.column, target.column],
+                        [(pk, target_pk) for pk, m2m_data in batch for target_pk in m2m_data[field.name]],
+                    )
+
+    def reset_sequences(self):
+        sequence_sql = self.connection.ops.sequence_reset_sql(no_style(), list(self.loaded))
+        with self.connection.cursor() as cursor:
+            for sql in sequence_sql:
+                cursor.execute(sql)
+
+    def refresh_derived_data(self):
+        # what the signals of a save() per object keep up to date
+        if self.loaded.keys() & {Flight, Ticket}:
+            call_command("reconcile_inventory", batch_size=self.batch_size, stdout=io.StringIO())
+
+        order_ids = set(self.loaded.get(Order, ()))
+        ticket_ids = sorted(self.loaded.get(Ticket, ()))
+        for start in range(0, len(ticket_ids), self.batch_size):
+            order_ids.update(
+                Ticket.objects.filter(pk__in=ticket_ids[start:start + self.batch_size])
+                .values_list("order_id", flat=True)
+            )
+
+        order_ids = sorted(order_ids)
+        tickets = Ticket.objects.select_related("flight__route__source", "flight__route__destination")
+        for start in range(0, len(order_ids), self.batch_size):
+            orders = list(
+                Order.objects.filter(pk__in=order_ids[start:start + self.batch_size])
+                .prefetch_related(Prefetch("tickets", queryset=tickets))
+            )
+            for order in orders:
+                order.set_summary(list(order.tickets.all()))
+            # an upsert of whole rows is much cheaper than the CASE WHEN of bulk_update
+            self.write_rows(Order, orders)
+
+        for model in self.loaded.keys() & set(CATALOG_MODELS):
+            CatalogVersion.bump(model)
+        if self.loaded:
+            FlightInventory.bump_versions(Flight.objects.all())
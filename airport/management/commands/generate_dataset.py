@@ -0,0 +1,383 @@
+import math
+import random
+import string
+import time
+from datetime import datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Max
+from django.utils.timezone import make_aware
+
+from airport.bulk import BulkWriter
+from airport.models import (
+    Airplane,
+    AirplaneType,
+    Airport,
+    CatalogVersion,
+    Crew,
+    DiscountCoupon,
+    ExtraEntertainmentAndComfort,
+    Flight,
+    FlightInventory,
+    MealOption,
+    Order,
+    Route,
+    SnacksAndDrinks,
+    Ticket,
+)
+from airport.seat_map import SeatLayout
+from airport.serializers import OrderSerializer
+from airport.signals import CATALOG_MODELS
+
+SYLLABLES = (
+    "ka", "lo", "ri", "ma", "to", "sen", "var", "del", "mi", "or", "an", "bel", "cor", "du",
+    "fa", "gra", "hal", "is", "jun", "ne", "pol", "ra", "sto", "ul", "ven", "wes", "yor", "zel",
+)
+AIRPORT_KINDS = ("International Airport", "Airport", "Regional Airport", "City Airport")
+FIRST_NAMES = (
+    "Olena", "Taras", "Anna", "James", "Maria", "Petro", "Emma", "Noah", "Sofia", "Liam",
+    "Iryna", "Andrii", "Chloe", "Lucas", "Yuki", "Omar", "Lena", "Mateo", "Zara", "Ivan",
+)
+LAST_NAMES = (
+    "Shevchenko", "Smith", "Kovalenko", "Garcia", "Bondarenko", "Muller", "Tkachenko", "Rossi",
+    "Melnyk", "Dubois", "Kravets", "Novak", "Tanaka", "Silva", "Moroz", "Jensen", "Lysenko", "Khan",
+)
+# family, rows, letters in a row
+AIRPLANE_FAMILIES = (
+    ("ATR 72", 18, "ABCD"),
+    ("Embraer E195", 28, "ABCD"),
+    ("Airbus A320", 30, "ABCDEF"),
+    ("Boeing 737", 32, "ABCDEF"),
+    ("Airbus A330", 40, "ABCDEFGH"),
+    ("Boeing 787", 42, "ABCDEFGHJ"),
+)
+MEAL_OPTIONS = (
+    ("Chicken with rice", "1", 350, 1200), ("Beef stroganoff", "1", 380, 1450),
+    ("Vegetable lasagna", "2", 330, 1100), ("Falafel bowl", "2", 300, 1050),
+    ("Kids pasta", "3", 220, 750), ("Kids pancakes", "3", 200, 650),
+)
+SNACKS_AND_DRINKS = (
+    ("Water 0.5", 150), ("Coffee", 300), ("Tea", 250), ("Orange juice", 350), ("Chips", 299),
+    ("Chocolate bar", 250), ("Sandwich", 690), ("Beer 0.33", 550), ("Red wine 0.2", 790),
+)
+EXTRAS = (("Extra legroom", 2500), ("Priority boarding", 1500), ("Blanket and pillow", 800), ("Wi-Fi", 999))
+CREW_POSITIONS = ("CAPTAIN", "FIRST_OFFICER", "LEAD_FLIGHT_ATTENDANT", "FLIGHT_ATTENDANT")
+# the columns of a generated ticket, as set by OrderSerializer.price_ticket
+TICKET_FIELDS = (
+    "row", "letter", "flight_id", "meal_option_id", "discount_coupon_id", "is_child", "is_business",
+    "has_luggage", "luggage_weight", "discount", "price", "fare_price", "luggage_price", "extras_price",
+)
+
+
+def money(cents: int) -> str:
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+def distance_km(a, b) -> int:
+    (lat1, lon1), (lat2, lon2) = a, b
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return round(2 * 6371 * math.asin(math.sqrt(h)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large, deterministic dataset for benchmarks: airports, a dense route graph, "
+        "a year of flights with crews, users, orders and tickets with extras and coupons. "
+        "The rows are bulk-inserted (COPY on PostgreSQL) after the existing ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--start", default="2025-01-01", help="Day of the first flights, YYYY-MM-DD")
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--flights-per-day", type=int, default=200)
+        parser.add_argument("--tickets", type=int, default=1_000_000, help="About this many tickets")
+        parser.add_argument("--airports", type=int, default=2000)
+        parser.add_argument("--routes-per-airport", type=int, default=10)
+        parser.add_argument("--airplanes", type=int, default=500)
+        parser.add_argument("--crew", type=int, default=6000)
+        parser.add_argument("--users", type=int, default=50_000)
+        parser.add_argument("--batch-size", type=int, default=20_000)
+
+    def handle(self, *args, **options):
+        if options["airports"] < 2:
+            raise CommandError("The route graph needs at least 2 airports")
+        self.rng = random.Random(options["seed"])
+        self.connection = connections[DEFAULT_DB_ALIAS]
+        self.writer = BulkWriter(self.connection, options["batch_size"])
+        self.last_ids = {}
+        self.started = time.perf_counter()
+        start = make_aware(datetime.strptime(options["start"], "%Y-%m-%d"))
+
+        self.generate_airplanes(options["airplanes"])
+        self.generate_airports(options["airports"], options["routes_per_airport"])
+        self.generate_crew(options["crew"])
+        self.generate_catalogs(start)
+        self.generate_users(options["users"], start)
+        self.generate_flights(start, options)
+        self.writer.flush()
+
+        with self.connection.cursor() as cursor:
+            for sql in self.connection.ops.sequence_reset_sql(no_style(), list(self.writer.written)):
+                cursor.execute(sql)
+        for model in self.writer.written.keys() & set(CATALOG_MODELS):
+            CatalogVersion.bump(model)
+
+        for model, count in self.writer.written.items():
+            self.stdout.write(f"{model._meta.label:<45} {count:>10}")
+        self.stdout.write(self.style.SUCCESS(f"Generated in {time.perf_counter() - self.started:.1f}s"))
+
+    def new_ids(self, model, count) -> range:
+        # the rows get their ids here, so children can point to them before anything is written
+        if model not in self.last_ids:
+            self.last_ids[model] = model.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+        first_id = self.last_ids[model] + 1
+        self.last_ids[model] += count
+        return range(first_id, first_id + count)
+
+    def datetime_value(self, value):
+        return self.connection.ops.adapt_datetimefield_value(value)
+
+    def generate_airplanes(self, count):
+        existing_types = dict(AirplaneType.objects.values_list("name", "id"))
+        new_families = [family for family, _, _ in AIRPLANE_FAMILIES if family not in existing_types]
+        for family, type_id in zip(new_families, self.new_ids(AirplaneType, len(new_families))):
+            self.writer.add(AirplaneType, id=type_id, name=family)
+            existing_types[family] = type_id
+
+        # unsaved instances, only for their seat layouts
+        self.airplanes = []
+        for airplane_id in self.new_ids(Airplane, count):
+            family, rows, letters = self.rng.choice(AIRPLANE_FAMILIES)
+            airplane = Airplane(id=airplane_id, rows=rows + self.rng.randint(-2, 2), letters_in_row=letters)
+            self.writer.add(
+                Airplane,
+                id=airplane_id,
+                name=f"{family} UR-{airplane_id:05d}",
+                rows=airplane.rows,
+                letters_in_row=letters,
+                airplane_type_id=existing_types[family],
+            )
+            self.airplanes.append(airplane)
+
+    def generate_airports(self, count, routes_per_airport):
+        airports = []
+        for airport_id in self.new_ids(Airport, count):
+            city = "".join(self.rng.choice(SYLLABLES) for _ in range(self.rng.randint(2, 3))).capitalize()
+            position = (self.rng.uniform(-45, 65), self.rng.uniform(-125, 145))
+            self.writer.add(
+                Airport,
+                id=airport_id,
+                name=f"{city} {self.rng.choice(AIRPORT_KINDS)}",
+                closest_big_city=city,
+            )
+            airports.append((airport_id, city, position))
+
+        # (id, source city, destination city, distance)
+        self.routes = []
+        for source_id, source_city, source_position in airports:
+            destinations = set()
+            for _ in range(routes_per_airport * 5):
+                if len(destinations) == routes_per_airport:
+                    break
+                destination_id, destination_city, destination_position = self.rng.choice(airports)
+                distance = distance_km(source_position, destination_position)
+                if destination_id == source_id or destination_id in destinations or not 100 <= distance <= 9999:
+                    continue
+                destinations.add(destination_id)
+                route_id = self.new_ids(Route, 1)[0]
+                self.writer.add(
+                    Route, id=route_id, source_id=source_id, destination_id=destination_id, distance=distance
+                )
+                self.routes.append((route_id, source_city, destination_city, distance))
+        if not self.routes:
+            raise CommandError("No route shorter than 9999 km, generate more airports")
+
+    def generate_crew(self, count):
+        self.crew = {position: [] for position in CREW_POSITIONS}
+        for crew_id in self.new_ids(Crew, count):
+            # a captain, a first officer and a lead for every 2-4 flight attendants
+            position = self.rng.choices(CREW_POSITIONS, weights=(2, 2, 2, 5))[0]
+            self.writer.add(
+                Crew,
+                id=crew_id,
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                position=position,
+            )
+            self.crew[position].append(crew_id)
+        if any(len(members) < 4 for members in self.crew.values()):
+            raise CommandError("Generate more crew, every position needs at least 4 members")
+
+    def generate_catalogs(self, start):
+        # unsaved instances with their id and price, enough for OrderSerializer.price_ticket
+        self.meals = list(MealOption.objects.only("id", "price"))
+        existing_meals = set(MealOption.objects.values_list("name", flat=True))
+        new_meals = [meal for meal in MEAL_OPTIONS if meal[0] not in existing_meals]
+        for (name, meal_type, weight, price), meal_id in zip(new_meals, self.new_ids(MealOption, len(new_meals))):
+            self.writer.add(MealOption, id=meal_id, name=name, meal_type=meal_type, weight=weight, price=money(price))
+            self.meals.append(MealOption(id=meal_id, price=Decimal(money(price))))
+
+        self.snacks = []
+        for (name, price), snack_id in zip(SNACKS_AND_DRINKS, self.new_ids(SnacksAndDrinks, len(SNACKS_AND_DRINKS))):
+            self.writer.add(SnacksAndDrinks, id=snack_id, name=name, price=money(price))
+            self.snacks.append(SnacksAndDrinks(id=snack_id, price=Decimal(money(price))))
+
+        self.extras = []
+        for (name, price), extra_id in zip(EXTRAS, self.new_ids(ExtraEntertainmentAndComfort, len(EXTRAS))):
+            self.writer.add(ExtraEntertainmentAndComfort, id=extra_id, name=name, price=money(price))
+            self.extras.append(ExtraEntertainmentAndComfort(id=extra_id, price=Decimal(money(price))))
+
+        self.coupons = []
+        for coupon_id in self.new_ids(DiscountCoupon, 30):
+            discount = self.rng.choice((5, 10, 15, 20, 30))
+            valid_until = start + timedelta(days=self.rng.randint(400, 800))
+            self.writer.add(
+                DiscountCoupon,
+                id=coupon_id,
+                name=f"Sale {discount}% #{coupon_id}",
+                valid_until=self.datetime_value(valid_until),
+                code="".join(self.rng.choices(string.ascii_uppercase + string.digits, k=10)),
+                discount=discount,
+            )
+            self.coupons.append(DiscountCoupon(id=coupon_id, discount=discount, valid_until=valid_until))
+
+    def generate_users(self, count, start):
+        password = make_password("passenger")
+        self.user_ids = self.new_ids(get_user_model(), count)
+        for user_id in self.user_ids:
+            self.writer.add(
+                get_user_model(),
+                id=user_id,
+                password=password,
+                email=f"passenger{user_id}@example.com",
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                date_joined=self.datetime_value(start - timedelta(days=self.rng.randint(1, 1000))),
+            )
+
+    def generate_flights(self, start, options):
+        rng = self.rng
+        flights_count = options["days"] * options["flights_per_day"]
+        tickets_per_flight = options["tickets"] / max(flights_count, 1)
+        crew_through = Flight.crew.through
+        extras_through = Ticket.extra_entertainment_and_comfort.through
+        snacks_through = Ticket.snacks_and_drinks.through
+        flight_ids = iter(self.new_ids(Flight, flights_count))
+        tickets_written = 0
+
+        for day in range(options["days"]):
+            for _ in range(options["flights_per_day"]):
+                flight_id = next(flight_ids)
+                route_id, source_city, destination_city, distance = rng.choice(self.routes)
+                airplane = rng.choice(self.airplanes)
+                departure = start + timedelta(days=day, minutes=rng.randrange(24 * 60))
+                price_economy = round((40 + distance * 0.09) * rng.uniform(0.8, 1.3))
+                flight = Flight(
+                    id=flight_id,
+                    airplane=airplane,
+                    departure_time=departure,
+                    price_economy=price_economy,
+                    price_business=price_economy * 3,
+                    rows_economy_from=max(airplane.rows // 6, 1),
+                    luggage_price_1_kg=Decimal(money(rng.randint(100, 600))),
+                )
+                self.writer.add(
+                    Flight,
+                    id=flight_id,
+                    route_id=route_id,
+                    airplane_id=airplane.id,
+                    departure_time=self.datetime_value(departure),
+                    arrival_time=self.datetime_value(departure + timedelta(hours=distance / 800 + 0.5)),
+                    price_economy=flight.price_economy,
+                    price_business=flight.price_business,
+                    rows_economy_from=flight.rows_economy_from,
+                    luggage_price_1_kg=flight.luggage_price_1_kg,
+                )
+
+                crew = [
+                    rng.choice(self.crew["CAPTAIN"]),
+                    rng.choice(self.crew["FIRST_OFFICER"]),
+                    rng.choice(self.crew["LEAD_FLIGHT_ATTENDANT"]),
+                    *rng.sample(self.crew["FLIGHT_ATTENDANT"], rng.randint(2, 4)),
+                ]
+                for crew_id in crew:
+                    self.writer.add(crew_through, flight_id=flight_id, crew_id=crew_id)
+
+                layout = SeatLayout.for_airplane(airplane)
+                taken = min(max(round(rng.gauss(tickets_per_flight, tickets_per_flight / 4)), 0), layout.capacity)
+                bits = rng.sample(range(layout.capacity), taken)
+                # what reconcile_inventory would compute, without reading the tickets back
+                inventory = FlightInventory(flight=flight)
+                inventory.set_occupied(sum(1 << bit for bit in bits))
+                self.writer.add(
+                    FlightInventory,
+                    flight_id=flight_id,
+                    occupied_seats=inventory.occupied_seats,
+                    total_seats=inventory.total_seats,
+                    business_taken=inventory.business_taken,
+                    economy_taken=inventory.economy_taken,
+                    version=inventory.version,
+                )
+
+                departure_value = self.datetime_value(departure)
+                while bits:
+                    group = [layout.seat(bits.pop()) for _ in range(min(rng.choice((1, 1, 1, 2, 2, 3, 4)), len(bits)))]
+                    created_at = departure - timedelta(minutes=rng.randint(60, 90 * 24 * 60))
+                    tickets = [self.make_ticket(flight, row, letter, created_at) for row, letter in group]
+                    total_price = sum(price for price, _, _, _ in tickets)
+                    order_id = self.new_ids(Order, 1)[0]
+                    # the parents are buffered before their children, a flush may happen on any add
+                    self.writer.add(
+                        Order,
+                        id=order_id,
+                        created_at=self.datetime_value(created_at),
+                        user_id=rng.choice(self.user_ids),
+                        total_price=Decimal(total_price).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP),
+                        tickets_count=len(tickets),
+                        source_city=source_city,
+                        destination_city=destination_city,
+                        first_departure=departure_value,
+                        last_departure=departure_value,
+                    )
+                    for _, values, extra_ids, snack_ids in tickets:
+                        ticket_id = self.new_ids(Ticket, 1)[0]
+                        self.writer.add(Ticket, id=ticket_id, order_id=order_id, **values)
+                        for extra_id in extra_ids:
+                            self.writer.add(
+                                extras_through, ticket_id=ticket_id, extraentertainmentandcomfort_id=extra_id
+                            )
+                        for snack_id in snack_ids:
+                            self.writer.add(snacks_through, ticket_id=ticket_id, snacksanddrinks_id=snack_id)
+                    tickets_written += len(group)
+
+            if (day + 1) % 30 == 0 or day + 1 == options["days"]:
+                self.stdout.write(
+                    f"{day + 1} days, {tickets_written} tickets, {time.perf_counter() - self.started:.0f}s"
+                )
+
+    def make_ticket(self, flight, row, letter, created_at):
+        # priced by OrderSerializer.price_ticket as of the order time, like the orders of the API
+        rng = self.rng
+        ticket = Ticket(flight=flight, row=row, letter=letter)
+        if rng.random() < 0.7:
+            ticket.meal_option = rng.choice(self.meals)
+        extras = rng.sample(self.extras, rng.choice((0, 0, 0, 1, 1, 2)))
+        snacks = rng.sample(self.snacks, rng.choice((0, 0, 1, 1, 2, 3)))
+        if rng.random() < 0.5:
+            ticket.has_luggage = True
+            ticket.luggage_weight = rng.randint(5, 23)
+        ticket.is_child = rng.random() < 0.08
+        coupon = rng.choice(self.coupons) if rng.random() < 0.04 else None
+        if coupon and coupon.valid_until > created_at:
+            ticket.discount_coupon = coupon
+        price = OrderSerializer.price_ticket(ticket, extras, snacks, coupon, created_at)
+
+        values = {field: getattr(ticket, field) for field in TICKET_FIELDS}
+        return price, values, [extra.id for extra in extras], [snack.id for snack in snacks]
@@ -0,0 +1,86 @@
+from itertools import groupby
+
+from django.core.management import BaseCommand, CommandError
+
+from airport.models import Flight, FlightInventory, SeatHold, Ticket
+from airport.seat_map import SeatLayout
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-flight seat bitmaps and availability counters from the tickets and seat holds"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report the flights whose inventory drifted, do not fix them",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def taken_seats_by_flight(self):
+        seats = (
+            Ticket.objects.filter(flight__isnull=False).order_by().values_list("flight_id", "row", "letter")
+            .union(SeatHold.objects.order_by().values_list("flight_id", "row", "letter"), all=True)
+            .order_by("flight_id")
+            .iterator(chunk_size=5000)
+        )
+        for flight_id, seats in groupby(seats, key=lambda seat: seat[0]):
+            yield flight_id, [(row, letter) for _, row, letter in seats]
+
+    def handle(self, *args, **options):
+        taken_seats = self.taken_seats_by_flight()
+        next_flight_id, next_seats = next(taken_seats, (None, []))
+        flights = (
+            Flight.objects.select_related("airplane", "inventory")
+            .order_by("id")
+            .iterator(chunk_size=options["batch_size"])
+        )
+
+        drifted = []
+        for flight in flights:
+            seats = []
+            while next_flight_id is not None and next_flight_id <= flight.id:
+                if next_flight_id == flight.id:
+                    seats = next_seats
+                next_flight_id, next_seats = next(taken_seats, (None, []))
+
+            current = getattr(flight, "inventory", None)
+            expected = FlightInventory(flight=flight)
+            expected.set_occupied(SeatLayout.for_airplane(flight.airplane).to_bitmap(seats))
+
+            if current is None or self.state(current) != self.state(expected):
+                drifted.append(flight)
+                self.stdout.write(
+                    f"Flight {flight.id}: stored "
+                    f"{self.describe(current)}, expected {self.describe(expected)}"
+                )
+
+        if options["check"]:
+            if drifted:
+                raise CommandError(f"{len(drifted)} flight inventories drifted from the tickets")
+            self.stdout.write(self.style.SUCCESS("All flight inventories match the tickets"))
+            return
+
+        # the scan above reads without locks, a seat bought or held meanwhile would be lost by writing its
+        # result, each drifted flight is read again under the lock of its inventory
+        for flight in drifted:
+            FlightInventory.rebuild(flight)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(drifted)} flight inventories"))
+
+    @staticmethod
+    def state(inventory):
+        return (
+            inventory.occupied,
+            inventory.total_seats,
+            inventory.business_taken,
+            inventory.economy_taken,
+        )
+
+    @staticmethod
+    def describe(inventory):
+        if inventory is None:
+            return "nothing"
+        return (
+            f"{inventory.business_taken} business + {inventory.economy_taken} economy "
+            f"of {inventory.total_seats} taken"
+        )
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from airport.jobs import enqueue
+from airport.models import Airplane, Crew, MealOption, SnacksAndDrinks, ExtraEntertainmentAndComfort
+from airport.storage import ContentAddressedStorage
+
+IMAGE_MODELS = (Airplane, Crew, MealOption, SnacksAndDrinks, ExtraEntertainmentAndComfort)
+
+
+class Command(BaseCommand):
+    help = "Move the images uploaded as uploads/<model>s_media_files/<slug>-<uuid> into the content-addressed storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--legacy-root",
+            default=settings.BASE_DIR,
+            help="Directory the old names are relative to, the working directory of the old deployment",
+        )
+
+    def handle(self, *args, **options):
+        legacy_root = Path(options["legacy_root"])
+        moved = 0
+        for model in IMAGE_MODELS:
+            for obj in model.objects.exclude(image="").exclude(image__isnull=True).only("id", "image"):
+                if ContentAddressedStorage.is_content_name(obj.image.name):
+                    continue
+                legacy_path = legacy_root / obj.image.name
+                if not legacy_path.is_file():
+                    self.stderr.write(f"{model.__name__} {obj.id}: {legacy_path} not found")
+                    continue
+
+                with legacy_path.open("rb") as file:
+                    name = default_storage.save(obj.image.name, File(file))
+                obj.image = name
+                obj.image_variants = {}
+                with transaction.atomic():
+                    obj.save(update_fields=["image", "image_variants"])
+                    enqueue("make_image_variants", model=model._meta.label_lower, pk=obj.id, image=name)
+                moved += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} images"))
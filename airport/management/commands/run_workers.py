@@ -0,0 +1,31 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management import BaseCommand
+from django.db import connections
+
+from airport.jobs import work
+
+
+class Command(BaseCommand):
+    help = "Run the background jobs of airport.jobs in a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=2, help="1 runs the jobs in this process")
+        parser.add_argument("--batch-size", type=int, default=10, help="Jobs claimed at once by a worker")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait for new jobs")
+        parser.add_argument("--once", action="store_true", help="Stop when there are no jobs to run")
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        arguments = (options["batch_size"], options["poll_interval"], options["once"])
+
+        if processes <= 1:
+            done = work(*arguments)
+        else:
+            # every worker opens its own database connection
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=processes, initializer=django.setup) as pool:
+                done = sum(pool.map(work, *([argument] * processes for argument in arguments)))
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {done} jobs"))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from airport.seat_map import SeatLayout, bitmap_to_bytes
+
+
+def build_flight_inventories(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    Flight = apps.get_model("airport", "Flight")
+    FlightInventory = apps.get_model("airport", "FlightInventory")
+    Ticket = apps.get_model("airport", "Ticket")
+
+    inventories = []
+    for flight in Flight.objects.using(db_alias).select_related("airplane"):
+        layout = SeatLayout.for_airplane(flight.airplane)
+        taken_seats = Ticket.objects.using(db_alias).filter(flight=flight).values_list("row", "letter")
+        inventories.append(
+            FlightInventory(flight=flight, occupied_seats=bitmap_to_bytes(layout.to_bitmap(taken_seats)))
+        )
+    FlightInventory.objects.using(db_alias).bulk_create(inventories)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0002_remove_ticket_identify"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FlightInventory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("occupied_seats", models.BinaryField(default=bytes)),
+                (
+                    "flight",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inventory",
+                        to="airport.flight",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(build_flight_inventories, migrations.RunPython.noop),
+    ]
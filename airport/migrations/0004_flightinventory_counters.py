@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:34
+
+from django.db import migrations, models
+
+from airport.seat_map import SeatLayout, bitmap_from_bytes
+
+
+def count_taken_seats(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    FlightInventory = apps.get_model("airport", "FlightInventory")
+
+    inventories = list(FlightInventory.objects.using(db_alias).select_related("flight__airplane"))
+    for inventory in inventories:
+        layout = SeatLayout.for_airplane(inventory.flight.airplane)
+        occupied = bitmap_from_bytes(inventory.occupied_seats)
+        rows_economy_from = inventory.flight.rows_economy_from
+        inventory.total_seats = layout.capacity
+        inventory.business_taken = layout.count_taken(occupied, 1, rows_economy_from)
+        inventory.economy_taken = layout.count_taken(occupied, rows_economy_from + 1, layout.rows)
+    FlightInventory.objects.using(db_alias).bulk_update(
+        inventories, ["total_seats", "business_taken", "economy_taken"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0003_flightinventory"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="flightinventory",
+            name="business_taken",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="flightinventory",
+            name="economy_taken",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="flightinventory",
+            name="total_seats",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_taken_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0004_flightinventory_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["departure_time", "id"], name="flight_departure_keyset_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:39
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+
+def store_price_breakdown(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    Ticket = apps.get_model("airport", "Ticket")
+    cents = Decimal("0.01")
+
+    tickets = list(
+        Ticket.objects.using(db_alias).filter(flight__isnull=False)
+        .select_related("flight", "meal_option")
+        .prefetch_related("extra_entertainment_and_comfort", "snacks_and_drinks")
+    )
+    for ticket in tickets:
+        fare_price = ticket.flight.price_business if ticket.is_business else ticket.flight.price_economy
+        extras_price = sum(extra.price for extra in ticket.extra_entertainment_and_comfort.all())
+        extras_price += sum(snack.price for snack in ticket.snacks_and_drinks.all())
+        if ticket.meal_option:
+            extras_price += ticket.meal_option.price
+
+        ticket.fare_price = Decimal(fare_price).quantize(cents, rounding=ROUND_HALF_UP)
+        ticket.extras_price = Decimal(extras_price).quantize(cents, rounding=ROUND_HALF_UP)
+        if ticket.has_luggage and ticket.luggage_weight is not None:
+            luggage_price = ticket.luggage_weight * ticket.flight.luggage_price_1_kg
+            ticket.luggage_price = luggage_price.quantize(cents, rounding=ROUND_HALF_UP)
+    Ticket.objects.using(db_alias).bulk_update(tickets, ["fare_price", "extras_price", "luggage_price"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0005_flight_departure_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticket",
+            name="extras_price",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=10, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="fare_price",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=10, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="luggage_price",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=10, null=True
+            ),
+        ),
+        migrations.RunPython(store_price_breakdown, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:42
+
+from django.conf import settings
+from itertools import groupby
+
+from django.db import migrations, models
+
+
+def write_order_summaries(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    Order = apps.get_model("airport", "Order")
+    Ticket = apps.get_model("airport", "Ticket")
+
+    tickets = (
+        Ticket.objects.using(db_alias).filter(order__isnull=False)
+        .select_related("flight__route__source", "flight__route__destination")
+        .order_by("order_id")
+    )
+    orders = []
+    for order_id, order_tickets in groupby(tickets, key=lambda ticket: ticket.order_id):
+        order_tickets = list(order_tickets)
+        flights = sorted(
+            {ticket.flight for ticket in order_tickets if ticket.flight is not None},
+            key=lambda flight: (flight.departure_time, flight.id)
+        )
+        order = Order(pk=order_id, tickets_count=len(order_tickets))
+        if flights:
+            order.source_city = flights[0].route.source.closest_big_city
+            order.destination_city = flights[-1].route.destination.closest_big_city
+            order.first_departure = flights[0].departure_time
+            order.last_departure = flights[-1].departure_time
+        orders.append(order)
+    Order.objects.using(db_alias).bulk_update(
+        orders,
+        ["tickets_count", "source_city", "destination_city", "first_departure", "last_departure"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0006_ticket_price_breakdown"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="destination_city",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="first_departure",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="last_departure",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="source_city",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="tickets_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["user", "id"], name="order_user_id_idx"),
+        ),
+        migrations.RunPython(write_order_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:44
+
+from django.db import migrations, models
+
+CATALOGS = (
+    "airport.mealoption",
+    "airport.snacksanddrinks",
+    "airport.extraentertainmentandcomfort",
+    "airport.airplanetype",
+    "airport.airport",
+)
+
+
+def create_catalog_versions(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    CatalogVersion = apps.get_model("airport", "CatalogVersion")
+    CatalogVersion.objects.using(db_alias).bulk_create([CatalogVersion(name=name, version=1) for name in CATALOGS])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0007_order_summary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("version", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_catalog_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0008_catalog_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="flightinventory",
+            name="version",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
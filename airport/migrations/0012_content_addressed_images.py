@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0011_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="airplane",
+            name="image",
+            field=models.ImageField(blank=True, null=True, upload_to=""),
+        ),
+        migrations.AlterField(
+            model_name="crew",
+            name="image",
+            field=models.ImageField(blank=True, null=True, upload_to=""),
+        ),
+        migrations.AlterField(
+            model_name="extraentertainmentandcomfort",
+            name="image",
+            field=models.ImageField(blank=True, null=True, upload_to=""),
+        ),
+        migrations.AlterField(
+            model_name="mealoption",
+            name="image",
+            field=models.ImageField(blank=True, null=True, upload_to=""),
+        ),
+        migrations.AlterField(
+            model_name="snacksanddrinks",
+            name="image",
+            field=models.ImageField(blank=True, null=True, upload_to=""),
+        ),
+    ]
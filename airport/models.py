@@ -3,13 +3,17 @@ import uuid
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.text import slugify
 
+from airport.seat_map import SeatLayout, bitmap_from_bytes, bitmap_to_bytes
 from airport.validators import validate_discount_coupon_code, validate_discount_date
 
 
+# kept for the old migrations, the storage names the uploads by their content now
 def create_custom_path(instance, filename):
     _, extension = os.path.splitext(filename)
     model_lower = str(instance.__class__.__name__).lower() + "s_media_files"
@@ -36,7 +40,8 @@ class Airplane(models.Model):
         on_delete=models.CASCADE,
         related_name="airplanes",
     )
-    image = models.ImageField(null=True, blank=True, upload_to=create_custom_path)
+    image = models.ImageField(null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     @property
     def capacity(self) -> int:
@@ -91,7 +96,8 @@ class Crew(models.Model):
     first_name = models.CharField(max_length=125)
     last_name = models.CharField(max_length=125)
     position = models.CharField(max_length=50, choices=POSITIONS_CHOICES)
-    image = models.ImageField(null=True, blank=True, upload_to=create_custom_path)
+    image = models.ImageField(null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return (
@@ -131,6 +137,9 @@ class Flight(models.Model):
 
     class Meta:
         ordering = ["departure_time"]
+        indexes = [
+            models.Index(fields=["departure_time", "id"], name="flight_departure_keyset_idx"),
+        ]
 
     def __str__(self):
         return f"{self.route.source.name} -> {self.route.destination.name}"
@@ -144,18 +153,54 @@ class Order(models.Model):
         related_name="orders"
     )
     total_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # summary of the tickets for the order list, written with the tickets
+    tickets_count = models.PositiveIntegerField(default=0)
+    source_city = models.CharField(max_length=255, blank=True)
+    destination_city = models.CharField(max_length=255, blank=True)
+    first_departure = models.DateTimeField(null=True, blank=True)
+    last_departure = models.DateTimeField(null=True, blank=True)
+
+    SUMMARY_FIELDS = ["tickets_count", "source_city", "destination_city", "first_departure", "last_departure"]
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "id"], name="order_user_id_idx"),
+        ]
 
     def __str__(self):
         return str(self.created_at.strftime("%Y-%m-%d %H:%M"))
 
+    def set_summary(self, tickets) -> None:
+        # the tickets need their flights with the route airports
+        flights = sorted(
+            {ticket.flight for ticket in tickets if ticket.flight is not None},
+            key=lambda flight: (flight.departure_time, flight.id)
+        )
+        self.tickets_count = len(tickets)
+        self.source_city = flights[0].route.source.closest_big_city if flights else ""
+        self.destination_city = flights[-1].route.destination.closest_big_city if flights else ""
+        self.first_departure = flights[0].departure_time if flights else None
+        self.last_departure = flights[-1].departure_time if flights else None
+
+    @staticmethod
+    def refresh_summary(order_id) -> None:
+        tickets = list(
+            Ticket.objects.filter(order_id=order_id)
+            .select_related("flight__route__source", "flight__route__destination")
+        )
+        order = Order(pk=order_id)
+        order.set_summary(tickets)
+        Order.objects.filter(pk=order_id).update(
+            **{field: getattr(order, field) for field in Order.SUMMARY_FIELDS}
+        )
+
 
 class SnacksAndDrinks(models.Model):
     name = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=8, decimal_places=2)
-    image = models.ImageField(null=True, blank=True, upload_to=create_custom_path)
+    image = models.ImageField(null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.name}, PRICE={self.price}$"
@@ -176,7 +221,8 @@ class MealOption(models.Model):
     )
     weight = models.IntegerField(blank=True, null=True)
     price = models.DecimalField(max_digits=6, decimal_places=2)
-    image = models.ImageField(null=True, blank=True, upload_to=create_custom_path)
+    image = models.ImageField(null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return f"Name: {self.name}, type: {self.get_meal_type_display()}, weight: {self.weight}, PRICE={self.price}$"
@@ -187,7 +233,8 @@ class ExtraEntertainmentAndComfort(models.Model):
         max_length= 55,
     )
     price = models.DecimalField(max_digits=8, decimal_places=2)
-    image = models.ImageField(null=True, blank=True, upload_to=create_custom_path)
+    image = models.ImageField(null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.name} -> {self.price}$"
@@ -233,6 +280,10 @@ class Ticket(models.Model):
         null=True,
     )
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # price components before the discount, written when the order is priced
+    fare_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    luggage_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    extras_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     meal_option = models.ForeignKey(
         MealOption,
         on_delete=models.SET_NULL,
@@ -288,6 +339,12 @@ class Ticket(models.Model):
             code=self.discount_coupon.code,
             error_to_raise=ValidationError
         )
+        # the API refuses the seat with a 409 when acquiring it, tickets saved one by one (admin) are checked here
+        held = SeatHold.objects.filter(
+            flight_id=self.flight_id, row=self.row, letter=self.letter, expires_at__gt=timezone.now()
+        ).exclude(user_id=self.order.user_id if self.order_id else None)
+        if held.exists():
+            raise ValidationError(f"The seat {self.row}{self.letter} is held by another user")
 
     def save(
         self,
@@ -305,3 +362,342 @@ class Ticket(models.Model):
     class Meta:
         ordering = ["row", "letter"]
         unique_together = ("flight", "letter", "row")
+
+
+class FlightInventory(models.Model):
+    flight = models.OneToOneField(
+        Flight,
+        on_delete=models.CASCADE,
+        related_name="inventory"
+    )
+    # one bit per seat, see airport.seat_map.SeatLayout for the numbering
+    occupied_seats = models.BinaryField(default=bytes)
+    total_seats = models.IntegerField(default=0)
+    business_taken = models.IntegerField(default=0)
+    economy_taken = models.IntegerField(default=0)
+    # grows on every change of the seats or of the flight detail, served as its ETag
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Inventory of flight {self.flight_id}"
+
+    @property
+    def occupied(self) -> int:
+        return bitmap_from_bytes(self.occupied_seats)
+
+    @property
+    def places_available(self) -> int:
+        return self.total_seats - self.business_taken - self.economy_taken
+
+    def set_occupied(self, occupied: int):
+        layout = SeatLayout.for_airplane(self.flight.airplane)
+        rows_economy_from = self.flight.rows_economy_from
+        self.occupied_seats = bitmap_to_bytes(occupied)
+        self.total_seats = layout.capacity
+        self.business_taken = layout.count_taken(occupied, 1, rows_economy_from)
+        self.economy_taken = layout.count_taken(occupied, rows_economy_from + 1, layout.rows)
+        self.version += 1
+
+    @staticmethod
+    def rebuild(flight):
+        layout = SeatLayout.for_airplane(flight.airplane)
+        with transaction.atomic():
+            # locked before the seats are read, a booking acquiring seats meanwhile is waited for
+            inventory = FlightInventory.lock([flight.id]).first()
+            if inventory is None:
+                inventory, _ = FlightInventory.objects.get_or_create(flight=flight)
+            taken_seats = Ticket.objects.filter(flight=flight).order_by().values_list("row", "letter").union(
+                SeatHold.objects.filter(flight=flight).order_by().values_list("row", "letter"), all=True
+            )
+            inventory.flight = flight
+            inventory.set_occupied(layout.to_bitmap(taken_seats))
+            inventory.save()
+        return inventory
+
+    @staticmethod
+    def bump_versions(flights):
+        FlightInventory.objects.filter(flight__in=flights.values("id")).update(version=models.F("version") + 1)
+
+    @staticmethod
+    def seats_by_flight(tickets) -> dict:
+        seats_by_flight = {}
+        for ticket in tickets:
+            if ticket.flight_id is not None:
+                seats_by_flight.setdefault(ticket.flight_id, []).append((ticket.row, ticket.letter))
+        return seats_by_flight
+
+    @staticmethod
+    def lock(flight_ids):
+        # always in the same order, so two transactions locking several flights never wait for each other;
+        # only the inventory rows, the joined flight and airplane rows are shared by the other flights
+        return (
+            FlightInventory.objects.select_for_update(of=("self",))
+            .select_related("flight__airplane")
+            .filter(flight_id__in=flight_ids)
+            .order_by("flight_id")
+        )
+
+    @staticmethod
+    def _change_seats(tickets, occupy: bool):
+        seats_by_flight = FlightInventory.seats_by_flight(tickets)
+
+        with transaction.atomic():
+            for inventory in FlightInventory.lock(seats_by_flight):
+                layout = SeatLayout.for_airplane(inventory.flight.airplane)
+                seats = layout.to_bitmap(seats_by_flight[inventory.flight_id])
+                if occupy:
+                    inventory.set_occupied(inventory.occupied | seats)
+                else:
+                    inventory.set_occupied(inventory.occupied & ~seats)
+                inventory.save()
+
+    @staticmethod
+    def acquire(tickets, user=None) -> list:
+        """
+        Occupies the seats of the tickets, locking their flight inventories
+        until the end of the transaction (call it inside one). The holds of
+        ``user`` and the expired ones on the seats are consumed. When some
+        seats were taken by another booking nothing is occupied and they are
+        returned as (flight_id, row, letter).
+        """
+        seats_by_flight = FlightInventory.seats_by_flight(tickets)
+        inventories = list(FlightInventory.lock(seats_by_flight))
+
+        taken = []
+        changes = []
+        for inventory in inventories:
+            layout = SeatLayout.for_airplane(inventory.flight.airplane)
+            seats = seats_by_flight[inventory.flight_id]
+            occupied = inventory.occupied
+            taken += [
+                (inventory.flight_id, row, letter)
+                for row, letter in seats
+                if occupied >> layout.bit(row, letter) & 1
+            ]
+            changes.append((inventory, occupied | layout.to_bitmap(seats)))
+        if taken:
+            reclaimed = SeatHold.reclaim(taken, user)
+            taken = [seat for seat in taken if seat not in reclaimed]
+        if taken:
+            return taken
+
+        for inventory, occupied in changes:
+            inventory.set_occupied(occupied)
+            inventory.save()
+        return []
+
+    @staticmethod
+    def occupy(tickets):
+        FlightInventory._change_seats(tickets, occupy=True)
+
+    @staticmethod
+    def release(tickets):
+        FlightInventory._change_seats(tickets, occupy=False)
+
+
+class SeatHold(models.Model):
+    """
+    A seat reserved by a user for ``SEAT_HOLD_SECONDS`` during the checkout.
+    The seat is set in the flight inventory like a sold one, until the hold
+    is released, consumed by an order of the user or expired by the
+    ``expire_seat_holds`` command.
+    """
+
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name="seat_holds")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="seat_holds")
+    row = models.IntegerField()
+    letter = models.CharField(max_length=1)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["flight_id", "row", "letter"]
+        unique_together = ("flight", "letter", "row")
+
+    def __str__(self):
+        return f"{self.flight_id}, row: {self.row}, seat: {self.letter} held until {self.expires_at}"
+
+    @staticmethod
+    def seats_filter(seats) -> models.Q:
+        seats_filter = models.Q(pk__in=[])
+        for flight_id, row, letter in seats:
+            seats_filter |= models.Q(flight_id=flight_id, row=row, letter=letter)
+        return seats_filter
+
+    @staticmethod
+    def reclaimable(seats, user=None):
+        """The holds on the seats ((flight_id, row, letter)) that ``user`` may take over: its own and the expired"""
+        reclaimable = models.Q(expires_at__lte=timezone.now())
+        if user is not None:
+            reclaimable |= models.Q(user=user)
+        return SeatHold.objects.filter(SeatHold.seats_filter(seats)).filter(reclaimable)
+
+    @staticmethod
+    def reclaim(seats, user=None) -> set:
+        """
+        Deletes the reclaimable holds on the seats and returns their seats.
+        Their bits stay set in the inventory, so call it under its lock, for
+        seats that are occupied again right after.
+        """
+        holds = list(SeatHold.reclaimable(seats, user).values_list("id", "flight_id", "row", "letter"))
+        if holds:
+            SeatHold.objects.filter(id__in=[hold[0] for hold in holds]).delete()
+        return {hold[1:] for hold in holds}
+
+    @staticmethod
+    def hold(flight, user, seats, expires_at) -> list:
+        """
+        Holds the seats ((row, letter)) of the flight for the user until
+        ``expires_at``, renewing the holds the user has on them. When some
+        seats are taken nothing is held and they are returned as
+        (flight_id, row, letter).
+        """
+        with transaction.atomic():
+            inventory = FlightInventory.lock([flight.id]).get()
+            layout = SeatLayout.for_airplane(inventory.flight.airplane)
+            occupied = inventory.occupied
+            taken = [(flight.id, row, letter) for row, letter in seats if occupied >> layout.bit(row, letter) & 1]
+            if taken:
+                reclaimed = SeatHold.reclaim(taken, user)
+                taken = [seat for seat in taken if seat not in reclaimed]
+            if taken:
+                return taken
+
+            SeatHold.objects.bulk_create(
+                SeatHold(flight=flight, user=user, row=row, letter=letter, expires_at=expires_at)
+                for row, letter in seats
+            )
+            inventory.set_occupied(occupied | layout.to_bitmap(seats))
+            inventory.save()
+        return []
+
+    @staticmethod
+    def release(flight, user, seats=None) -> list:
+        """Releases the holds of the user on the flight (on ``seats`` only, when given), returns their seats"""
+        with transaction.atomic():
+            inventories = list(FlightInventory.lock([flight.id]))
+            holds = SeatHold.objects.filter(flight=flight, user=user)
+            if seats is not None:
+                holds = holds.filter(SeatHold.seats_filter((flight.id, row, letter) for row, letter in seats))
+            holds = list(holds)
+            if holds:
+                SeatHold.objects.filter(id__in=[hold.id for hold in holds]).delete()
+                SeatHold.free(inventories, holds)
+        return [(hold.row, hold.letter) for hold in holds]
+
+    @staticmethod
+    def expire(batch_size=500) -> int:
+        """Deletes the expired holds and frees their seats, ``batch_size`` flights per transaction"""
+        now = timezone.now()
+        expired = SeatHold.objects.filter(expires_at__lte=now)
+        flight_ids = list(expired.order_by("flight_id").values_list("flight_id", flat=True).distinct())
+
+        count = 0
+        for start in range(0, len(flight_ids), batch_size):
+            with transaction.atomic():
+                batch = flight_ids[start:start + batch_size]
+                # locked first, an order may be taking over these holds meanwhile
+                inventories = list(FlightInventory.lock(batch))
+                holds = list(expired.filter(flight_id__in=batch))
+                expired.filter(flight_id__in=batch).delete()
+                SeatHold.free(inventories, holds)
+                count += len(holds)
+        return count
+
+    @staticmethod
+    def free(inventories, holds):
+        """Clears the seats of the deleted holds in their locked inventories"""
+        seats_by_flight = FlightInventory.seats_by_flight(holds)
+        for inventory in inventories:
+            if inventory.flight_id in seats_by_flight:
+                layout = SeatLayout.for_airplane(inventory.flight.airplane)
+                inventory.set_occupied(inventory.occupied & ~layout.to_bitmap(seats_by_flight[inventory.flight_id]))
+                inventory.save()
+
+
+class CatalogVersion(models.Model):
+    # one row per catalog model, bumped on every write so cached responses can be keyed by it
+    name = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    @staticmethod
+    def current(model) -> int:
+        version = (
+            CatalogVersion.objects.filter(name=model._meta.label_lower)
+            .values_list("version", flat=True)
+            .first()
+        )
+        return version or 0
+
+    @staticmethod
+    def bump(model):
+        name = model._meta.label_lower
+        if not CatalogVersion.objects.filter(name=name).update(version=models.F("version") + 1):
+            CatalogVersion.objects.get_or_create(name=name, defaults={"version": 1})
+
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("DONE", "Done"),
+        ("FAILED", "Failed")
+    ]
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="PENDING")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["run_after", "id"]
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="job_status_run_after_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    The answer to a request sent with an ``Idempotency-Key`` header, kept
+    until ``expires_at`` so that a retry of the request gets it again
+    instead of being run twice. ``fingerprint`` hashes the method, path and
+    body: the key cannot be reused for another request. Expired keys are
+    deleted by the ``expire_idempotency_keys`` command.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "key")
+
+    def __str__(self):
+        return f"{self.key} of user {self.user_id} until {self.expires_at}"
+
+    @staticmethod
+    def expire(batch_size=1000) -> int:
+        """Deletes the expired keys, ``batch_size`` per query"""
+        now = timezone.now()
+        count = 0
+        while True:
+            ids = list(
+                IdempotencyKey.objects.filter(expires_at__lte=now).order_by().values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return count
+            count += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
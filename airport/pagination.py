@@ -0,0 +1,173 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Cursor pagination that filters on the full ``ordering`` tuple
+    (``WHERE (a, b) > (last_a, last_b)``), so every page costs the same
+    index range scan and no COUNT is run. All ``ordering`` fields are
+    ascending and together must be unique.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("id",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position, reverse = cursor["p"], bool(cursor["r"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        # isoformat() keeps the microseconds of datetimes, DjangoJSONEncoder would cut them
+        cursor = json.dumps({"p": position, "r": reverse}, default=lambda value: value.isoformat())
+        encoded = base64.urlsafe_b64encode(cursor.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def position_filter(self, position, reverse):
+        lookup = "lt" if reverse else "gt"
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            equal = {name: value for name, value in zip(self.ordering[:index], position[:index])}
+            conditions.append(Q(**equal, **{f"{field}__{lookup}": position[index]}))
+        return reduce(or_, conditions)
+
+    def position_of(self, instance):
+        return [getattr(instance, field) for field in self.ordering]
+
+    def get_page_queryset(self, queryset, request):
+        self.base_url = remove_query_param(request.build_absolute_uri(), self.cursor_query_param)
+        self.limit = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request)
+
+        if self.reverse:
+            queryset = queryset.order_by(*(f"-{field}" for field in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.position_filter(self.position, self.reverse))
+        # one more row tells if there is a next page
+        return queryset[:self.limit + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        try:
+            results = list(self.get_page_queryset(queryset, request))
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        return self.set_page(results)
+
+    async def apaginate_queryset(self, queryset, request):
+        try:
+            results = [instance async for instance in self.get_page_queryset(queryset, request)]
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        return self.set_page(results)
+
+    def set_page(self, results):
+        position, reverse = self.position, self.reverse
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results:
+            first, last = self.position_of(results[0]), self.position_of(results[-1])
+            if has_more or position is not None:
+                if reverse:
+                    self.next_position = last
+                    self.previous_position = first if has_more else None
+                else:
+                    self.next_position = last if has_more else None
+                    self.previous_position = first if position is not None else None
+        elif reverse:
+            self.next_position = position
+        return results
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {
+                    "type": "string",
+                    "nullable": True,
+                    "format": "uri",
+                    "example": "http://api.example.org/accounts/?cursor=eyJwIjogWzFdLCAiciI6IGZhbHNlfQ==",
+                },
+                "previous": {
+                    "type": "string",
+                    "nullable": True,
+                    "format": "uri",
+                    "example": "http://api.example.org/accounts/?cursor=eyJwIjogWzFdLCAiciI6IHRydWV9",
+                },
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Number of results to return per page (max {self.max_page_size}).",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class FlightCursorPagination(KeysetCursorPagination):
+    ordering = ("departure_time", "id")
@@ -11,12 +11,16 @@ from airport.example_swagger_dicts.dicts_flight_examples import (
     dict_retrieve_example,
     errors_when_there_are_not_fields_provided,
     dict_flight_list_example,
-    dict_flight_update_empty_example
+    dict_flight_update_empty_example,
+    dict_seat_map_example
 )
 from airport.serializers import (
     FlightSerializer,
     FlightRetrieveSerializer,
-    FlightListSerializer
+    FlightListSerializer,
+    FlightSeatMapSerializer,
+    SeatHoldSerializer,
+    SeatReleaseSerializer
 )
 
 
@@ -102,6 +106,7 @@ flight_schema = extend_schema_view(
         tags=["flight"],
         responses={
             200: FlightRetrieveSerializer,
+            304: OpenApiResponse(description="The Flight did not change since the ETag sent in If-None-Match"),
             404: OpenApiResponse(description="No Flight matches the given query.")
         },
         examples=[
@@ -113,6 +118,81 @@ flight_schema = extend_schema_view(
             )
         ]
     ),
+    seat_map=extend_schema(
+        summary="Get the seat map of a Flight",
+        description="Returns the seat layout (rows, seat letters, aisles), the business and economy "
+                    "cabins with their free seats count and the occupied seats. "
+                    "With encoding=rle (default) every row is a list of alternating run lengths that starts "
+                    "with free seats, consecutive equal rows are merged into [repeat, runs] pairs. "
+                    "With encoding=packed the occupied seats are a base64 little-endian bitmap, "
+                    "bit (row - 1) * len(letters) + position of the letter is set when the seat is taken.",
+        tags=["flight"],
+        parameters=[
+            OpenApiParameter(
+                name="encoding", description="Occupancy encoding: rle (default) or packed",
+                required=False, type=str, enum=["rle", "packed"]
+            )
+        ],
+        responses={
+            200: FlightSeatMapSerializer,
+            400: OpenApiResponse(description="Unknown encoding"),
+            404: OpenApiResponse(description="No Flight matches the given query.")
+        },
+        examples=[
+            OpenApiExample(
+                "Seat Map Example",
+                value=dict_seat_map_example,
+                response_only=True
+            )
+        ]
+    ),
+    hold=extend_schema(
+        summary="Hold seats of a Flight during the checkout",
+        description="Reserves the seats for the user for SEAT_HOLD_SECONDS (5 minutes by default). "
+                    "Held seats are taken in the availability and the seat map of everybody; an order of the "
+                    "user for them takes them over. Holding a seat again renews its hold. "
+                    "A user holds at most SEAT_HOLD_MAX_SEATS seats at once, on all the flights.",
+        tags=["flight"],
+        request=SeatHoldSerializer,
+        responses={
+            201: OpenApiResponse(
+                description="The seats are held",
+                examples=[
+                    OpenApiExample(
+                        "Held seats",
+                        value={"flight": 1, "seats": [{"row": 5, "letter": "C"}],
+                               "expires_at": "2025-09-01T10:05:00Z"},
+                    )
+                ]
+            ),
+            400: OpenApiResponse(description="A seat does not exist, is given twice or too many seats are held"),
+            409: OpenApiResponse(
+                description="Some seats are taken, nothing is held",
+                examples=[
+                    OpenApiExample(
+                        "Taken seats",
+                        value={"detail": "Some of the seats are already taken.",
+                               "conflicting_seats": [{"flight": 1, "row": 5, "letter": "C"}]},
+                    )
+                ]
+            ),
+            404: OpenApiResponse(description="No Flight matches the given query.")
+        },
+    ),
+    release=extend_schema(
+        summary="Release held seats of a Flight",
+        description="Releases the holds of the user on the given seats, or on all the seats of the flight "
+                    "when no seats are given.",
+        tags=["flight"],
+        request=SeatReleaseSerializer,
+        responses={
+            200: OpenApiResponse(
+                description="The released seats",
+                examples=[OpenApiExample("Released seats", value={"flight": 1, "seats": [{"row": 5, "letter": "C"}]})]
+            ),
+            404: OpenApiResponse(description="No Flight matches the given query.")
+        },
+    ),
     update=extend_schema(
         summary="Update a Flight completely",
         description="Fully update all Flight fields by provided data",
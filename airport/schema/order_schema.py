@@ -1,4 +1,11 @@
-from drf_spectacular.utils import OpenApiExample, OpenApiResponse, extend_schema, extend_schema_view
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    OpenApiExample,
+    OpenApiParameter,
+    OpenApiResponse,
+    extend_schema,
+    extend_schema_view
+)
 
 from airport.example_swagger_dicts.dict_order_retrieve_example import (
     example_order_retrieve_dict
@@ -33,7 +40,9 @@ order_schema = extend_schema_view(
                     },
                     "count_of_tickets": 1,
                     "source": "New York City",
-                    "destination": "London"
+                    "destination": "London",
+                    "first_departure": "2025-06-02T08:15:00Z",
+                    "last_departure": "2025-06-02T08:15:00Z"
                 }
             )
         ]
@@ -61,8 +70,20 @@ order_schema = extend_schema_view(
                         status_codes=["400"]
                     )
                 ]
-            )
+            ),
+            422: OpenApiResponse(description="The Idempotency-Key was already used for another request")
         },
+        parameters=[
+            OpenApiParameter(
+                "Idempotency-Key",
+                OpenApiTypes.STR,
+                OpenApiParameter.HEADER,
+                description=(
+                    "Any unique string (e.g. a UUID) of 1 to 255 characters. A retry with the same key and body "
+                    "gets the answer of the first request (with Idempotent-Replayed: true) instead of a new order"
+                )
+            )
+        ],
         examples=[
             OpenApiExample(
                 "Create new Order Example",
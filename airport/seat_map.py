@@ -0,0 +1,149 @@
+import base64
+import functools
+
+
+class SeatLayout:
+    """
+    Maps the seats of an airplane onto the bits of an integer.
+
+    Seats are numbered row by row: bit ``(row - 1) * width + column`` is the
+    seat ``letter`` of ``row``, where ``column`` is the position of the letter
+    in ``letters_in_row`` with the spaces (aisles) removed.
+    """
+
+    def __init__(self, rows: int, letters_in_row: str):
+        self.rows = int(rows)
+        self.letters_in_row = letters_in_row
+        self.letters = letters_in_row.replace(" ", "")
+        self.width = len(self.letters)
+        self._columns = {letter: column for column, letter in enumerate(self.letters)}
+        self._row_letters = {}
+        self._row_runs = {}
+
+    @classmethod
+    def for_airplane(cls, airplane) -> "SeatLayout":
+        return _cached_layout(airplane.rows, airplane.letters_in_row)
+
+    @property
+    def capacity(self) -> int:
+        return self.rows * self.width
+
+    @property
+    def aisles(self) -> list[int]:
+        # number of seats in front of every aisle, "ABC DEF" -> [3]
+        aisles = []
+        seats = 0
+        for letter in self.letters_in_row.strip():
+            if letter == " ":
+                if not aisles or aisles[-1] != seats:
+                    aisles.append(seats)
+            else:
+                seats += 1
+        return aisles
+
+    def bit(self, row: int, letter: str) -> int | None:
+        column = self._columns.get(letter)
+        if column is None or not (1 <= row <= self.rows):
+            return None
+        return (row - 1) * self.width + column
+
+    def seat(self, bit: int) -> tuple[int, str]:
+        row, column = divmod(bit, self.width)
+        return row + 1, self.letters[column]
+
+    def rows_mask(self, first_row: int, last_row: int) -> int:
+        first_row = max(first_row, 1)
+        last_row = min(last_row, self.rows)
+        if first_row > last_row:
+            return 0
+        size = (last_row - first_row + 1) * self.width
+        return ((1 << size) - 1) << ((first_row - 1) * self.width)
+
+    def to_bitmap(self, seats) -> int:
+        bitmap = 0
+        for row, letter in seats:
+            bit = self.bit(row, letter)
+            if bit is not None:
+                bitmap |= 1 << bit
+        return bitmap
+
+    def _letters_of(self, row_bits: int) -> tuple[str, ...]:
+        letters = self._row_letters.get(row_bits)
+        if letters is None:
+            letters = tuple(letter for column, letter in enumerate(self.letters) if row_bits >> column & 1)
+            self._row_letters[row_bits] = letters
+        return letters
+
+    def runs_of(self, row_bits: int) -> tuple[int, ...]:
+        runs = self._row_runs.get(row_bits)
+        if runs is None:
+            runs = []
+            taken = False
+            length = 0
+            for column in range(self.width):
+                if bool(row_bits >> column & 1) != taken:
+                    runs.append(length)
+                    taken = not taken
+                    length = 0
+                length += 1
+            runs.append(length)
+            runs = tuple(runs)
+            self._row_runs[row_bits] = runs
+        return runs
+
+    def free_seats(self, occupied: int, first_row: int, last_row: int) -> list[dict]:
+        first_row = max(first_row, 1)
+        last_row = min(last_row, self.rows)
+        full_row = (1 << self.width) - 1
+        free = ~occupied >> ((first_row - 1) * self.width)
+        seats = []
+        for row in range(first_row, last_row + 1):
+            for letter in self._letters_of(free & full_row):
+                seats.append({"row": row, "letter": letter})
+            free >>= self.width
+        return seats
+
+    def count_free(self, occupied: int, first_row: int, last_row: int) -> int:
+        return (~occupied & self.rows_mask(first_row, last_row)).bit_count()
+
+    def count_taken(self, occupied: int, first_row: int, last_row: int) -> int:
+        return (occupied & self.rows_mask(first_row, last_row)).bit_count()
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_layout(rows: int, letters_in_row: str) -> SeatLayout:
+    return SeatLayout(rows, letters_in_row)
+
+
+def encode_run_lengths(layout: SeatLayout, occupied: int) -> list[list]:
+    """
+    Every row is a list of alternating run lengths that starts with free
+    seats, e.g. [2, 1, 3] is two free seats, one taken seat and three free
+    seats. Equal consecutive rows are merged into ``[repeat, runs]`` pairs.
+    """
+    full_row = (1 << layout.width) - 1
+    encoded = []
+    for _ in range(layout.rows):
+        runs = layout.runs_of(occupied & full_row)
+        if encoded and encoded[-1][1] == runs:
+            encoded[-1][0] += 1
+        else:
+            encoded.append([1, runs])
+        occupied >>= layout.width
+    return [[repeat, list(runs)] for repeat, runs in encoded]
+
+
+def encode_packed(layout: SeatLayout, occupied: int) -> str:
+    size = (layout.capacity + 7) // 8
+    occupied &= (1 << layout.capacity) - 1
+    return base64.b64encode(occupied.to_bytes(size, "little")).decode()
+
+
+def bitmap_to_bytes(bitmap: int) -> bytes:
+    return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+
+
+def bitmap_from_bytes(value) -> int:
+    if not value:
+        return 0
+    return int.from_bytes(bytes(value), "little")
@@ -1,10 +1,16 @@
 from decimal import Decimal, ROUND_HALF_UP
 from django.utils import timezone
 
-from django.db import transaction
-from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
-
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import prefetch_related_objects
+from drf_spectacular.utils import extend_schema_field
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, ValidationError
+
+from airport.jobs import enqueue
 from airport.models import (
     MealOption,
     SnacksAndDrinks,
@@ -17,14 +23,51 @@ from airport.models import (
     Flight,
     Ticket,
     Order,
-    DiscountCoupon
+    DiscountCoupon,
+    FlightInventory,
+    SeatHold
 )
+from airport.seat_map import SeatLayout, encode_packed, encode_run_lengths
+from airport_api.metrics import BOOKING_CONFLICTS
 from user.serializers import UserOnlyIdAndNameSerializer
 
 # discount for children's tickets in our company 0-100
 DISCOUNT_FOR_CHILDREN = 50
 
 
+class SeatConflict(APIException):
+    """409 with the seats that another booking has taken, as (flight_id, row, letter)"""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Some of the seats are already taken."
+    default_code = "seat_conflict"
+
+    def __init__(self, seats):
+        super().__init__()
+        self.detail = {
+            "detail": self.default_detail,
+            "conflicting_seats": [
+                {"flight": flight_id, "row": row, "letter": letter} for flight_id, row, letter in seats
+            ],
+        }
+
+
+@extend_schema_field({"type": "object", "additionalProperties": {"type": "string"}})
+class ImageSrcsetField(serializers.ReadOnlyField):
+    """The resized copies of an image as srcset strings by format, e.g. {"webp": ".../a-160w.webp 160w, ..."}"""
+
+    def to_representation(self, variants):
+        request = self.context.get("request")
+        srcset = {}
+        for image_format, names in variants.items():
+            candidates = []
+            for width, name in sorted(names.items(), key=lambda variant: int(variant[0])):
+                url = default_storage.url(name)
+                candidates.append(f"{request.build_absolute_uri(url) if request else url} {width}w")
+            srcset[image_format] = ", ".join(candidates)
+        return srcset
+
+
 class DiscountCouponSerializer(serializers.ModelSerializer):
     class Meta:
         model = DiscountCoupon
@@ -38,9 +81,11 @@ class DiscountOnlyValueAndNameSerializer(serializers.ModelSerializer):
 
 
 class MealOptionSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source="image_variants")
+
     class Meta:
         model = MealOption
-        fields = ("id", "name", "meal_type", "weight", "price", "image")
+        fields = ("id", "name", "meal_type", "weight", "price", "image", "image_srcset")
 
 
 class MealOptionImageSerializer(serializers.ModelSerializer):
@@ -50,9 +95,11 @@ class MealOptionImageSerializer(serializers.ModelSerializer):
 
 
 class SnacksAndDrinksSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source="image_variants")
+
     class Meta:
         model = SnacksAndDrinks
-        fields = ("id", "name", "price", "image")
+        fields = ("id", "name", "price", "image", "image_srcset")
 
 
 class SnacksAndDrinksImageSerializer(serializers.ModelSerializer):
@@ -62,9 +109,11 @@ class SnacksAndDrinksImageSerializer(serializers.ModelSerializer):
 
 
 class ExtraEntertainmentAndComfortSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source="image_variants")
+
     class Meta:
         model = ExtraEntertainmentAndComfort
-        fields = ("id", "name", "price", "image")
+        fields = ("id", "name", "price", "image", "image_srcset")
 
 
 class ExtraEntertainmentAndComfortImageSerializer(serializers.ModelSerializer):
@@ -86,9 +135,11 @@ class AirportSourceAndDestinationOnlyCitySerializer(serializers.ModelSerializer)
 
 
 class CrewSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source="image_variants")
+
     class Meta:
         model = Crew
-        fields = ("id", "first_name", "last_name", "position", "image")
+        fields = ("id", "first_name", "last_name", "position", "image", "image_srcset")
 
 
 class CrewImageSerializer(serializers.ModelSerializer):
@@ -104,9 +155,11 @@ class AirplaneTypeSerializer(serializers.ModelSerializer):
 
 
 class AirplaneSerializer(serializers.ModelSerializer):
+    image_srcset = ImageSrcsetField(source="image_variants")
+
     class Meta:
         model = Airplane
-        fields =("id", "name", "rows", "letters_in_row", "airplane_type", "image")
+        fields =("id", "name", "rows", "letters_in_row", "airplane_type", "image", "image_srcset")
 
 
 class AirplaneImageSerializer(serializers.ModelSerializer):
@@ -145,7 +198,65 @@ class RouteSourceDestinationNamesSerializer(serializers.ModelSerializer):
         fields = ("distance", "source", "destination")
 
 
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves the primary key from the objects load_related_objects loaded
+    for all items at once, falls back to one query per value otherwise.
+    """
+
+    @property
+    def bulk_field_name(self) -> str:
+        if isinstance(self.parent, serializers.ManyRelatedField):
+            return self.parent.field_name
+        return self.field_name
+
+    def to_internal_value(self, data):
+        related_objects = self.context.get("related_objects", {}).get(self.bulk_field_name)
+        if related_objects is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if pk not in related_objects:
+            self.fail("does_not_exist", pk_value=data)
+        return related_objects[pk]
+
+
+def load_related_objects(serializer, items):
+    """
+    Loads the objects of every BulkPrimaryKeyRelatedField of ``serializer``
+    for all ``items`` (its input data) with one query per field.
+    """
+    related_objects = serializer.context.setdefault("related_objects", {})
+    for field_name, field in serializer.fields.items():
+        many = isinstance(field, serializers.ManyRelatedField)
+        if many:
+            field = field.child_relation
+        if not isinstance(field, BulkPrimaryKeyRelatedField) or field.read_only:
+            continue
+        to_python = field.get_queryset().model._meta.pk.to_python
+        ids = set()
+        for item in items:
+            if many and hasattr(item, "getlist"):
+                # form data
+                value = item.getlist(field_name)
+            else:
+                value = item.get(field_name) if isinstance(item, dict) else None
+            for pk in (value if isinstance(value, list) else [value]):
+                if pk is None or isinstance(pk, (bool, dict, list)):
+                    continue
+                try:
+                    ids.add(to_python(pk))
+                except (TypeError, ValueError, DjangoValidationError):
+                    continue
+        related_objects[field_name] = field.get_queryset().in_bulk(ids)
+
+
 class FlightSerializer(serializers.ModelSerializer):
+    crew = BulkPrimaryKeyRelatedField(many=True, queryset=Crew.objects.all())
 
     class Meta:
         model = Flight
@@ -162,11 +273,16 @@ class FlightSerializer(serializers.ModelSerializer):
             "luggage_price_1_kg"
         )
 
+    def to_internal_value(self, data):
+        # the whole crew in one query, not one per member
+        load_related_objects(self, [data])
+        return super().to_internal_value(data)
+
 
 class FlightListSerializer(FlightSerializer):
     route = RouteSourceDestinationNamesSerializer(read_only=True)
     airplane = AirplaneNameSerializer(read_only=True)
-    places_available = serializers.IntegerField(read_only=True)
+    places_available = serializers.IntegerField(source="inventory.places_available", read_only=True)
     business_places_available = serializers.SerializerMethodField(read_only=True)
     economy_places_available = serializers.SerializerMethodField(read_only=True)
 
@@ -184,37 +300,101 @@ class FlightListSerializer(FlightSerializer):
         )
 
     def get_business_places_available(self, obj) -> int:
-        return (obj.airplane.seats_in_row_count * obj.rows_economy_from) - obj.taken_business
+        return (obj.airplane.seats_in_row_count * obj.rows_economy_from) - obj.inventory.business_taken
 
     def get_economy_places_available(self, obj) -> int:
-        return (obj.airplane.seats_in_row_count * (obj.airplane.rows - obj.rows_economy_from)) - obj.economy_taken
+        return (
+            (obj.airplane.seats_in_row_count * (obj.airplane.rows - obj.rows_economy_from))
+            - obj.inventory.economy_taken
+        )
 
 
 class FlightRetrieveSerializer(FlightSerializer):
     crew = CrewSerializer(many=True, read_only=True)
     route = RouteListSerializer(read_only=True)
     airplane = AirplaneWithAirplaneType(read_only=True)
-    all_free_places = serializers.SerializerMethodField(read_only=True)
 
     class Meta(FlightSerializer.Meta):
-        fields = FlightSerializer.Meta.fields + ("all_free_places", "luggage_price_1_kg", "crew")
-
-    def get_all_free_places(self, obj) -> tuple[str, str]:
-        taken_seats_and_letters = set(obj.tickets.values_list("row", "letter"))
-        rows = int(obj.airplane.rows)
-        letters = list(obj.airplane.letters_in_row)
-        list_of_free_seats = []
-        list_of_free_business_seats = []
-
-        for row in range(1, rows + 1):
-            for letter in letters:
-                if not letter == " ":
-                    if (row, letter) not in taken_seats_and_letters:
-                        if row > obj.rows_economy_from:
-                            list_of_free_seats.append({"row": row, "letter": letter})
-                        elif row <= obj.rows_economy_from:
-                            list_of_free_business_seats.append({"row": row, "letter": letter})
-        return f"Economy: {list_of_free_seats}",  f"Business: {list_of_free_business_seats}"
+        fields = FlightSerializer.Meta.fields + ("luggage_price_1_kg", "crew")
+
+
+class FlightSeatMapSerializer(serializers.ModelSerializer):
+    layout = serializers.SerializerMethodField(read_only=True)
+    cabins = serializers.SerializerMethodField(read_only=True)
+    occupancy = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = Flight
+        fields = ("id", "layout", "cabins", "occupancy")
+
+    def get_layout(self, obj) -> dict:
+        layout = SeatLayout.for_airplane(obj.airplane)
+        return {
+            "rows": layout.rows,
+            "letters": layout.letters,
+            "aisles": layout.aisles,
+        }
+
+    def get_cabins(self, obj) -> dict:
+        layout = SeatLayout.for_airplane(obj.airplane)
+        occupied = obj.inventory.occupied
+        cabins = {
+            "business": (1, min(obj.rows_economy_from, layout.rows)),
+            "economy": (obj.rows_economy_from + 1, layout.rows),
+        }
+        return {
+            name: {
+                "first_row": first_row,
+                "last_row": last_row,
+                "free": layout.count_free(occupied, first_row, last_row),
+            }
+            for name, (first_row, last_row) in cabins.items()
+        }
+
+    def get_occupancy(self, obj) -> dict:
+        layout = SeatLayout.for_airplane(obj.airplane)
+        encoding = self.context.get("encoding", "rle")
+        if encoding == "packed":
+            return {"encoding": "packed", "bitmap": encode_packed(layout, obj.inventory.occupied)}
+        return {"encoding": "rle", "rows": encode_run_lengths(layout, obj.inventory.occupied)}
+
+
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField(min_value=1)
+    letter = serializers.CharField(max_length=1)
+
+
+class SeatReleaseSerializer(serializers.Serializer):
+    """The seats of the flight in the context, validated into (row, letter) pairs"""
+
+    seats = SeatSerializer(many=True, required=False)
+
+    def validate_seats(self, seats):
+        layout = SeatLayout.for_airplane(self.context["flight"].airplane)
+        pairs = [(seat["row"], seat["letter"]) for seat in seats]
+        for row, letter in pairs:
+            if layout.bit(row, letter) is None:
+                raise ValidationError(f"The seat {row}{letter} does not exist")
+        if len(set(pairs)) != len(pairs):
+            raise ValidationError("A seat is given twice")
+        return pairs
+
+
+class SeatHoldSerializer(SeatReleaseSerializer):
+    seats = SeatSerializer(many=True, allow_empty=False)
+
+    def validate_seats(self, seats):
+        seats = super().validate_seats(seats)
+        flight = self.context["flight"]
+        # the active holds of the user on all the flights; the holds of these seats are renewed, not added
+        held = (
+            SeatHold.objects.filter(user=self.context["request"].user, expires_at__gt=timezone.now())
+            .exclude(SeatHold.seats_filter((flight.id, row, letter) for row, letter in seats))
+            .count()
+        )
+        if held + len(seats) > settings.SEAT_HOLD_MAX_SEATS:
+            raise ValidationError(f"At most {settings.SEAT_HOLD_MAX_SEATS} seats can be held at once")
+        return seats
 
 
 class FlightForOrderSerializer(FlightRetrieveSerializer):
@@ -229,15 +409,50 @@ class FlightForOrderSerializer(FlightRetrieveSerializer):
         )
 
 
+class TicketListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            load_related_objects(self.child, data)
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        seats = set()
+        taken = []
+        for ticket in attrs:
+            seat = (ticket["flight"].id, ticket["row"], ticket["letter"])
+            if seat in seats:
+                raise ValidationError(f"The seat {ticket['row']}{ticket['letter']} is booked twice in this order")
+            seats.add(seat)
+
+            bit = SeatLayout.for_airplane(ticket["flight"].airplane).bit(ticket["row"], ticket["letter"])
+            if bit is None:
+                raise ValidationError(f"The seat {ticket['row']}{ticket['letter']} does not exist")
+            if ticket["flight"].inventory.occupied >> bit & 1:
+                taken.append(seat)
+        if taken:
+            # the seats held by the user (or by expired holds) are taken over by the order
+            user = getattr(self.context.get("request"), "user", None)
+            reclaimable = SeatHold.reclaimable(taken, user if user and user.is_authenticated else None)
+            held = set(reclaimable.values_list("flight_id", "row", "letter"))
+            taken = [seat for seat in taken if seat not in held]
+        if taken:
+            BOOKING_CONFLICTS.inc(reason="seat_taken")
+            raise SeatConflict(taken)
+        return attrs
+
+
 class TicketSerializer(serializers.ModelSerializer):
-    meal_option = serializers.PrimaryKeyRelatedField(queryset=MealOption.objects.all())
-    extra_entertainment_and_comfort = serializers.PrimaryKeyRelatedField(
+    flight = BulkPrimaryKeyRelatedField(
+        queryset=Flight.objects.select_related("airplane", "inventory", "route__source", "route__destination")
+    )
+    meal_option = BulkPrimaryKeyRelatedField(queryset=MealOption.objects.all())
+    extra_entertainment_and_comfort = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=ExtraEntertainmentAndComfort.objects.all(),
         required=False,
         allow_empty=True
     )
-    snacks_and_drinks = serializers.PrimaryKeyRelatedField(
+    snacks_and_drinks = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=SnacksAndDrinks.objects.all(),
         required=False,
@@ -258,6 +473,9 @@ class TicketSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Ticket
+        list_serializer_class = TicketListSerializer
+        # the (flight, letter, row) uniqueness is checked for all tickets at once in TicketListSerializer
+        validators = []
         fields = (
             "id",
             "row",
@@ -306,30 +524,32 @@ class TicketDetailSerializer (serializers.ModelSerializer):
             "extra_price",
         )
 
+    # tickets priced by OrderSerializer carry their price components, the others
+    # (e.g. written in the admin) are computed from the prefetched relations
     def get_ticket_price(self, obj) -> float:
+        if obj.fare_price is not None:
+            return obj.fare_price
         if obj.is_business is True:
-            return Flight.objects.get(id=obj.flight.id).price_business
-        return Flight.objects.get(id=obj.flight.id).price_economy
+            return obj.flight.price_business
+        return obj.flight.price_economy
 
     def get_luggage_price(self, obj) -> float | None:
+        if obj.luggage_price is not None:
+            return obj.luggage_price
         if obj.has_luggage and obj.luggage_weight is not None:
             return obj.luggage_weight * obj.flight.luggage_price_1_kg
 
     def get_extra_price(self, obj) -> float:
-        entertainment = [item.name for item in obj.extra_entertainment_and_comfort.all()]
-        snacks = [item.name for item in obj.snacks_and_drinks.all()]
-        meal_type = obj.meal_option.name
+        if obj.extras_price is not None:
+            return obj.extras_price
 
         total_price = 0
-        if len(entertainment) > 0:
-            for i in entertainment:
-                total_price += ExtraEntertainmentAndComfort.objects.get(name=i).price
-        if len(snacks) > 0:
-            for i in snacks:
-                total_price += SnacksAndDrinks.objects.get(name=i).price
-
-        if meal_type and meal_type != "NONE":
-            total_price += MealOption.objects.get(name=meal_type).price
+        for extra in obj.extra_entertainment_and_comfort.all():
+            total_price += extra.price
+        for snack in obj.snacks_and_drinks.all():
+            total_price += snack.price
+        if obj.meal_option:
+            total_price += obj.meal_option.price
 
         return total_price
 
@@ -341,93 +561,149 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ("id", "created_at", "tickets")
 
+    @staticmethod
+    def get_coupons(tickets_data) -> dict:
+        codes = {ticket_data["discount_coupon"] for ticket_data in tickets_data if ticket_data.get("discount_coupon")}
+        coupons = {}
+        for coupon in DiscountCoupon.objects.filter(code__in=codes).order_by("id"):
+            coupons.setdefault(coupon.code, coupon)
+        for code in codes - coupons.keys():
+            raise ValidationError({f"Invalid discount code: '{code}'"})
+        return coupons
+
+    @staticmethod
+    def price_ticket(ticket, extras, snacks_drinks, coupon_object, now) -> Decimal:
+        fare_price = 0
+        if ticket.flight:
+            if ticket.is_business:
+                fare_price += ticket.flight.price_business
+            else:
+                fare_price += ticket.flight.price_economy
+
+        extras_price = 0
+        if ticket.meal_option:
+            extras_price += ticket.meal_option.price
+
+        if ticket.has_luggage is False and ticket.luggage_weight is not None:
+            ticket.has_luggage = True
+
+        luggage_price = None
+        if ticket.has_luggage and ticket.luggage_weight is not None:
+            luggage_price = Decimal(ticket.luggage_weight) * ticket.flight.luggage_price_1_kg
+
+        for extra in extras:
+            extras_price += extra.price
+
+        for snack in snacks_drinks:
+            extras_price += snack.price
+
+        ticket_price = fare_price + extras_price + (luggage_price or 0)
+        if coupon_object and coupon_object.valid_until > now:
+            discount = coupon_object.discount
+            if ticket.is_child is True:
+                discount = DISCOUNT_FOR_CHILDREN
+            ticket_price *= Decimal(1 - discount / 100)
+            ticket.discount = discount
+
+        if not coupon_object or ticket.discount <= 0 or coupon_object.valid_until < now:
+            ticket.discount = 0
+            ticket.discount_coupon = None
+            if ticket.is_child:
+                ticket.discount = DISCOUNT_FOR_CHILDREN
+
+        cents = Decimal("0.01")
+        ticket.fare_price = Decimal(fare_price).quantize(cents, rounding=ROUND_HALF_UP)
+        ticket.extras_price = Decimal(extras_price).quantize(cents, rounding=ROUND_HALF_UP)
+        if luggage_price is not None:
+            ticket.luggage_price = luggage_price.quantize(cents, rounding=ROUND_HALF_UP)
+        ticket.price = Decimal(ticket_price).quantize(cents, rounding=ROUND_HALF_UP)
+        return ticket_price
+
     def create(self, validated_data):
+        tickets_data = validated_data.pop("tickets")
+        if not tickets_data:
+            raise ValidationError("Order must have at least 1 ticket!")
+
         with transaction.atomic():
-            tickets_data = validated_data.pop("tickets")
-            if tickets_data:
-                order = Order.objects.create(**validated_data)
-            else:
-                raise ValidationError("Order must have at least 1 ticket!")
+            now = timezone.now()
+            coupons = self.get_coupons(tickets_data)
+            order = Order(**validated_data)
             total_price = 0
+            tickets = []
+            extras_by_ticket = []
+            snacks_by_ticket = []
 
             for ticket_data in tickets_data:
+                ticket_data = dict(ticket_data)
+                ticket_data.pop("order", None)
                 extras = ticket_data.pop("extra_entertainment_and_comfort", [])
                 snacks_drinks = ticket_data.pop("snacks_and_drinks", [])
-                meal_option = ticket_data.pop("meal_option")
-                discount_coupon = ticket_data.pop("discount_coupon", None)
-                coupon_object = None
-                if discount_coupon is not None:
-                    try:
-                        Ticket.validate_discount_coupon(
-                            code=discount_coupon,
-                            error_to_raise=ValidationError
-                        )
-                        coupon_object = DiscountCoupon.objects.get(code=discount_coupon)
-                    except DiscountCoupon.DoesNotExist:
-                        coupon_object = None
-
-                if coupon_object and coupon_object.valid_until > timezone.now():
-                    ticket = Ticket.objects.create(order=order, meal_option=meal_option, discount_coupon=coupon_object, **ticket_data)
-                else:
-                    ticket = Ticket.objects.create(order=order, meal_option=meal_option, **ticket_data)
-
-                ticket.extra_entertainment_and_comfort.set(extras)
-                ticket.snacks_and_drinks.set(snacks_drinks)
-
-                ticket_price = 0
-                if ticket.flight:
-                    if ticket.is_business:
-                        ticket_price += ticket.flight.price_business
-                    else:
-                        ticket_price += ticket.flight.price_economy
-
-                if ticket.meal_option:
-                    ticket_price += ticket.meal_option.price
-
-                if ticket.has_luggage is False and ticket.luggage_weight is not None:
-                    ticket.has_luggage = True
-
-                if ticket.has_luggage and ticket.luggage_weight is not None:
-                    ticket_price += Decimal(ticket.luggage_weight) * ticket.flight.luggage_price_1_kg
-
-                for extra in extras:
-                    ticket_price += extra.price
-
-                for snack in snacks_drinks:
-                    ticket_price += snack.price
-
-                if coupon_object and coupon_object.valid_until > timezone.now():
-                    discount = coupon_object.discount
-                    if ticket.is_child is True:
-                        discount = coupon_object.discount =+ DISCOUNT_FOR_CHILDREN
-                    ticket_price *= Decimal(1 - discount / 100)
-                    ticket.discount = discount
-
-                if not coupon_object or ticket.discount <= 0 or coupon_object.valid_until < timezone.now():
-                    ticket.discount = 0
-                    ticket.discount_coupon = None
-                    if ticket.is_child:
-                        ticket.discount = DISCOUNT_FOR_CHILDREN
-
-
-                total_price += ticket_price
-                ticket.price = Decimal(ticket_price).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-                ticket.save()
+                coupon_object = coupons.get(ticket_data.pop("discount_coupon", None))
+
+                ticket = Ticket(order=order, **ticket_data)
+                if coupon_object and coupon_object.valid_until > now:
+                    ticket.discount_coupon = coupon_object
+                total_price += self.price_ticket(ticket, extras, snacks_drinks, coupon_object, now)
+                # foreign keys were resolved by the serializer fields, the rest is checked without queries
+                ticket.clean_fields(exclude=["flight", "order", "meal_option", "discount_coupon"])
+
+                tickets.append(ticket)
+                extras_by_ticket.append(extras)
+                snacks_by_ticket.append(snacks_drinks)
+
+            # the validation read the seats without a lock, a concurrent order may have taken some since
+            taken = FlightInventory.acquire(tickets, validated_data.get("user"))
+            if taken:
+                BOOKING_CONFLICTS.inc(reason="seat_locked")
+                raise SeatConflict(taken)
 
             order.total_price = Decimal(total_price).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+            order.set_summary(tickets)
             order.save()
-            return order
+            try:
+                Ticket.objects.bulk_create(tickets)
+            except IntegrityError:
+                # a ticket saved without acquiring its seat (e.g. in the admin)
+                BOOKING_CONFLICTS.inc(reason="unique_violation")
+                raise SeatConflict([(ticket.flight_id, ticket.row, ticket.letter) for ticket in tickets])
+
+            ExtrasThrough = Ticket.extra_entertainment_and_comfort.through
+            SnacksThrough = Ticket.snacks_and_drinks.through
+            ExtrasThrough.objects.bulk_create([
+                ExtrasThrough(ticket_id=ticket.id, extraentertainmentandcomfort_id=extra.id)
+                for ticket, extras in zip(tickets, extras_by_ticket)
+                for extra in extras
+            ])
+            SnacksThrough.objects.bulk_create([
+                SnacksThrough(ticket_id=ticket.id, snacksanddrinks_id=snack.id)
+                for ticket, snacks_drinks in zip(tickets, snacks_by_ticket)
+                for snack in snacks_drinks
+            ])
+            enqueue("send_order_receipt", order_id=order.id)
+
+        prefetch_related_objects([order], "tickets__extra_entertainment_and_comfort", "tickets__snacks_and_drinks")
+        return order
 
 
 class OrderListSerializer(OrderSerializer):
-    count_of_tickets = serializers.IntegerField(read_only=True)
-    source = serializers.CharField(read_only=True)
-    destination = serializers.CharField(read_only=True)
+    count_of_tickets = serializers.IntegerField(source="tickets_count", read_only=True)
+    source = serializers.CharField(source="source_city", read_only=True)
+    destination = serializers.CharField(source="destination_city", read_only=True)
     user = UserOnlyIdAndNameSerializer(read_only=True)
 
     class Meta:
         model = Order
-        fields = ("id", "created_at", "total_price", "user", "count_of_tickets", "source", "destination")
+        fields = (
+            "id",
+            "created_at",
+            "total_price",
+            "user",
+            "count_of_tickets",
+            "source",
+            "destination",
+            "first_departure",
+            "last_departure",
+        )
 
 
 class OrderRetrieveSerializer(serializers.ModelSerializer):
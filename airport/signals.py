@@ -0,0 +1,113 @@
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from airport.models import (
+    Airplane,
+    Airport,
+    AirplaneType,
+    CatalogVersion,
+    Crew,
+    ExtraEntertainmentAndComfort,
+    Flight,
+    FlightInventory,
+    MealOption,
+    Order,
+    Route,
+    SeatHold,
+    SnacksAndDrinks,
+    Ticket,
+)
+
+CATALOG_MODELS = (MealOption, SnacksAndDrinks, ExtraEntertainmentAndComfort, AirplaneType, Airport)
+
+# the flights whose detail shows an instance of the model
+FLIGHTS_SHOWING = {
+    Crew: lambda crew: Q(crew=crew),
+    Route: lambda route: Q(route=route),
+    Airport: lambda airport: Q(route__source=airport) | Q(route__destination=airport),
+    Airplane: lambda airplane: Q(airplane=airplane),
+    AirplaneType: lambda airplane_type: Q(airplane__airplane_type=airplane_type),
+}
+
+
+@receiver(post_save, sender=Flight)
+def rebuild_flight_inventory(sender, instance, created, raw, **kwargs):
+    # the airplane (and so the seat layout) or the cabin boundary may have been changed
+    if created or not raw:
+        FlightInventory.rebuild(instance)
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_previous_seat(sender, instance, raw, **kwargs):
+    instance._previous_seat = None
+    if instance.pk is not None:
+        instance._previous_seat = (
+            Ticket.objects.filter(pk=instance.pk)
+            .values_list("flight_id", "row", "letter", "order_id")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Ticket)
+def occupy_ticket_seat(sender, instance, created, raw, **kwargs):
+    previous_seat = getattr(instance, "_previous_seat", None)
+    if previous_seat is not None and previous_seat[:3] == (instance.flight_id, instance.row, instance.letter):
+        return
+    if previous_seat is not None:
+        flight_id, row, letter, _ = previous_seat
+        FlightInventory.release([Ticket(flight_id=flight_id, row=row, letter=letter)])
+    FlightInventory.occupy([instance])
+    # the ticket takes the seat over from a hold of its user or an expired one (Ticket.clean refuses the
+    # seats held by others), which must not free it when it expires
+    user_id = instance.order.user_id if instance.order_id else None
+    SeatHold.reclaimable([(instance.flight_id, instance.row, instance.letter)], user_id).delete()
+
+
+@receiver(post_save, sender=Ticket)
+def refresh_order_summary(sender, instance, created, raw, **kwargs):
+    # OrderSerializer writes the summary itself, tickets saved one by one (admin, fixtures) update it here
+    previous_seat = getattr(instance, "_previous_seat", None)
+    if previous_seat is not None and previous_seat[3] != instance.order_id:
+        Order.refresh_summary(previous_seat[3])
+    Order.refresh_summary(instance.order_id)
+
+
+@receiver(post_delete, sender=Ticket)
+def release_ticket_seat(sender, instance, **kwargs):
+    FlightInventory.release([instance])
+    Order.refresh_summary(instance.order_id)
+
+
+def bump_catalog_version(sender, **kwargs):
+    # creates, edits, image uploads and deletes of the catalogs invalidate their cached lists
+    CatalogVersion.bump(sender)
+
+
+for catalog_model in CATALOG_MODELS:
+    post_save.connect(bump_catalog_version, sender=catalog_model)
+    post_delete.connect(bump_catalog_version, sender=catalog_model)
+
+
+@receiver(m2m_changed, sender=Flight.crew.through)
+def bump_flight_version_on_crew_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # clear() does not pass the removed ids, so it is handled before the rows are gone
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        flights = Flight.objects.filter(pk=instance.pk)
+    elif action == "pre_clear":
+        flights = Flight.objects.filter(crew=instance)
+    else:
+        flights = Flight.objects.filter(pk__in=pk_set)
+    FlightInventory.bump_versions(flights)
+
+
+def bump_flight_versions(sender, instance, **kwargs):
+    FlightInventory.bump_versions(Flight.objects.filter(FLIGHTS_SHOWING[sender](instance)))
+
+
+for related_model in FLIGHTS_SHOWING:
+    post_save.connect(bump_flight_versions, sender=related_model)
+    # the flights of a deleted crew member are only known before the delete
+    pre_delete.connect(bump_flight_versions, sender=related_model)
@@ -0,0 +1,37 @@
+import hashlib
+import os.path
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_NAME = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$")
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores a file under ``ab/cd/<sha256 of the content><extension>``, whatever
+    name it was uploaded with. The same content is stored once, and a name
+    always points to the same content, so the files can be cached forever.
+    """
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    @staticmethod
+    def content_name(name, content):
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        digest = sha256.hexdigest()
+        _, extension = os.path.splitext(name)
+        return f"{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}"
+
+    @staticmethod
+    def is_content_name(name):
+        return bool(CONTENT_NAME.match(name))
@@ -0,0 +1,313 @@
+import itertools
+import tempfile
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import make_aware
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from airport.models import (
+    Airplane,
+    AirplaneType,
+    Airport,
+    Crew,
+    DiscountCoupon,
+    ExtraEntertainmentAndComfort,
+    Flight,
+    FlightInventory,
+    MealOption,
+    Order,
+    Route,
+    SnacksAndDrinks,
+    Ticket,
+)
+from airport.tests.test_views import generate_image_for_tests
+from airport.urls import router
+from user import urls as user_urls
+
+# The most queries every action of the API may run, by URL basename and action
+# (router viewsets) or HTTP method (user views). Each is measured with 1 and
+# with 50 children of every kind: the objects of a list, the crew of a
+# flight, the tickets of an order and their extras. The count has to stay
+# within the budget and must not grow with the children.
+QUERY_BUDGETS = {
+    "airport:mealoption": {"list": 3, "create": 4, "upload_image": 7},
+    "airport:snacksanddrinks": {"list": 3, "create": 3, "upload_image": 7},
+    "airport:extraentertainmentandcomfort": {"list": 3, "create": 3, "upload_image": 7},
+    "airport:airport": {"list": 3, "create": 4},
+    "airport:crew": {"list": 2, "create": 3, "upload_image": 7},
+    "airport:airplanetype": {"list": 3, "create": 5},
+    "airport:airplane": {"list": 2, "create": 4, "upload_image": 7},
+    "airport:route": {"list": 2, "create": 5},
+    "airport:flight": {
+        "list": 2,
+        "create": 19,
+        "retrieve": 4,
+        "update": 14,
+        "partial_update": 12,
+        "destroy": 8,
+        "seat_map": 2,
+        "hold": 8,
+        "release": 8,
+    },
+    "airport:order": {"list": 2, "create": 19, "retrieve": 12},
+    "airport:discountcoupon": {"list": 2, "create": 2},
+    "user:register": {"post": 3},
+    "user:token_obtain_pair": {"post": 1},
+    "user:token_refresh": {"post": 1},
+    "user:token_verify": {"post": 0},
+    "user:manage": {"get": 1, "put": 4, "patch": 3},
+}
+SIZES = (1, 50)
+
+
+def registered_actions() -> dict:
+    actions = {}
+    for prefix, viewset, basename in router.registry:
+        actions[f"airport:{basename}"] = {
+            action
+            for route in router.get_routes(viewset)
+            for action in router.get_method_map(viewset, route.mapping).values()
+        }
+    for pattern in user_urls.urlpatterns:
+        view_class = pattern.callback.view_class
+        actions[f"user:{pattern.name}"] = {
+            method for method in view_class.http_method_names
+            if method not in ("head", "options") and hasattr(view_class, method)
+        }
+    return actions
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        self.user = get_user_model().objects.create_superuser(email="budget@test.com", password="1qazcde3")
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+        self.unique = itertools.count()
+
+    def test_every_action_has_a_budget(self):
+        budgets = {view: set(actions) for view, actions in QUERY_BUDGETS.items()}
+        self.assertEqual(budgets, registered_actions())
+
+    def test_actions_stay_within_budget_and_do_not_grow_with_children(self):
+        counts = {}
+        for size in SIZES:
+            try:
+                with transaction.atomic():
+                    self.create_children(size)
+                    for view, actions in QUERY_BUDGETS.items():
+                        for action in actions:
+                            counts[view, action, size] = self.count_queries(view, action)
+                    raise Rollback
+            except Rollback:
+                pass
+
+        for (view, action, size), (count, queries) in counts.items():
+            budget = QUERY_BUDGETS[view][action]
+            smallest = counts[view, action, SIZES[0]][0]
+            with self.subTest(view=view, action=action, size=size):
+                if count > budget or count != smallest:
+                    self.fail(
+                        f"{view} {action} ran {count} queries with {size} children "
+                        f"({smallest} with {SIZES[0]}), the budget is {budget}:\n"
+                        + "\n".join(f"{index}. {query['sql']}" for index, query in enumerate(queries, 1))
+                    )
+
+    def count_queries(self, view, action):
+        method, url, data, request_format = self.build_request(view, action)
+        # the catalogs are cached, the budget is for a cold cache
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format=request_format)
+        self.assertLess(response.status_code, 400, f"{view} {action}: {getattr(response, 'data', response)}")
+        return len(queries), queries.captured_queries
+
+    def create_children(self, size):
+        departure = make_aware(datetime(2030, 1, 1, 10))
+        self.airplane_types = AirplaneType.objects.bulk_create(
+            AirplaneType(name=f"Type {index}") for index in range(size)
+        )
+        self.airplanes = [
+            Airplane.objects.create(
+                name=f"Airplane {index}", rows=size + 10, letters_in_row="ABCD", airplane_type=self.airplane_types[0]
+            )
+            for index in range(size)
+        ]
+        self.airports = Airport.objects.bulk_create(
+            Airport(name=f"Airport {index}", closest_big_city=f"City {index}") for index in range(size + 1)
+        )
+        self.routes = Route.objects.bulk_create(
+            Route(source=self.airports[index], destination=self.airports[index + 1], distance=500)
+            for index in range(size)
+        )
+        self.crew = Crew.objects.bulk_create(
+            Crew(first_name=f"First {index}", last_name=f"Last {index}", position="FLIGHT_ATTENDANT")
+            for index in range(size)
+        )
+        self.meal_options = MealOption.objects.bulk_create(
+            MealOption(name=f"Meal {index}", meal_type="1", weight=300, price=9) for index in range(size)
+        )
+        self.snacks = SnacksAndDrinks.objects.bulk_create(
+            SnacksAndDrinks(name=f"Snack {index}", price=2) for index in range(size)
+        )
+        self.extras = ExtraEntertainmentAndComfort.objects.bulk_create(
+            ExtraEntertainmentAndComfort(name=f"Extra {index}", price=5) for index in range(size)
+        )
+        DiscountCoupon.objects.bulk_create(
+            DiscountCoupon(name=f"Coupon {index}", valid_until=departure, code=f"CODE{index:06d}", discount=10)
+            for index in range(size)
+        )
+
+        self.flights = [
+            self.create_flight(self.routes[index], self.airplanes[index], departure) for index in range(size)
+        ]
+        # order i has a ticket on every flight, in row i + 1
+        self.orders = [Order.objects.create(user=self.user) for _ in range(size)]
+        tickets = Ticket.objects.bulk_create(
+            Ticket(
+                order=order, flight=flight, row=row, letter="A", meal_option=self.meal_options[0], price=1,
+            )
+            for row, order in enumerate(self.orders, 1)
+            for flight in self.flights
+        )
+        for relation, objects in (
+            (Ticket.extra_entertainment_and_comfort, self.extras),
+            (Ticket.snacks_and_drinks, self.snacks),
+        ):
+            target = relation.field.m2m_reverse_field_name()
+            relation.through.objects.bulk_create(
+                relation.through(ticket=ticket, **{target: related})
+                for ticket in tickets
+                for related in objects[:2]
+            )
+        for flight in self.flights:
+            FlightInventory.rebuild(flight)
+        for order in self.orders:
+            Order.refresh_summary(order.id)
+
+    def create_flight(self, route, airplane, departure):
+        flight = Flight.objects.create(
+            route=route,
+            airplane=airplane,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=2),
+            price_economy=100,
+            price_business=300,
+            rows_economy_from=2,
+            luggage_price_1_kg=2,
+        )
+        flight.crew.set(self.crew)
+        return flight
+
+    def flight_payload(self):
+        flight = self.flights[0]
+        return {
+            "route": flight.route_id,
+            "airplane": flight.airplane_id,
+            "departure_time": flight.departure_time.isoformat(),
+            "arrival_time": flight.arrival_time.isoformat(),
+            "crew": [crew.id for crew in self.crew],
+            "price_economy": 120,
+            "price_business": 320,
+            "rows_economy_from": 2,
+            "luggage_price_1_kg": "2.50",
+        }
+
+    def build_request(self, view, action):
+        """(method, url, data, format) of a successful request to the action"""
+        name = next(self.unique)
+        flight = self.flights[0]
+        basename = view.split(":")[1]
+        catalog_payloads = {
+            "mealoption": {"name": f"New meal {name}", "meal_type": "1", "weight": 250, "price": "7.50"},
+            "snacksanddrinks": {"name": f"New snack {name}", "price": "1.50"},
+            "extraentertainmentandcomfort": {"name": f"New extra {name}", "price": "3.00"},
+            "airport": {"name": f"New airport {name}", "closest_big_city": "Kyiv"},
+            "crew": {"first_name": "New", "last_name": f"Member {name}", "position": "CAPTAIN"},
+            "airplanetype": {"name": f"New type {name}"},
+            "airplane": {
+                "name": f"New airplane {name}", "rows": 20, "letters_in_row": "ABCDEF",
+                "airplane_type": self.airplane_types[0].id,
+            },
+            "route": {"source": self.airports[0].id, "destination": self.airports[-1].id, "distance": 900},
+            "discountcoupon": {
+                "name": f"New coupon {name}", "valid_until": "2090-01-01T00:00:00Z", "code": "NEWCODE123",
+                "discount": 15,
+            },
+            "flight": self.flight_payload(),
+        }
+        first_objects = {
+            "mealoption": self.meal_options[0],
+            "snacksanddrinks": self.snacks[0],
+            "extraentertainmentandcomfort": self.extras[0],
+            "crew": self.crew[0],
+            "airplane": self.airplanes[0],
+        }
+
+        if view.startswith("user:"):
+            url = reverse(view)
+            payloads = {
+                "user:register": {"email": f"new{name}@test.com", "password": "1qazcde3"},
+                "user:token_obtain_pair": {"email": self.user.email, "password": "1qazcde3"},
+                "user:token_refresh": {"refresh": str(self.refresh)},
+                "user:token_verify": {"token": str(self.refresh.access_token)},
+                "user:manage": (
+                    {"email": self.user.email, "password": "1qazcde3"} if action == "put"
+                    else {"email": self.user.email}
+                ),
+            }
+            return action, url, payloads[view] if action != "get" else None, "json"
+
+        if action == "list":
+            return "get", reverse(f"{view}-list"), None, None
+        if action == "create" and basename == "order":
+            # one ticket per row of a flight without tickets
+            free_flight = self.create_flight(self.routes[0], self.airplanes[0], flight.departure_time)
+            tickets = [
+                {
+                    "flight": free_flight.id,
+                    "row": row,
+                    "letter": "B",
+                    "meal_option": self.meal_options[0].id,
+                    "extra_entertainment_and_comfort": [extra.id for extra in self.extras[:2]],
+                    "snacks_and_drinks": [snack.id for snack in self.snacks[:2]],
+                }
+                for row in range(1, len(self.flights) + 1)
+            ]
+            return "post", reverse(f"{view}-list"), {"tickets": tickets}, "json"
+        if action == "create":
+            return "post", reverse(f"{view}-list"), catalog_payloads[basename], "json"
+        if action == "upload_image":
+            url = reverse(f"{view}-upload-image", args=[first_objects[basename].id])
+            return "post", url, {"image": generate_image_for_tests()}, "multipart"
+        if basename == "order":
+            return "get", reverse(f"{view}-detail", args=[self.orders[-1].id]), None, None
+        if action == "seat_map":
+            return "get", reverse(f"{view}-seat-map", args=[flight.id]), None, None
+        if action in ("hold", "release"):
+            # every size holds the seats it then releases, in a row without tickets
+            seats = [{"row": len(self.orders) + 1, "letter": letter} for letter in "AB"]
+            return "post", reverse(f"{view}-{action}", args=[flight.id]), {"seats": seats}, "json"
+        if action == "retrieve":
+            return "get", reverse(f"{view}-detail", args=[flight.id]), None, None
+        if action == "update":
+            return "put", reverse(f"{view}-detail", args=[flight.id]), self.flight_payload(), "json"
+        if action == "partial_update":
+            payload = {"crew": [crew.id for crew in self.crew]}
+            return "patch", reverse(f"{view}-detail", args=[flight.id]), payload, "json"
+        if action == "destroy":
+            doomed = self.create_flight(self.routes[0], self.airplanes[0], flight.departure_time)
+            return "delete", reverse(f"{view}-detail", args=[doomed.id]), None, None
+        raise AssertionError(f"No request for {view} {action}")
@@ -1,16 +1,29 @@
+import base64
+import json
+import os
 import copy
 import tempfile
-from datetime import datetime
-from io import BytesIO
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
 
 from dateutil.parser import parse, isoparse
 from decimal import Decimal
 
 from PIL import Image
+from asgiref.sync import async_to_sync
+from unittest import skipUnless
 from unittest.mock import patch
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Count, F
-from django.test import TestCase
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command, CommandError
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.timezone import make_aware
@@ -18,6 +31,10 @@ from rest_framework import status
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from airport_api.db_router import check_shared_cache
+from airport_api.metrics import REGISTRY
+from airport_api.server_timing import install_query_timer
+from airport.jobs import STALE_AFTER, claim_jobs
 from airport.models import (
     AirplaneType,
     Airplane,
@@ -30,8 +47,13 @@ from airport.models import (
     ExtraEntertainmentAndComfort,
     DiscountCoupon,
     Ticket,
-    Order
+    Order,
+    FlightInventory,
+    Job,
+    SeatHold,
+    IdempotencyKey
 )
+from airport.seat_map import SeatLayout
 from airport.serializers import (
     CrewSerializer,
     AirportSerializer,
@@ -45,7 +67,9 @@ from airport.serializers import (
     ExtraEntertainmentAndComfortSerializer,
     DiscountCouponSerializer,
     DISCOUNT_FOR_CHILDREN,
-    OrderRetrieveSerializer
+    OrderRetrieveSerializer,
+    OrderSerializer,
+    SeatConflict
 )
 
 def sample_ticket(**params):
@@ -77,6 +101,7 @@ def generate_image_for_tests():
 
 class BaseCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.user = get_user_model().objects.create_user(
             email="test_email@test.com",
             first_name="Vasyl",
@@ -169,18 +194,33 @@ class OrderApiTests(BaseCase):
 
     def test_order_list_status_200_and_contains_value(self):
         response = self.client.get(self.list_url)
-        orders = Order.objects.filter(user=self.user).annotate(
-            count_of_tickets=Count(
-                "tickets"
-            ), source=F(
-                "tickets__flight__route__source__closest_big_city"
-            ), destination=F(
-                "tickets__flight__route__destination__closest_big_city"
-            )).order_by("id")
+        orders = Order.objects.filter(user=self.user).order_by("id")
         serializer = OrderListSerializer(orders, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data[0]["count_of_tickets"], 1)
+        self.assertEqual(response.data[0]["source"], "Odessa")
+
+    def test_order_list_has_one_item_per_order_with_its_summary(self):
+        data = {"tickets": [
+            {**self.defaults_ticket_json["tickets"][0], "discount_coupon": None},
+            {**self.defaults_ticket_json["tickets"][0], "discount_coupon": None, "flight": self.flight1.id},
+        ]}
+        self.client.post(self.list_url, data, format="json")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url)
+        order = response.data[-1]
+
+        self.assertEqual(len(response.data), Order.objects.filter(user=self.user).count())
+        # the user of the token and the orders
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(order["count_of_tickets"], 2)
+        self.assertEqual(order["source"], "Odessa")
+        self.assertEqual(order["destination"], "Odessa")
+        self.assertEqual(order["first_departure"], "2025-09-09T14:33:00Z")
+        self.assertEqual(order["last_departure"], "2026-12-12T12:12:00Z")
 
     def test_order_str(self):
         order = Order.objects.first()
@@ -252,14 +292,36 @@ class OrderApiTests(BaseCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(actual_discount, expected_discount)
 
-    def test_create_ticket_with_occupied_place_status_400(self):
+    def test_create_ticket_with_occupied_place_status_409_with_the_seat(self):
         ticket_with_occupied_place = copy.deepcopy(self.defaults_ticket_json)
         ticket_with_occupied_place["tickets"][0]["row"] = 9
         ticket_with_occupied_place["tickets"][0]["letter"] = "A"
 
         response = self.client.post(self.list_url, ticket_with_occupied_place, format="json")
 
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["conflicting_seats"], [{"flight": self.flight.id, "row": 9, "letter": "A"}])
+
+    def test_create_order_whose_seat_was_taken_after_validation_status_409_and_nothing_saved(self):
+        data = copy.deepcopy(self.defaults_ticket_json)
+        data["tickets"].append({**data["tickets"][0], "row": 8, "letter": "C", "flight": self.flight1.id})
+        serializer = OrderSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        # a concurrent order books 9B between the validation and the save
+        sample_ticket(row=9, letter="B", flight=self.flight)
+        orders = Order.objects.count()
+
+        with self.assertRaises(SeatConflict) as conflict:
+            with transaction.atomic():
+                serializer.save(user=self.user)
+
+        self.assertEqual(conflict.exception.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            conflict.exception.detail["conflicting_seats"], [{"flight": self.flight.id, "row": 9, "letter": "B"}]
+        )
+        self.assertEqual(Order.objects.count(), orders)
+        layout = SeatLayout.for_airplane(self.airplane1)
+        self.assertFalse(FlightInventory.objects.get(flight=self.flight1).occupied >> layout.bit(8, "C") & 1)
 
     def test_create_ticket_if_row_is_out_range_status_400(self):
         ticket_with_row_out_range = copy.deepcopy(self.defaults_ticket_json)
@@ -301,6 +363,131 @@ class OrderApiTests(BaseCase):
         self.assertEqual(response.data["tickets"][0]["discount"], DISCOUNT_FOR_CHILDREN)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_create_order_stores_prices_and_extras(self):
+        response = self.client.post(self.list_url, self.defaults_ticket_json, format="json")
+        ticket = Ticket.objects.get(id=response.data["tickets"][0]["id"])
+
+        # economy 175 + meal 8.99 + luggage 10 kg * 1.99 + tablet 4.99 + chips 2.99, the coupon has expired
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(ticket.price, Decimal("211.87"))
+        self.assertEqual(ticket.order.total_price, Decimal("211.87"))
+        self.assertEqual(list(ticket.extra_entertainment_and_comfort.all()), [self.extra])
+        self.assertEqual(list(ticket.snacks_and_drinks.all()), [self.snacks_and_drinks])
+        self.assertEqual(response.data["tickets"][0]["extra_entertainment_and_comfort"], [self.extra.id])
+
+    def test_retrieve_order_with_same_queries_count_for_any_tickets_count(self):
+        queries_count = []
+        for seats in (["B"], ["C", "D", "E", "F"]):
+            data = {"tickets": [
+                {**self.defaults_ticket_json["tickets"][0], "letter": letter, "discount_coupon": None}
+                for letter in seats
+            ]}
+            order_id = self.client.post(self.list_url, data, format="json").data["id"]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("airport:order-detail", args=[order_id]))
+            queries_count.append(len(queries))
+
+        ticket = response.data["tickets"][0]
+        self.assertEqual(queries_count[0], queries_count[1])
+        self.assertEqual(ticket["ticket_price"], Decimal("175.00"))
+        self.assertEqual(ticket["luggage_price"], Decimal("19.90"))
+        self.assertEqual(ticket["extra_price"], Decimal("16.97"))
+
+    def test_create_order_saves_with_same_queries_count_for_any_tickets_count(self):
+        queries_count = []
+        for seats in (["B"], ["C", "D", "E", "F"]):
+            data = {"tickets": [
+                {**self.defaults_ticket_json["tickets"][0], "letter": letter, "discount_coupon": None}
+                for letter in seats
+            ]}
+            serializer = OrderSerializer(data=data)
+            serializer.is_valid(raise_exception=True)
+            with CaptureQueriesContext(connection) as queries:
+                serializer.save(user=self.user)
+            queries_count.append(len(queries))
+
+        self.assertEqual(queries_count[0], queries_count[1])
+
+    def test_create_order_validates_with_same_queries_count_for_any_tickets_count(self):
+        queries_count = []
+        for seats in (["B"], ["C", "D", "E", "F", "G"]):
+            data = {"tickets": [
+                {**self.defaults_ticket_json["tickets"][0], "letter": letter, "meal_option": str(self.meal_option.id)}
+                for letter in seats
+            ]}
+            serializer = OrderSerializer(data=data)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertTrue(serializer.is_valid())
+            queries_count.append(len(queries))
+
+        self.assertEqual(queries_count[0], queries_count[1])
+
+    def test_create_order_with_not_existing_extra_status_400(self):
+        ticket_with_wrong_extra = copy.deepcopy(self.defaults_ticket_json)
+        ticket_with_wrong_extra["tickets"][0]["extra_entertainment_and_comfort"] = [self.extra.id, 99999]
+
+        response = self.client.post(self.list_url, ticket_with_wrong_extra, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_order_with_same_seat_twice_status_400(self):
+        same_seat_twice = copy.deepcopy(self.defaults_ticket_json)
+        same_seat_twice["tickets"].append(same_seat_twice["tickets"][0])
+
+        response = self.client.post(self.list_url, same_seat_twice, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Ticket.objects.filter(flight=self.flight, row=9, letter="B").count(), 0)
+
+    def test_create_order_sends_receipt_from_background_job(self):
+        response = self.client.post(self.list_url, self.defaults_ticket_json, format="json")
+        job = Job.objects.get(name="send_order_receipt")
+
+        self.assertEqual(job.payload, {"order_id": response.data["id"]})
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command("run_workers", "--once", "--processes", "1", stdout=StringIO())
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, "DONE")
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+        self.assertIn("Total: 211.87$", mail.outbox[0].body)
+
+    def test_failed_job_is_retried_later_and_fails_after_max_attempts(self):
+        job = Job.objects.create(name="not_registered", max_attempts=2)
+
+        call_command("run_workers", "--once", "--processes", "1", stdout=StringIO())
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, "PENDING")
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn("KeyError", job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        call_command("run_workers", "--once", "--processes", "1", stdout=StringIO())
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, "FAILED")
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_job_counts_the_attempt_of_its_dead_worker(self):
+        locked_at = timezone.now() - STALE_AFTER - timedelta(seconds=1)
+        retried = Job.objects.create(
+            name="not_registered", max_attempts=2, status="RUNNING", attempts=1, locked_at=locked_at
+        )
+        exhausted = Job.objects.create(
+            name="not_registered", max_attempts=2, status="RUNNING", attempts=2, locked_at=locked_at
+        )
+
+        self.assertEqual([job.pk for job in claim_jobs(10)], [retried.pk])
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+
+        self.assertEqual((retried.status, retried.attempts), ("RUNNING", 2))
+        self.assertEqual((exhausted.status, exhausted.attempts), ("FAILED", 2))
+
     def test_retrieve_order_not_admin_status_200(self):
         order = Order.objects.first()
         url = reverse("airport:order-detail", args=[order.id])
@@ -311,6 +498,86 @@ class OrderApiTests(BaseCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
+class OrderIdempotencyTests(BaseCase):
+    def setUp(self):
+        super().setUp()
+        self.list_url = reverse("airport:order-list")
+        self.data = {"tickets": [
+            {"row": 5, "letter": "C", "flight": self.flight.id, "meal_option": self.meal_option.id}
+        ]}
+
+    def order(self, client, data, key):
+        return client.post(self.list_url, data, format="json", headers={"Idempotency-Key": key})
+
+    def test_retry_with_the_same_key_replays_the_order_without_creating_it_again(self):
+        first = self.order(self.client, self.data, "retry-1")
+        orders = Order.objects.count()
+
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.order(self.client, self.data, "retry-1")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+        self.assertNotIn("Idempotent-Replayed", first.headers)
+        self.assertEqual(Order.objects.count(), orders)
+        self.assertFalse([query for query in queries if "INSERT" in query["sql"] or "UPDATE" in query["sql"]])
+
+    def test_key_reused_for_another_request_status_422(self):
+        self.order(self.client, self.data, "retry-1")
+        orders = Order.objects.count()
+        other = {"tickets": [{**self.data["tickets"][0], "row": 6}]}
+
+        response = self.order(self.client, other, "retry-1")
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Order.objects.count(), orders)
+        self.assertFalse(Ticket.objects.filter(flight=self.flight, row=6, letter="C").exists())
+
+    def test_failed_request_does_not_keep_its_key(self):
+        self.order(self.client, self.data, "first")
+
+        conflict = self.order(self.client, self.data, "retry-1")
+        Ticket.objects.filter(flight=self.flight, row=5, letter="C").delete()
+        retry = self.order(self.client, self.data, "retry-1")
+
+        self.assertEqual(conflict.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", retry.headers)
+
+    def test_keys_belong_to_their_user(self):
+        other_client = APIClient()
+        other_client.credentials(HTTP_AUTHORIZATION="Bearer " + self.super_access_token)
+        self.order(self.client, self.data, "retry-1")
+
+        response = self.order(other_client, {"tickets": [{**self.data["tickets"][0], "row": 6}]}, "retry-1")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.get(id=response.data["id"]).user, self.superuser)
+
+    def test_expired_key_is_used_again_and_deleted_by_the_command(self):
+        self.order(self.client, self.data, "retry-1")
+        self.order(self.client, {"tickets": [{**self.data["tickets"][0], "row": 7}]}, "retry-2")
+        IdempotencyKey.objects.filter(key="retry-1").update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        response = self.order(self.client, {"tickets": [{**self.data["tickets"][0], "row": 6}]}, "retry-1")
+        IdempotencyKey.objects.filter(key="retry-2").update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command("expire_idempotency_keys", batch_size=1, stdout=out)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", response.headers)
+        self.assertEqual(list(IdempotencyKey.objects.values_list("key", flat=True)), ["retry-1"])
+        self.assertIn("Deleted 1 expired", out.getvalue())
+
+    def test_invalid_key_status_400(self):
+        response = self.order(self.client, self.data, "x" * 256)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Idempotency-Key", response.data)
+
+
 class AirplaneTypeApiTests(BaseCase):
     def setUp(self):
         super().setUp()
@@ -472,6 +739,17 @@ class RouteApiTest(BaseCase):
         self.assertContains(response, "Lviv")
         self.assertEqual(response.data, serializer.data)
 
+    def test_async_route_list_matches_sync_view(self):
+        response = async_to_sync(self.async_client.get)(
+            reverse("airport:async-route-list"),
+            {"source": "Odessa"},
+            headers={"Authorization": "Bearer " + self.access_token}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), self.client.get(self.list_url, {"source": "Odessa"}).json())
+        self.assertEqual(len(response.json()), 1)
+
     def test_route_str(self):
         self.assertEqual(str(self.route), "Source: International Airport Odessa (Odessa) "
                                           "-> Destination: International Airport Lviv (Lviv)")
@@ -541,6 +819,59 @@ class CrewApiTests(BaseCase):
         self.assertContains(response, "Henrynton")
         self.assertEqual(response.data, serializer.data)
 
+    def test_upload_image_to_crew_makes_resized_variants_in_background(self):
+        image_file = BytesIO()
+        Image.new("RGB", (600, 300), color="green").save(image_file, format="JPEG")
+        image_file.name = "captain.jpg"
+        image_file.seek(0)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + self.super_access_token)
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            self.client.post(self.upload_url, {"image": image_file}, format="multipart")
+            call_command("run_workers", "--once", "--processes", "1", stdout=StringIO())
+            response = self.client.get(self.list_url, {"first_name": self.crew_captain.first_name})
+            variants = Crew.objects.get(id=self.crew_captain.id).image_variants
+
+            with Image.open(os.path.join(media_root, variants["webp"]["160"])) as variant:
+                self.assertEqual(variant.format, "WEBP")
+                self.assertEqual(variant.size, (160, 80))
+
+        srcset = response.data[0]["image_srcset"]
+        self.assertEqual(set(srcset), {"webp", "jpeg"})
+        self.assertEqual([candidate.split(" ")[1] for candidate in srcset["jpeg"].split(", ")], ["160w", "480w", "600w"])
+        self.assertTrue(srcset["webp"].startswith("http://testserver/"))
+
+    def test_upload_same_image_twice_is_stored_once_under_its_hash(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + self.super_access_token)
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            names = []
+            for _ in range(2):
+                self.client.post(self.upload_url, {"image": generate_image_for_tests()}, format="multipart")
+                names.append(Crew.objects.get(id=self.crew_captain.id).image.name)
+            stored_files = [files for _, _, files in os.walk(media_root) if files]
+
+        self.assertEqual(names[0], names[1])
+        self.assertRegex(names[0], r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        self.assertTrue(names[0].startswith(f"{names[0][6:8]}/{names[0][8:10]}/"))
+        self.assertEqual(stored_files, [[os.path.basename(names[0])]])
+
+    def test_rehash_media_moves_legacy_uploads_to_content_addressed_storage(self):
+        legacy_name = "uploads/crews_media_files/joe-henrynton-1.jpg"
+        with tempfile.TemporaryDirectory() as legacy_root, tempfile.TemporaryDirectory() as media_root:
+            os.makedirs(os.path.join(legacy_root, "uploads/crews_media_files"))
+            with open(os.path.join(legacy_root, legacy_name), "wb") as legacy_file:
+                legacy_file.write(generate_image_for_tests().getvalue())
+            Crew.objects.filter(id=self.crew_captain.id).update(image=legacy_name)
+
+            with override_settings(MEDIA_ROOT=media_root):
+                call_command("rehash_media", "--legacy-root", legacy_root, stdout=StringIO())
+                crew = Crew.objects.get(id=self.crew_captain.id)
+
+                self.assertRegex(crew.image.name, r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+                self.assertTrue(os.path.isfile(os.path.join(media_root, crew.image.name)))
+                self.assertTrue(Job.objects.filter(name="make_image_variants", payload__image=crew.image.name).exists())
+
     def test_crew_str(self):
         self.assertEqual(str(self.crew_captain), "Joe Henrynton, Position: Captain")
 
@@ -637,49 +968,49 @@ class FlightApiTests(BaseCase):
         response = self.client.get(self.list_url, {"destination": f"{self.flight.route.destination.closest_big_city}"})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["route"]["destination"]["closest_big_city"], self.flight.route.destination.closest_big_city)
-        self.assertNotEqual(response.data[0]["route"]["destination"]["closest_big_city"], self.flight1.route.destination.closest_big_city)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["route"]["destination"]["closest_big_city"], self.flight.route.destination.closest_big_city)
+        self.assertNotEqual(response.data["results"][0]["route"]["destination"]["closest_big_city"], self.flight1.route.destination.closest_big_city)
 
     def test_flight_filter_by_source(self):
         response = self.client.get(self.list_url, {"source": f"{self.flight.route.source.closest_big_city}"})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["route"]["source"]["closest_big_city"], self.flight.route.source.closest_big_city)
-        self.assertNotEqual(response.data[0]["route"]["source"]["closest_big_city"], self.flight1.route.source.closest_big_city)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["route"]["source"]["closest_big_city"], self.flight.route.source.closest_big_city)
+        self.assertNotEqual(response.data["results"][0]["route"]["source"]["closest_big_city"], self.flight1.route.source.closest_big_city)
 
     def test_flight_filter_by_airplane(self):
         response = self.client.get(self.list_url, {"airplane": f"{self.flight.airplane.name}"})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["airplane"]["name"], self.flight.airplane.name)
-        self.assertNotEqual(response.data[0]["airplane"]["name"], self.flight1.airplane.name)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["airplane"]["name"], self.flight.airplane.name)
+        self.assertNotEqual(response.data["results"][0]["airplane"]["name"], self.flight1.airplane.name)
 
     def test_flight_filter_by_date_from(self):
         response = self.client.get(self.list_url, {"departure_time_from": f"{self.departure_from_and_to}"})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertNotEqual(parse(response.data[0]["departure_time"]), self.flight.departure_time)
-        self.assertEqual(parse(response.data[0]["departure_time"]), self.flight1.departure_time)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertNotEqual(parse(response.data["results"][0]["departure_time"]), self.flight.departure_time)
+        self.assertEqual(parse(response.data["results"][0]["departure_time"]), self.flight1.departure_time)
 
     def test_flight_filter_by_date_to(self):
         response = self.client.get(self.list_url, {"departure_time_to": f"{self.departure_from_and_to}"})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(isoparse(response.data[0]["departure_time"]), self.flight.departure_time)
-        self.assertNotEqual(isoparse(response.data[0]["departure_time"]), self.flight1.departure_time)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(isoparse(response.data["results"][0]["departure_time"]), self.flight.departure_time)
+        self.assertNotEqual(isoparse(response.data["results"][0]["departure_time"]), self.flight1.departure_time)
 
     def test_flight_filter_by_arrival_time(self):
         response = self.client.get(self.list_url, {"arrival_time": f"{self.departure_from_and_to}"})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(isoparse(response.data[0]["arrival_time"]), self.flight1.arrival_time)
-        self.assertNotEqual(isoparse(response.data[0]["arrival_time"]), self.flight.arrival_time)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(isoparse(response.data["results"][0]["arrival_time"]), self.flight1.arrival_time)
+        self.assertNotEqual(isoparse(response.data["results"][0]["arrival_time"]), self.flight.arrival_time)
 
     def test_create_flight_when_is_staff_false_status_403(self):
         response = self.client.post(self.list_url, {
@@ -702,6 +1033,362 @@ class FlightApiTests(BaseCase):
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_flight_list_cursor_pagination_by_departure_time(self):
+        for day in range(1, 6):
+            Flight.objects.create(
+                **{**self.defaults_flight, "departure_time": make_aware(datetime(2026, 1, day // 2 + 1, 10))},
+                route=self.route,
+                airplane=self.airplane
+            )
+        expected_ids = list(Flight.objects.order_by("departure_time", "id").values_list("id", flat=True))
+
+        ids = []
+        url = self.list_url + "?page_size=3"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            ids += [flight["id"] for flight in response.data["results"]]
+            last_page = response.data
+            url = response.data["next"]
+        self.assertEqual(ids, expected_ids)
+
+        response = self.client.get(last_page["previous"])
+        self.assertEqual([flight["id"] for flight in response.data["results"]], expected_ids[3:6])
+
+    def test_flight_list_with_invalid_cursor_status_404(self):
+        response = self.client.get(self.list_url, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_flight_retrieve_does_not_contain_free_places(self):
+        url = reverse("airport:flight-detail", args=[self.flight.id])
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("all_free_places", response.data)
+
+    def test_flight_retrieve_if_none_match_excluded_by_the_filters_status_404(self):
+        url = reverse("airport:flight-detail", args=[self.flight.id])
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, {"airplane": "no such airplane"}, HTTP_IF_NONE_MATCH=etag)
+        async_response = async_to_sync(self.async_client.get)(
+            reverse("airport:async-flight-detail", args=[self.flight.id]),
+            {"airplane": "no such airplane"},
+            headers={"Authorization": "Bearer " + self.access_token, "If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(async_response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_flight_retrieve_if_none_match_status_304(self):
+        url = reverse("airport:flight-detail", args=[self.flight.id])
+        etag = self.client.get(url)["ETag"]
+
+        # the user of the token and the inventory version
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_flight_retrieve_etag_changes_with_tickets_flight_and_crew(self):
+        url = reverse("airport:flight-detail", args=[self.flight.id])
+        etags = [self.client.get(url)["ETag"]]
+
+        sample_ticket(row=5, letter="C")
+        etags.append(self.client.get(url)["ETag"])
+        Flight.objects.filter(id=self.flight.id).first().save()
+        etags.append(self.client.get(url)["ETag"])
+        self.flight.crew.remove(self.crew_first_officer)
+        etags.append(self.client.get(url)["ETag"])
+        self.crew_captain.first_name = "Joseph"
+        self.crew_captain.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[-1])
+
+        self.assertEqual(len(set(etags)), 4)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["crew"][0]["first_name"], "Joseph")
+
+    def test_async_flight_list_and_detail_match_sync_views(self):
+        headers = {"Authorization": "Bearer " + self.access_token}
+        detail_url = reverse("airport:flight-detail", args=[self.flight.id])
+        async_detail_url = reverse("airport:async-flight-detail", args=[self.flight.id])
+
+        async_list = async_to_sync(self.async_client.get)(
+            reverse("airport:async-flight-list"), {"page_size": 1}, headers=headers
+        )
+        async_next_page = async_to_sync(self.async_client.get)(async_list.json()["next"], headers=headers)
+        async_detail = async_to_sync(self.async_client.get)(async_detail_url, headers=headers)
+        sync_list = self.client.get(self.list_url)
+        sync_detail = self.client.get(detail_url)
+
+        self.assertEqual(async_list.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            async_list.json()["results"] + async_next_page.json()["results"],
+            sync_list.json()["results"]
+        )
+        self.assertEqual(async_detail.json(), sync_detail.json())
+        self.assertEqual(async_detail["ETag"], sync_detail["ETag"])
+
+    def test_async_flight_detail_if_none_match_status_304(self):
+        url = reverse("airport:async-flight-detail", args=[self.flight.id])
+        headers = {"Authorization": "Bearer " + self.access_token}
+        etag = async_to_sync(self.async_client.get)(url, headers=headers)["ETag"]
+
+        response = async_to_sync(self.async_client.get)(url, headers={**headers, "If-None-Match": etag})
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_async_flight_views_need_authentication(self):
+        list_response = async_to_sync(self.async_client.get)(reverse("airport:async-flight-list"))
+        detail_response = async_to_sync(self.async_client.get)(
+            reverse("airport:async-flight-detail", args=[99999]),
+            headers={"Authorization": "Bearer " + self.access_token}
+        )
+
+        self.assertEqual(list_response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(detail_response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_flight_seat_map_run_length_encoded(self):
+        url = reverse("airport:flight-seat-map", args=[self.flight1.id])
+        sample_ticket(flight=self.flight1, row=2, letter="C")
+        sample_ticket(flight=self.flight1, row=2, letter="D")
+        sample_ticket(flight=self.flight1, row=15, letter="H")
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # letters_in_row of airplane1 are "ABCD EFGH", economy from row 8
+        self.assertEqual(response.data["layout"], {"rows": 15, "letters": "ABCDEFGH", "aisles": [4]})
+        self.assertEqual(response.data["cabins"]["business"], {"first_row": 1, "last_row": 8, "free": 62})
+        self.assertEqual(response.data["cabins"]["economy"], {"first_row": 9, "last_row": 15, "free": 55})
+        self.assertEqual(
+            response.data["occupancy"],
+            {"encoding": "rle", "rows": [[1, [8]], [1, [2, 2, 4]], [12, [8]], [1, [7, 1]]]}
+        )
+
+    def test_flight_seat_map_packed(self):
+        url = reverse("airport:flight-seat-map", args=[self.flight.id])
+        response = self.client.get(url, {"encoding": "packed"})
+
+        layout = SeatLayout.for_airplane(self.airplane)
+        occupied = int.from_bytes(base64.b64decode(response.data["occupancy"]["bitmap"]), "little")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(occupied, (1 << layout.bit(1, "A")) | (1 << layout.bit(9, "A")))
+
+    def test_flight_seat_map_unknown_encoding_status_400(self):
+        url = reverse("airport:flight-seat-map", args=[self.flight.id])
+        response = self.client.get(url, {"encoding": "repr"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_flight_inventory_follows_ticket_create_and_delete(self):
+        layout = SeatLayout.for_airplane(self.flight.airplane)
+        ticket = sample_ticket(row=5, letter="C")
+        self.assertTrue(FlightInventory.objects.get(flight=self.flight).occupied >> layout.bit(5, "C") & 1)
+
+        ticket.delete()
+        self.assertFalse(FlightInventory.objects.get(flight=self.flight).occupied >> layout.bit(5, "C") & 1)
+
+    def test_flight_save_after_an_acquire_keeps_the_acquired_seats(self):
+        layout = SeatLayout.for_airplane(self.flight.airplane)
+        ticket = Ticket(flight=self.flight, row=5, letter="C", meal_option=self.meal_option)
+        with transaction.atomic():
+            self.assertEqual(FlightInventory.acquire([ticket]), [])
+            ticket.order = Order.objects.create(user=self.user)
+            ticket.save()
+
+        # the flight signal rebuilds the inventory under the same row lock as the bookings
+        with patch.object(FlightInventory, "lock", wraps=FlightInventory.lock) as lock:
+            self.flight.save()
+
+        lock.assert_called_once_with([self.flight.id])
+        self.assertTrue(FlightInventory.objects.get(flight=self.flight).occupied >> layout.bit(5, "C") & 1)
+
+    @skipUnless(connection.features.has_select_for_update_of, "needs a database locking the rows of some tables only")
+    def test_inventory_lock_does_not_lock_the_flight_and_airplane_rows(self):
+        with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+            list(FlightInventory.lock([self.flight.id]))
+
+        self.assertIn('FOR UPDATE OF "airport_flightinventory"', queries[0]["sql"])
+
+    def test_flight_list_places_available_come_from_inventory(self):
+        # the user and the flights, nothing is read from the ticket table
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url)
+        flight_data = next(flight for flight in response.data["results"] if flight["id"] == self.flight.id)
+
+        # 10 rows x 8 seats, rows 1-4 are business, ticket_business (row 1) and ticket_economy (row 9)
+        self.assertEqual(flight_data["places_available"], 78)
+        self.assertEqual(flight_data["business_places_available"], 31)
+        self.assertEqual(flight_data["economy_places_available"], 47)
+
+    def test_reconcile_inventory_rebuilds_drifted_counters(self):
+        FlightInventory.objects.filter(flight=self.flight).update(economy_taken=40)
+
+        with self.assertRaises(CommandError):
+            call_command("reconcile_inventory", "--check", stdout=StringIO())
+        call_command("reconcile_inventory", stdout=StringIO())
+        call_command("reconcile_inventory", "--check", stdout=StringIO())
+
+        self.assertEqual(FlightInventory.objects.get(flight=self.flight).economy_taken, 1)
+
+    def test_reconcile_inventory_rebuilds_the_drifted_flights_under_their_lock(self):
+        FlightInventory.objects.filter(flight=self.flight).update(economy_taken=40)
+
+        with patch.object(FlightInventory, "lock", wraps=FlightInventory.lock) as lock:
+            call_command("reconcile_inventory", stdout=StringIO())
+
+        lock.assert_called_once_with([self.flight.id])
+
+    def test_new_flight_has_empty_inventory(self):
+        flight = Flight.objects.create(**self.defaults_flight, route=self.route, airplane=self.airplane)
+
+        self.assertEqual(flight.inventory.occupied, 0)
+
+
+class SeatHoldTests(BaseCase):
+    def setUp(self):
+        super().setUp()
+        self.hold_url = reverse("airport:flight-hold", args=[self.flight.id])
+        self.release_url = reverse("airport:flight-release", args=[self.flight.id])
+        self.layout = SeatLayout.for_airplane(self.airplane)
+        self.other_client = APIClient()
+        self.other_client.credentials(HTTP_AUTHORIZATION="Bearer " + self.super_access_token)
+
+    def is_taken(self, row, letter):
+        return bool(FlightInventory.objects.get(flight=self.flight).occupied >> self.layout.bit(row, letter) & 1)
+
+    def order(self, client, row, letter):
+        ticket = {"row": row, "letter": letter, "flight": self.flight.id, "meal_option": self.meal_option.id}
+        return client.post(reverse("airport:order-list"), {"tickets": [ticket]}, format="json")
+
+    def test_held_seats_are_taken_in_the_seat_map_and_availability(self):
+        available = FlightInventory.objects.get(flight=self.flight).places_available
+
+        response = self.client.post(self.hold_url, {"seats": [{"row": 5, "letter": "C"}]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["seats"], [{"row": 5, "letter": "C"}])
+        self.assertGreater(response.data["expires_at"], timezone.now())
+        seat_map = self.client.get(reverse("airport:flight-seat-map", args=[self.flight.id]), {"encoding": "packed"})
+        occupied = int.from_bytes(base64.b64decode(seat_map.data["occupancy"]["bitmap"]), "little")
+        self.assertTrue(occupied >> self.layout.bit(5, "C") & 1)
+        self.assertEqual(FlightInventory.objects.get(flight=self.flight).places_available, available - 1)
+
+    def test_seat_held_by_another_user_status_409_for_holds_and_orders(self):
+        self.client.post(self.hold_url, {"seats": [{"row": 5, "letter": "C"}]}, format="json")
+
+        hold = self.other_client.post(
+            self.hold_url, {"seats": [{"row": 5, "letter": "C"}, {"row": 5, "letter": "D"}]}, format="json"
+        )
+        order = self.order(self.other_client, 5, "C")
+
+        self.assertEqual(hold.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(hold.data["conflicting_seats"], [{"flight": self.flight.id, "row": 5, "letter": "C"}])
+        self.assertFalse(self.is_taken(5, "D"))
+        self.assertEqual(order.status_code, status.HTTP_409_CONFLICT)
+
+    def test_order_of_the_holder_consumes_the_hold(self):
+        self.client.post(self.hold_url, {"seats": [{"row": 5, "letter": "C"}]}, format="json")
+
+        response = self.order(self.client, 5, "C")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertTrue(self.is_taken(5, "C"))
+        self.assertTrue(Ticket.objects.filter(flight=self.flight, row=5, letter="C").exists())
+
+    def test_order_and_renewal_of_the_holder_take_over_all_its_held_seats(self):
+        seats = [{"row": 5, "letter": letter} for letter in "CD"]
+        self.client.post(self.hold_url, {"seats": seats}, format="json")
+
+        renewed = self.client.post(self.hold_url, {"seats": seats}, format="json")
+        tickets = [{**seat, "flight": self.flight.id, "meal_option": self.meal_option.id} for seat in seats]
+        order = self.client.post(reverse("airport:order-list"), {"tickets": tickets}, format="json")
+
+        self.assertEqual(renewed.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(order.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertEqual(Ticket.objects.filter(flight=self.flight, row=5).count(), 2)
+
+    def test_saved_ticket_takes_over_the_hold_of_its_user_only(self):
+        self.client.post(self.hold_url, {"seats": [{"row": 5, "letter": "C"}]}, format="json")
+
+        with self.assertRaises(ValidationError):
+            sample_ticket(row=5, letter="C", order=Order.objects.create(user=self.superuser))
+        self.assertTrue(SeatHold.objects.filter(user=self.user).exists())
+        sample_ticket(row=5, letter="C", order=Order.objects.create(user=self.user))
+
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertTrue(self.is_taken(5, "C"))
+
+    def test_expired_hold_does_not_block_others(self):
+        self.client.post(self.hold_url, {"seats": [{"row": 5, "letter": "C"}]}, format="json")
+        SeatHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        response = self.other_client.post(self.hold_url, {"seats": [{"row": 5, "letter": "C"}]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(list(SeatHold.objects.values_list("user", flat=True)), [self.superuser.id])
+
+    def test_release_frees_the_seats_of_the_user_only(self):
+        self.client.post(self.hold_url, {"seats": [{"row": 5, "letter": "C"}, {"row": 5, "letter": "D"}]}, format="json")
+        self.other_client.post(self.hold_url, {"seats": [{"row": 6, "letter": "A"}]}, format="json")
+
+        response = self.client.post(self.release_url, {"seats": [{"row": 5, "letter": "C"}]}, format="json")
+        self.assertEqual(response.data["seats"], [{"row": 5, "letter": "C"}])
+        self.assertFalse(self.is_taken(5, "C"))
+        self.assertTrue(self.is_taken(5, "D"))
+
+        response = self.client.post(self.release_url, {}, format="json")
+        self.assertEqual(response.data["seats"], [{"row": 5, "letter": "D"}])
+        self.assertFalse(self.is_taken(5, "D"))
+        self.assertTrue(self.is_taken(6, "A"))
+
+    def test_hold_of_missing_taken_or_too_many_seats(self):
+        missing = self.client.post(self.hold_url, {"seats": [{"row": 50, "letter": "C"}]}, format="json")
+        sold = self.client.post(self.hold_url, {"seats": [{"row": 9, "letter": "A"}]}, format="json")
+        with self.settings(SEAT_HOLD_MAX_SEATS=2):
+            too_many = self.client.post(
+                self.hold_url, {"seats": [{"row": 2, "letter": letter} for letter in "ABC"]}, format="json"
+            )
+
+        self.assertEqual(missing.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(sold.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(too_many.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_hold_cap_counts_the_holds_on_all_flights(self):
+        other_flight_url = reverse("airport:flight-hold", args=[self.flight1.id])
+        with self.settings(SEAT_HOLD_MAX_SEATS=3):
+            first = self.client.post(
+                self.hold_url, {"seats": [{"row": 2, "letter": letter} for letter in "AB"]}, format="json"
+            )
+            renewed = self.client.post(
+                self.hold_url, {"seats": [{"row": 2, "letter": letter} for letter in "ABC"]}, format="json"
+            )
+            over = self.client.post(other_flight_url, {"seats": [{"row": 2, "letter": "A"}]}, format="json")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(renewed.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(over.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(SeatHold.objects.filter(flight=self.flight1).exists())
+
+    def test_expire_seat_holds_frees_the_expired_seats(self):
+        self.client.post(self.hold_url, {"seats": [{"row": 5, "letter": "C"}]}, format="json")
+        self.other_client.post(self.hold_url, {"seats": [{"row": 6, "letter": "A"}]}, format="json")
+        SeatHold.objects.filter(row=5).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        call_command("expire_seat_holds", stdout=StringIO())
+
+        self.assertEqual(list(SeatHold.objects.values_list("row", "letter")), [(6, "A")])
+        self.assertFalse(self.is_taken(5, "C"))
+        self.assertTrue(self.is_taken(6, "A"))
+        self.assertTrue(self.is_taken(9, "A"))
+
 
 class SnacksAndDrinksApiTests(BaseCase):
     def setUp(self):
@@ -775,6 +1462,46 @@ class MealOptionApiTests(BaseCase):
         self.assertContains(response, "Borsch")
         self.assertEqual(response.data, serializer.data)
 
+    def test_meal_option_list_is_cached_until_meal_options_change(self):
+        self.client.get(self.list_url)
+        with CaptureQueriesContext(connection) as queries:
+            cached_response = self.client.get(self.list_url)
+        # the user of the token and the catalog version
+        self.assertEqual(len(queries), 2)
+
+        MealOption.objects.create(name="Soup", meal_type=2, weight=250, price=5.99)
+        response = self.client.get(self.list_url)
+
+        self.assertEqual(len(cached_response.data), 2)
+        self.assertEqual(len(response.data), 3)
+        self.assertNotEqual(cached_response["ETag"], response["ETag"])
+
+    def test_meal_option_list_is_cached_per_filter(self):
+        self.client.get(self.list_url, {"meal_type": 1, "name": "s"})
+        response = self.client.get(self.list_url, {"name": "s", "meal_type": 3, "unknown": 1})
+
+        self.assertEqual([meal["name"] for meal in response.data], [self.meal_option1.name])
+
+    def test_meal_option_list_if_none_match_status_304(self):
+        etag = self.client.get(self.list_url)["ETag"]
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertFalse(response.content)
+
+    @patch("django.core.files.storage.FileSystemStorage.save")
+    def test_upload_image_to_meal_option_changes_list_etag(self, mock_save):
+        mock_save.return_value = "uploads/fake_image_upload.jpg"
+        etag = self.client.get(self.list_url)["ETag"]
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + self.super_access_token)
+        self.client.post(self.upload_url, {"image": generate_image_for_tests()}, format="multipart")
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data[0]["image"].endswith(".jpg"))
+
     def test_meal_option_str(self):
         self.assertEqual(str(self.meal_option),
             f"Name: {self.meal_option.name},"
@@ -982,3 +1709,304 @@ class DiscountCouponApiTests(BaseCase):
         format="json")
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnless("replica" in settings.DATABASES, "needs a second database standing in for a replica")
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(BaseCase):
+    # the skipped class is still asked for its databases
+    databases = {"default", "replica"}.intersection(settings.DATABASES)
+
+    def setUp(self):
+        super().setUp()
+        # the replica is never synchronised, it only knows the user
+        self.user.save(using="replica")
+        self.order_url = reverse("airport:order-list")
+
+    def test_safe_requests_read_from_replica(self):
+        response = self.client.get(reverse("airport:flight-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [])
+
+    def test_order_is_read_from_primary_right_after_it_is_created(self):
+        response = self.client.post(self.order_url, {"tickets": [{
+            "row": 9, "letter": "B", "flight": self.flight.id, "meal_option": self.meal_option.id,
+        }]}, format="json")
+        detail_url = reverse("airport:order-detail", args=[response.data["id"]])
+
+        self.assertEqual(self.client.get(detail_url).status_code, status.HTTP_200_OK)
+        cache.clear()
+        self.assertEqual(self.client.get(detail_url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_check_warns_about_a_process_local_cache_with_replicas(self):
+        with override_settings(DATABASE_REPLICAS=["replica"]):
+            local = check_shared_cache(None)
+            with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}):
+                shared = check_shared_cache(None)
+        with override_settings(DATABASE_REPLICAS=[]):
+            no_replicas = check_shared_cache(None)
+
+        self.assertEqual([warning.id for warning in local], ["airport_api.W001"])
+        self.assertEqual(shared, [])
+        self.assertEqual(no_replicas, [])
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.name = default_storage.save("ticket.txt", ContentFile(b"0123456789"))
+        self.url = f"{settings.MEDIA_URL}{self.name}"
+
+    def test_media_is_served_with_immutable_cache_headers(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+        self.assertEqual(response["ETag"], f'"{self.name[6:-4]}"')
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+    def test_media_not_modified_status_304(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, headers={"if-none-match": etag})
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_media_range_status_206(self):
+        for byte_range, content, content_range in (
+            ("bytes=2-5", b"2345", "bytes 2-5/10"),
+            ("bytes=7-", b"789", "bytes 7-9/10"),
+            ("bytes=-3", b"789", "bytes 7-9/10"),
+        ):
+            response = self.client.get(self.url, headers={"range": byte_range})
+
+            self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+            self.assertEqual(b"".join(response.streaming_content), content)
+            self.assertEqual(response["Content-Range"], content_range)
+            self.assertEqual(response["Content-Length"], str(len(content)))
+
+    def test_media_range_not_satisfiable_status_416(self):
+        response = self.client.get(self.url, headers={"range": "bytes=10-"})
+
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response["Content-Range"], "bytes */10")
+
+    @override_settings(MEDIA_SENDFILE_HEADER="X-Accel-Redirect")
+    def test_media_is_handed_to_front_server(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-uploads/{self.name}")
+        self.assertEqual(response.content, b"")
+
+    def test_media_outside_media_root_status_404(self):
+        response = self.client.get(f"{settings.MEDIA_URL}../manage.py")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FastLoadTests(TestCase):
+    def test_fast_load_matches_saves_one_by_one_and_is_idempotent(self):
+        for _ in range(2):
+            call_command("fast_load", os.path.join(settings.BASE_DIR, "airport_fixture_db.json"), stdout=StringIO())
+
+        self.assertEqual(Ticket.objects.count(), 62)
+        self.assertEqual(Flight.objects.get(id=1).crew.count(), 5)
+        self.assertEqual(Order.objects.get(id=1).created_at, make_aware(datetime(2025, 6, 1, 10, 0)))
+        self.assertEqual(Order.objects.get(id=1).tickets_count, 2)
+        # the derived data the signals keep up to date is rebuilt
+        call_command("reconcile_inventory", "--check", stdout=StringIO())
+        summaries = list(Order.objects.order_by("id").values_list(*Order.SUMMARY_FIELDS))
+        for order_id in Order.objects.values_list("id", flat=True):
+            Order.refresh_summary(order_id)
+        self.assertEqual(list(Order.objects.order_by("id").values_list(*Order.SUMMARY_FIELDS)), summaries)
+        self.assertEqual(Order.objects.create(user_id=1).id, Order.objects.count())
+
+
+class GenerateDatasetTests(TestCase):
+    OPTIONS = {
+        "airports": 20, "routes_per_airport": 3, "airplanes": 5, "crew": 40, "users": 30,
+        "days": 3, "flights_per_day": 4, "tickets": 600, "batch_size": 100, "stdout": StringIO(),
+    }
+
+    def test_generate_dataset_is_deterministic_and_consistent(self):
+        call_command("generate_dataset", **self.OPTIONS)
+        tickets = list(Ticket.objects.order_by("id").values_list("flight_id", "row", "letter", "price"))
+
+        self.assertEqual(Flight.objects.count(), 12)
+        self.assertEqual(FlightInventory.objects.count(), 12)
+        self.assertGreater(len(tickets), 400)
+        call_command("reconcile_inventory", "--check", stdout=StringIO())
+        summaries = list(Order.objects.order_by("id").values_list(*Order.SUMMARY_FIELDS))
+        for order_id in Order.objects.values_list("id", flat=True):
+            Order.refresh_summary(order_id)
+        self.assertEqual(list(Order.objects.order_by("id").values_list(*Order.SUMMARY_FIELDS)), summaries)
+        # priced like the orders of the API
+        for ticket in Ticket.objects.select_related("flight", "meal_option", "discount_coupon", "order")[:100]:
+            priced = Ticket(
+                flight=ticket.flight, meal_option=ticket.meal_option, is_child=ticket.is_child,
+                has_luggage=ticket.has_luggage, luggage_weight=ticket.luggage_weight,
+            )
+            OrderSerializer.price_ticket(
+                priced, ticket.extra_entertainment_and_comfort.all(), ticket.snacks_and_drinks.all(),
+                ticket.discount_coupon, ticket.order.created_at,
+            )
+            self.assertEqual(
+                (ticket.price, ticket.fare_price, ticket.discount, ticket.is_business),
+                (priced.price, priced.fare_price, priced.discount, False),
+            )
+
+        # the same seed again gives the same rows after the existing ones
+        call_command("generate_dataset", **self.OPTIONS)
+        again = (
+            Ticket.objects.filter(flight_id__gt=12).order_by("id").values_list("flight_id", "row", "letter", "price")
+        )
+        self.assertEqual([(flight_id - 12, *seat) for flight_id, *seat in again], tickets)
+
+
+class BenchmarkEndpointsTests(TestCase):
+    def test_benchmark_saves_a_baseline_and_fails_on_more_queries(self):
+        call_command("generate_dataset", **GenerateDatasetTests.OPTIONS)
+        baseline = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), "baseline.json")
+        options = {"iterations": 3, "warmup": 1, "stdout": StringIO()}
+        orders = Order.objects.count()
+
+        call_command("benchmark_endpoints", save=baseline, **options)
+        with open(baseline) as file:
+            results = json.load(file)["endpoints"]
+        self.assertEqual(
+            set(results),
+            {
+                "flight-list", "flight-list-filtered", "flight-detail", "route-list", "order-list",
+                "order-retrieve", "order-create-1", "order-create-5", "order-create-20",
+            },
+        )
+        self.assertGreater(results["order-create-1"]["queries"], 0)
+        self.assertGreater(results["order-list"]["rows"], 0)
+        # the created orders are rolled back
+        self.assertEqual(Order.objects.count(), orders)
+        # the same code passes, whatever the latency of 3 iterations on a busy machine
+        call_command(
+            "benchmark_endpoints", compare=baseline, only=["order-create-5"], latency_slack_ms=60_000, **options
+        )
+
+        results["flight-detail"]["queries"] -= 1
+        with open(baseline, "w") as file:
+            json.dump({"endpoints": results}, file)
+        with self.assertRaisesMessage(CommandError, "flight-detail queries"):
+            call_command("benchmark_endpoints", compare=baseline, only=["flight-detail"], **options)
+
+
+class ServerTimingTests(BaseCase):
+    def setUp(self):
+        super().setUp()
+        # the connection of the test case was opened before the middleware was loaded
+        install_query_timer(connection)
+
+    def test_request_has_server_timing_header_and_log_line(self):
+        url = reverse("airport:flight-list")
+
+        with self.assertLogs("airport_api.server_timing", "INFO") as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {"source": "Odessa"})
+
+        metrics = dict(metric.split(";", 1) for metric in response["Server-Timing"].split(", "))
+        self.assertEqual(set(metrics), {"db", "serialize", "view", "total"})
+        self.assertIn(f'desc="{len(queries)} queries"', metrics["db"])
+        log = json.loads(logs.records[0].getMessage())
+        self.assertEqual(
+            {key: log[key] for key in ("path", "status", "viewset", "view", "action", "query_params", "queries")},
+            {
+                "path": url, "status": 200, "viewset": "FlightViewSet", "view": "flight", "action": "list",
+                "query_params": {"source": "Odessa"}, "queries": len(queries),
+            },
+        )
+        self.assertGreater(log["serialize_ms"], 0)
+        self.assertGreaterEqual(log["total_ms"], log["view_ms"])
+        self.assertGreaterEqual(log["view_ms"], log["db_ms"])
+
+    def test_async_view_queries_are_timed(self):
+        with self.assertLogs("airport_api.server_timing", "INFO") as logs:
+            response = async_to_sync(self.async_client.get)(
+                reverse("airport:async-flight-detail", args=[self.flight.id]),
+                headers={"Authorization": "Bearer " + self.access_token},
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertGreater(json.loads(logs.records[0].getMessage())["queries"], 0)
+
+
+def metric_values() -> dict:
+    return {
+        sample: float(value)
+        for sample, value in (line.rsplit(" ", 1) for line in REGISTRY.render().splitlines() if line[0] != "#")
+    }
+
+
+class MetricsTests(BaseCase):
+    def setUp(self):
+        super().setUp()
+        self.metrics_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(METRICS_DIR=self.metrics_dir, METRICS_TOKEN=""))
+        self.before = metric_values()
+
+    def increase(self, sample):
+        return metric_values().get(sample, 0) - self.before.get(sample, 0)
+
+    def test_metrics_has_request_histograms_by_basename_and_action(self):
+        self.client.get(reverse("airport:flight-list"))
+        self.client.get(reverse("airport:flight-detail", args=[self.flight.id]))
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertIn("# TYPE airport_http_request_duration_seconds histogram", response.content.decode())
+        series = '{view="flight",action="list"}'
+        self.assertEqual(self.increase(f"airport_http_request_duration_seconds_count{series}"), 1)
+        self.assertEqual(self.increase(
+            'airport_http_request_duration_seconds_bucket{view="flight",action="retrieve",le="+Inf"}'
+        ), 1)
+        self.assertEqual(self.increase('airport_http_requests_total{view="flight",action="list",status="200"}'), 1)
+        self.assertGreater(self.increase(f"airport_http_request_db_queries_sum{series}"), 0)
+        self.assertGreater(self.increase(f"airport_http_response_size_bytes_sum{series}"), 0)
+
+    def test_metrics_sums_the_files_of_other_processes(self):
+        self.client.get(reverse("airport:flight-list"))
+        sample = '{view="flight",action="list",status="200"}'
+        with open(os.path.join(self.metrics_dir, "other-host-1.json"), "w") as file:
+            json.dump(
+                [["airport_http_requests_total", "", [["view", "flight"], ["action", "list"], ["status", "200"]], 5]],
+                file,
+            )
+
+        self.assertEqual(self.increase(f"airport_http_requests_total{sample}"), 6)
+
+    def test_metrics_counts_booking_conflicts_and_cache_hits(self):
+        taken_seat = {
+            "row": self.ticket_economy.row,
+            "letter": self.ticket_economy.letter,
+            "flight": self.flight.id,
+            "meal_option": self.meal_option.id,
+        }
+        response = self.client.post(reverse("airport:order-list"), {"tickets": [taken_seat]}, format="json")
+        self.client.get(reverse("airport:mealoption-list"))
+        self.client.get(reverse("airport:mealoption-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.increase('airport_booking_conflicts_total{reason="seat_taken"}'), 1)
+        self.assertEqual(self.increase('airport_cache_requests_total{cache="catalog",result="miss"}'), 1)
+        self.assertEqual(self.increase('airport_cache_requests_total{cache="catalog",result="hit"}'), 1)
+
+    def test_metrics_requires_the_token_when_set(self):
+        self.enterContext(override_settings(METRICS_TOKEN="scraper-token"))
+
+        # the scraper has no user, the token is its own
+        scraper = APIClient()
+        self.assertEqual(scraper.get(reverse("metrics")).status_code, status.HTTP_403_FORBIDDEN)
+        response = scraper.get(reverse("metrics"), headers={"Authorization": "Bearer scraper-token"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
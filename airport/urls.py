@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework import routers
 
+from airport import async_views
 from airport.views import (
     MealOptionViewSet,
     SnacksAndDrinksViewSet,
@@ -31,4 +32,9 @@ router.register("flight", FlightViewSet)
 router.register("order", OrderViewSet)
 router.register("discount_coupons", DiscountCouponViewSet)
 
-urlpatterns=[path("", include(router.urls))]
\ No newline at end of file
+urlpatterns=[
+    path("", include(router.urls)),
+    path("async/flight/", async_views.flight_list, name="async-flight-list"),
+    path("async/flight/<int:pk>/", async_views.flight_detail, name="async-flight-detail"),
+    path("async/route/", async_views.route_list, name="async-route-list"),
+]
\ No newline at end of file
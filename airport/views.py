@@ -1,5 +1,9 @@
-from django.db.models import Count, F, Q
-from django.db.models.functions import Length
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema
 from rest_framework import mixins, viewsets, status
@@ -8,6 +12,9 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from airport.caching import CatalogCacheMixin, not_modified, set_etag
+from airport.idempotency import idempotent
+from airport.jobs import enqueue
 from airport.models import (
     MealOption,
     SnacksAndDrinks,
@@ -19,8 +26,10 @@ from airport.models import (
     Route,
     Flight,
     Order,
-    DiscountCoupon
+    DiscountCoupon,
+    SeatHold
 )
+from airport.pagination import FlightCursorPagination
 from airport.permissions import IsAdminOrIsAuthenticatedReadOnly
 from airport.schema.airplane_type_schema import airplane_type_schema
 from airport.schema.airplane_schema import airplane_schema
@@ -47,6 +56,10 @@ from airport.serializers import (
     RouteListSerializer,
     FlightListSerializer,
     FlightRetrieveSerializer,
+    FlightSeatMapSerializer,
+    SeatHoldSerializer,
+    SeatReleaseSerializer,
+    SeatConflict,
     OrderListSerializer,
     OrderRetrieveSerializer,
     DiscountCouponSerializer,
@@ -56,6 +69,7 @@ from airport.serializers import (
     ExtraEntertainmentAndComfortImageSerializer,
     AirplaneImageSerializer,
 )
+from airport_api.metrics import BOOKING_CONFLICTS
 
 
 class UploadImageMixin:
@@ -84,13 +98,18 @@ class UploadImageMixin:
         obj = self.get_object()
         serializer = self.get_serializer(obj, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                # the resized copies of the previous image are dropped until the job has made the new ones
+                obj = serializer.save(image_variants={})
+                if obj.image:
+                    enqueue("make_image_variants", model=obj._meta.label_lower, pk=obj.pk, image=obj.image.name)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @meal_option_schema
 class MealOptionViewSet(
+    CatalogCacheMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -99,6 +118,7 @@ class MealOptionViewSet(
     queryset = MealOption.objects.all().order_by("id")
     serializer_class = MealOptionSerializer
     permission_classes = [IsAdminOrIsAuthenticatedReadOnly]
+    cache_query_params = ("name", "price", "meal_type")
 
     def get_queryset(self):
         price = self.request.query_params.get("price")
@@ -123,6 +143,7 @@ class MealOptionViewSet(
 
 @snacks_and_drinks_schema
 class SnacksAndDrinksViewSet(
+    CatalogCacheMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -131,6 +152,7 @@ class SnacksAndDrinksViewSet(
     queryset = SnacksAndDrinks.objects.all().order_by("id")
     serializer_class = SnacksAndDrinksSerializer
     permission_classes = [IsAdminOrIsAuthenticatedReadOnly]
+    cache_query_params = ("name",)
 
     def get_queryset(self):
         name = self.request.query_params.get("name")
@@ -149,6 +171,7 @@ class SnacksAndDrinksViewSet(
 
 @extra_entertainment_and_comfort_schema
 class ExtraEntertainmentAndComfortViewSet(
+    CatalogCacheMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     GenericViewSet,
@@ -157,6 +180,7 @@ class ExtraEntertainmentAndComfortViewSet(
     queryset = ExtraEntertainmentAndComfort.objects.all().order_by("id")
     serializer_class = ExtraEntertainmentAndComfortSerializer
     permission_classes = [IsAdminOrIsAuthenticatedReadOnly]
+    cache_query_params = ("name",)
 
     def get_queryset(self):
         name = self.request.query_params.get("name")
@@ -175,6 +199,7 @@ class ExtraEntertainmentAndComfortViewSet(
 
 @airport_schema
 class AirportViewSet(
+    CatalogCacheMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     GenericViewSet
@@ -182,6 +207,7 @@ class AirportViewSet(
     queryset = Airport.objects.all().order_by("id")
     serializer_class = AirportSerializer
     permission_classes = [IsAdminOrIsAuthenticatedReadOnly]
+    cache_query_params = ("closest_big_city", "name")
 
     def get_queryset(self):
         closest_big_city = self.request.query_params.get("closest_big_city")
@@ -230,6 +256,7 @@ class CrewViewSet(
 
 @airplane_type_schema
 class AirplaneTypeViewSet(
+    CatalogCacheMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     GenericViewSet
@@ -272,12 +299,15 @@ class RouteViewSet(
         return RouteSerializer
 
     def get_queryset(self):
-        source = self.request.query_params.get("source")
-        destination = self.request.query_params.get("destination")
-        source_airport = self.request.query_params.get("source_airport")
-        destination_airport = self.request.query_params.get("destination_airport")
+        return self.filter_routes(self.queryset, self.request.query_params)
+
+    @staticmethod
+    def filter_routes(queryset, query_params):
+        source = query_params.get("source")
+        destination = query_params.get("destination")
+        source_airport = query_params.get("source_airport")
+        destination_airport = query_params.get("destination_airport")
 
-        queryset = self.queryset
         if source:
             queryset = queryset.filter(source__closest_big_city__icontains=source)
         elif destination:
@@ -302,23 +332,40 @@ class FlightViewSet(viewsets.ModelViewSet):
 
     serializer_class = FlightSerializer
     permission_classes = [IsAdminOrIsAuthenticatedReadOnly]
+    pagination_class = FlightCursorPagination
 
     def get_serializer_class(self):
         if self.action == "list":
             return FlightListSerializer
         elif self.action == "retrieve":
             return FlightRetrieveSerializer
+        elif self.action == "seat_map":
+            return FlightSeatMapSerializer
+        elif self.action == "hold":
+            return SeatHoldSerializer
+        elif self.action == "release":
+            return SeatReleaseSerializer
         return FlightSerializer
 
     def get_queryset(self):
-        destination = self.request.query_params.get("destination")
-        source = self.request.query_params.get("source")
-        airplane = self.request.query_params.get("airplane")
-        date_from = self.request.query_params.get("departure_time_from")
-        date_to = self.request.query_params.get("departure_time_to")
-        arrival_time = self.request.query_params.get("arrival_time")
+        if self.action in ("seat_map", "hold", "release"):
+            return Flight.objects.select_related("airplane", "inventory")
+
+        queryset = self.filter_flights(self.queryset, self.request.query_params)
+        if self.action == "list":
+            return queryset.select_related("inventory").order_by("departure_time", "id")
+
+        return queryset.prefetch_related("crew").distinct().order_by("id")
+
+    @staticmethod
+    def filter_flights(queryset, query_params):
+        destination = query_params.get("destination")
+        source = query_params.get("source")
+        airplane = query_params.get("airplane")
+        date_from = query_params.get("departure_time_from")
+        date_to = query_params.get("departure_time_to")
+        arrival_time = query_params.get("arrival_time")
 
-        queryset = self.queryset
         if destination:
             queryset = queryset.filter(route__destination__closest_big_city__icontains=destination)
         if source:
@@ -331,16 +378,81 @@ class FlightViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(departure_time__lte=date_to)
         if arrival_time:
             queryset = queryset.filter(arrival_time__gte=arrival_time)
+        return queryset
 
-        if self.action == "list":
-            return queryset.prefetch_related("tickets").distinct().annotate(
-                row_length=Length("airplane__letters_in_row"),
-                places_available=(F("airplane__rows") * F("row_length")) - Count("tickets"),
-                taken_business=Count("tickets", filter=Q(tickets__is_business=True), distinct=True),
-                economy_taken=Count("tickets", filter=Q(tickets__is_business=False), distinct=True)
-            ).order_by("id")
-
-        return queryset.prefetch_related("crew__flights").distinct().order_by("id")
+    def retrieve(self, request, *args, **kwargs):
+        # polling clients revalidate with one indexed lookup of the inventory version
+        try:
+            version = self.version_query(kwargs[self.lookup_field], request.query_params).first()
+        except (TypeError, ValueError, ValidationError):
+            version = None
+        if version is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = self.get_etag(kwargs[self.lookup_field], version, request.accepted_renderer.format)
+        if not_modified(request, etag):
+            return set_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+        return set_etag(super().retrieve(request, *args, **kwargs), etag)
+
+    @staticmethod
+    def version_query(pk, query_params):
+        # through the filters of the request, a flight they exclude (or a missing one) has no version
+        return (
+            FlightViewSet.filter_flights(Flight.objects.all(), query_params)
+            .filter(pk=pk)
+            .values_list("inventory__version", flat=True)
+        )
+
+    @staticmethod
+    def get_etag(pk, version, renderer_format) -> str:
+        return f'"flight-{pk}-{version}-{renderer_format}"'
+
+    @action(methods=["GET"], detail=True, url_path="seat_map")
+    def seat_map(self, request, pk=None):
+        encoding = request.query_params.get("encoding", "rle")
+        if encoding not in ("rle", "packed"):
+            return Response(
+                {"encoding": "Must be one of: rle, packed"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        flight = self.get_object()
+        serializer = self.get_serializer(
+            flight,
+            context={**self.get_serializer_context(), "encoding": encoding}
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def get_seats(self, flight):
+        serializer = self.get_serializer(
+            data=self.request.data,
+            context={**self.get_serializer_context(), "flight": flight}
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data.get("seats")
+
+    @action(methods=["POST"], detail=True, permission_classes=[IsAuthenticated])
+    def hold(self, request, pk=None):
+        flight = self.get_object()
+        seats = self.get_seats(flight)
+        expires_at = timezone.now() + timedelta(seconds=settings.SEAT_HOLD_SECONDS)
+        taken = SeatHold.hold(flight, request.user, seats, expires_at)
+        if taken:
+            BOOKING_CONFLICTS.inc(reason="seat_held")
+            raise SeatConflict(taken)
+        return Response(
+            {"flight": flight.id, "seats": [{"row": row, "letter": letter} for row, letter in seats],
+             "expires_at": expires_at},
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(methods=["POST"], detail=True, permission_classes=[IsAuthenticated])
+    def release(self, request, pk=None):
+        flight = self.get_object()
+        released = SeatHold.release(flight, request.user, self.get_seats(flight))
+        return Response(
+            {"flight": flight.id, "seats": [{"row": row, "letter": letter} for row, letter in released]},
+            status=status.HTTP_200_OK
+        )
 
 
 @order_schema
@@ -350,35 +462,14 @@ class OrderViewSet(
     mixins.RetrieveModelMixin,
     GenericViewSet
 ):
-    queryset = Order.objects.all().annotate(
-        count_of_tickets=Count(
-            "tickets"
-        ), source=F(
-            "tickets__flight__route__source__closest_big_city"
-        ), destination=F(
-            "tickets__flight__route__destination__closest_big_city"
-        )).select_related("user").order_by("id")
+    queryset = Order.objects.all().select_related("user").order_by("id")
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         queryset = self.queryset.filter(user=self.request.user)
 
-        if self.action == "list":
-            return queryset.prefetch_related(
-                "tickets",
-                "tickets__flight",
-                "tickets__flight__route",
-                "tickets__flight__route__source",
-                "tickets__flight__route__destination",
-                "tickets__extra_entertainment_and_comfort",
-                "tickets__snacks_and_drinks",
-                "tickets__meal_option",
-                "tickets__discount_coupon",
-                "tickets__flight__airplane"
-            )
-
-        elif self.action == "retrieve":
+        if self.action == "retrieve":
             return queryset.prefetch_related(
                 "tickets__flight__route__source",
                 "tickets__flight__route__destination",
@@ -386,7 +477,7 @@ class OrderViewSet(
                 "tickets__snacks_and_drinks",
                 "tickets__meal_option",
                 "tickets__discount_coupon",
-                "tickets__flight__airplane"
+                "tickets__flight__airplane__airplane_type"
             )
         return queryset
 
@@ -398,6 +489,10 @@ class OrderViewSet(
         if self.action == "create":
             return OrderSerializer
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -0,0 +1,135 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.checks import Warning
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+PRIMARY = "default"
+# caches that every process keeps for itself, the sticky marks would not reach the other workers
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# reads go to the primary unless a request explicitly allows the replicas,
+# so management commands, the shell and migrations never read stale rows
+_read_from_replicas = ContextVar("read_from_replicas", default=False)
+
+
+@contextmanager
+def read_from_replicas():
+    token = _read_from_replicas.set(True)
+    try:
+        yield
+    finally:
+        _read_from_replicas.reset(token)
+
+
+def check_shared_cache(app_configs, **kwargs):
+    if getattr(settings, "DATABASE_REPLICAS", []) and settings.CACHES["default"]["BACKEND"] in PROCESS_LOCAL_CACHES:
+        return [
+            Warning(
+                "The read replicas are used with a cache local to every process: a user's read served by "
+                "another worker than their write may read stale rows from a replica.",
+                hint="Set CACHE_BACKEND to a cache shared by all the workers, e.g. "
+                     "django.core.cache.backends.redis.RedisCache (see docker-compose.yaml).",
+                id="airport_api.W001",
+            )
+        ]
+    return []
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of ``read_from_replicas()`` blocks to a random alias of
+    ``DATABASE_REPLICAS`` and everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        if replicas and _read_from_replicas.get():
+            return random.choice(replicas)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets the safe-method requests read from the replicas. A user who has just
+    written (any other method) keeps reading from the primary for
+    ``REPLICA_STICKY_SECONDS``, so e.g. an order is found right after it has
+    been created. The mark lives in the default cache, which has to be shared
+    by all the workers and servers (Redis in docker-compose); the
+    ``airport_api.W001`` check warns about a cache local to each process.
+    """
+
+    sticky_key = "db-primary-user:{}"
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        user_id = self.token_user_id(request)
+        if user_id is None and request.user.is_authenticated:
+            user_id = request.user.pk
+
+        if request.method in SAFE_METHODS:
+            if user_id is not None and cache.get(self.sticky_key.format(user_id)):
+                return self.get_response(request)
+            with read_from_replicas():
+                return self.get_response(request)
+
+        response = self.get_response(request)
+        if user_id is not None and response.status_code < 400:
+            cache.set(self.sticky_key.format(user_id), True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        user_id = self.token_user_id(request)
+        if user_id is None:
+            user = await request.auser()
+            user_id = user.pk if user.is_authenticated else None
+
+        if request.method in SAFE_METHODS:
+            if user_id is not None and await cache.aget(self.sticky_key.format(user_id)):
+                return await self.get_response(request)
+            with read_from_replicas():
+                return await self.get_response(request)
+
+        response = await self.get_response(request)
+        if user_id is not None and response.status_code < 400:
+            await cache.aset(self.sticky_key.format(user_id), True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    @staticmethod
+    def token_user_id(request):
+        # DRF authenticates inside the view, so the token is read here without touching the database
+        authentication = JWTAuthentication()
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            return authentication.get_validated_token(raw_token)[jwt_settings.USER_ID_CLAIM]
+        except (AuthenticationFailed, KeyError):
+            return None
@@ -0,0 +1,127 @@
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from airport.storage import ContentAddressedStorage
+
+# a content-addressed name never changes its content
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CACHE_CONTROL = "public, max-age=86400"
+
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileRange:
+    """``length`` bytes of ``file`` from ``start``, for FileResponse"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    # a single range only, a client asking for several gets the whole file
+    match = RANGE.match(header.replace(" ", ""))
+    if match is None or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        length = min(int(end), size)
+        return size - length, size - 1
+    end = min(int(end), size - 1) if end else size - 1
+    return int(start), end
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serves the files of MEDIA_ROOT with ETag/Last-Modified validation and
+    single byte ranges. With MEDIA_SENDFILE_HEADER the front server sends the
+    file itself (nginx: X-Accel-Redirect to an internal location aliasing
+    MEDIA_ROOT, Apache/lighttpd: X-Sendfile), otherwise FileResponse does,
+    with the server's wsgi.file_wrapper when it has one.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        file_stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404("File not found")
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404("File not found")
+
+    if ContentAddressedStorage.is_content_name(path):
+        etag = '"{}"'.format(os.path.splitext(os.path.basename(path))[0])
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = f'"{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}"'
+        cache_control = CACHE_CONTROL
+    last_modified = int(file_stat.st_mtime)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        for header, value in headers.items():
+            not_modified.headers.setdefault(header, value)
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+
+    sendfile_header = settings.MEDIA_SENDFILE_HEADER
+    if sendfile_header:
+        response = HttpResponse(content_type=content_type, headers=headers)
+        if sendfile_header.lower() == "x-accel-redirect":
+            response[sendfile_header] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + path
+        else:
+            response[sendfile_header] = full_path
+        return response
+
+    size = file_stat.st_size
+    byte_range = None
+    if "Range" in request.headers and request.headers.get("If-Range", etag) in (etag, headers["Last-Modified"]):
+        byte_range = parse_range(request.headers["Range"], size)
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, "rb"), content_type=content_type, headers=headers)
+    else:
+        start, end = byte_range
+        if start > end or start >= size:
+            return HttpResponse(
+                status=416, headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+        response = FileResponse(
+            FileRange(open(full_path, "rb"), start, end - start + 1),
+            status=206,
+            content_type=content_type,
+            headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"},
+        )
+        response["Content-Length"] = end - start + 1
+
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,240 @@
+import atexit
+import json
+import math
+import os
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Registry:
+    """
+    The metrics of all the worker processes. Every process counts in memory
+    and writes its samples to ``METRICS_DIR/<host>-<pid>.json`` at most every
+    ``METRICS_FLUSH_SECONDS``; ``render`` sums the files of all the
+    processes (the current one from memory). The files of stopped workers
+    are kept, so the counters never go back. Empty the directory when the
+    server is (re)started.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.pid = os.getpid()
+        self.flushed_at = 0.0
+        # the directory may be shared by containers, whose pids are alike
+        self.host = socket.gethostname()
+        atexit.register(self.flush)
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return self
+
+    @property
+    def directory(self) -> Path:
+        return Path(getattr(settings, "METRICS_DIR", "") or Path(tempfile.gettempdir()) / "airport-api-metrics")
+
+    def add(self, increments):
+        """Adds the values of ``{(name, suffix, labels): value}`` to the samples"""
+        with self.lock:
+            if os.getpid() != self.pid:
+                # a forked worker, the samples belong to the parent
+                self.pid = os.getpid()
+                self.samples = {}
+                self.flushed_at = 0.0
+            for key, value in increments.items():
+                self.samples[key] = self.samples.get(key, 0) + value
+            if time.monotonic() - self.flushed_at >= getattr(settings, "METRICS_FLUSH_SECONDS", 1.0):
+                self._write()
+
+    def flush(self):
+        with self.lock:
+            if os.getpid() == self.pid and self.samples:
+                self._write()
+
+    def _write(self):
+        self.flushed_at = time.monotonic()
+        directory = self.directory
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.host}-{self.pid}.json"
+        temporary = directory / f".{self.host}-{self.pid}.json.tmp"
+        rows = [[name, suffix, list(labels), value] for (name, suffix, labels), value in self.samples.items()]
+        temporary.write_text(json.dumps(rows))
+        # the readers never see a half-written file
+        os.replace(temporary, path)
+
+    def collect(self) -> dict:
+        """The samples of all the processes summed, ``{(name, suffix, labels): value}``"""
+        totals = {}
+        for path in self.directory.glob("*.json"):
+            if path.stem == f"{self.host}-{os.getpid()}":
+                continue
+            try:
+                rows = json.loads(path.read_text())
+            except (OSError, ValueError):
+                # removed or replaced by its worker meanwhile
+                continue
+            for name, suffix, labels, value in rows:
+                key = (name, suffix, tuple(tuple(label) for label in labels))
+                totals[key] = totals.get(key, 0) + value
+        with self.lock:
+            own = dict(self.samples) if os.getpid() == self.pid else {}
+        for key, value in own.items():
+            totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render(self) -> str:
+        """The Prometheus text exposition format"""
+        by_metric = {}
+        for (name, suffix, labels), value in self.collect().items():
+            by_metric.setdefault(name, []).append((suffix, labels, value))
+
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for suffix, labels, value in sorted(by_metric.get(name, []), key=metric.sort_key):
+                lines.append(f"{name}{suffix}{format_labels(labels)} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\""))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = (registry or REGISTRY).register(self)
+
+    def increments(self, amount=1, **labels) -> dict:
+        return {(self.name, "", tuple((name, labels[name]) for name in self.labelnames)): amount}
+
+    def inc(self, amount=1, **labels):
+        self.registry.add(self.increments(amount, **labels))
+
+    @staticmethod
+    def sort_key(sample):
+        return sample[1]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.registry = (registry or REGISTRY).register(self)
+
+    def increments(self, value, **labels) -> dict:
+        labels = tuple((name, labels[name]) for name in self.labelnames)
+        # the buckets are cumulative, the value counts in every bucket from its own; the
+        # smaller ones get 0 so that every series has all the buckets
+        increments = {
+            (self.name, "_bucket", labels + (("le", format_bound(bound)),)): int(value <= bound)
+            for bound in self.buckets
+        }
+        increments[self.name, "_sum", labels] = value
+        increments[self.name, "_count", labels] = 1
+        return increments
+
+    def observe(self, value, **labels):
+        self.registry.add(self.increments(value, **labels))
+
+    @staticmethod
+    def sort_key(sample):
+        suffix, labels, value = sample
+        # the buckets of a series by bound, then its sum and count
+        series = tuple(label for label in labels if label[0] != "le")
+        bound = next((float(label[1]) for label in labels if label[0] == "le"), math.inf)
+        return series, ("_bucket", "_sum", "_count").index(suffix), bound
+
+
+def format_bound(bound) -> str:
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = Histogram(
+    "airport_http_request_duration_seconds",
+    "Time to answer a request, by router basename (or URL name) and action.",
+    ("view", "action"),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter(
+    "airport_http_requests_total",
+    "Answered requests, by router basename (or URL name), action and status code.",
+    ("view", "action", "status"),
+)
+REQUEST_QUERIES = Histogram(
+    "airport_http_request_db_queries",
+    "SQL queries run by a request, by router basename (or URL name) and action.",
+    ("view", "action"),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+RESPONSE_SIZE = Histogram(
+    "airport_http_response_size_bytes",
+    "Size of the response body, by router basename (or URL name) and action.",
+    ("view", "action"),
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+BOOKING_CONFLICTS = Counter(
+    "airport_booking_conflicts_total",
+    "Tickets refused because their (flight, row, letter) seat was already taken.",
+    ("reason",),
+)
+CACHE_REQUESTS = Counter(
+    "airport_cache_requests_total",
+    "Lookups of cached responses by result (hit or miss); the hit ratio is hit / (hit + miss).",
+    ("cache", "result"),
+)
+
+
+def observe_request(view, action, status, seconds, queries, size):
+    labels = {"view": view, "action": action}
+    increments = {
+        **REQUEST_LATENCY.increments(seconds, **labels),
+        **REQUESTS.increments(1, status=str(status), **labels),
+        **REQUEST_QUERIES.increments(queries, **labels),
+    }
+    if size is not None:
+        increments.update(RESPONSE_SIZE.increments(size, **labels))
+    # one lock and flush check for the whole request
+    REGISTRY.add(increments)
+
+
+@require_safe
+def metrics_view(request):
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
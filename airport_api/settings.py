@@ -9,11 +9,6 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
-<<<<<<< HEAD
-
-from pathlib import Path
-
-=======
 import os
 from datetime import timedelta
 from pathlib import Path
@@ -21,7 +16,6 @@ from dotenv import load_dotenv
 
 
 load_dotenv()
->>>>>>> develop
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -30,54 +24,13 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-<<<<<<< HEAD
-SECRET_KEY = 'django-insecure-fptuasn6lxhs)b0rhue)@i6kiu8@wft9+tc4w2&dv%4owt6+&f'
-=======
 SECRET_KEY = os.getenv("SECRET_KEY")
->>>>>>> develop
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
 ALLOWED_HOSTS = []
 
-<<<<<<< HEAD
-
-# Application definition
-
-INSTALLED_APPS = [
-    'django.contrib.admin',
-    'django.contrib.auth',
-    'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
-]
-
-MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
-
-ROOT_URLCONF = 'airport_api.urls'
-
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-=======
 AUTH_USER_MODEL = "user.User"
 # Application definition
 
@@ -97,12 +50,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "airport_api.server_timing.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "airport_api.db_router.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -124,17 +79,11 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
->>>>>>> develop
             ],
         },
     },
 ]
 
-<<<<<<< HEAD
-WSGI_APPLICATION = 'airport_api.wsgi.application'
-
-
-=======
 WSGI_APPLICATION = "airport_api.wsgi.application"
 
 
@@ -147,16 +96,10 @@ REST_FRAMEWORK = {
     ),
 }
 
->>>>>>> develop
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
 DATABASES = {
-<<<<<<< HEAD
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-=======
     "default": {
         "ENGINE": "django.db.backends.postgresql",
         "NAME": os.getenv("POSTGRES_DB"),
@@ -164,7 +107,28 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST", "db"),
         "PORT": os.getenv("POSTGRES_PORT", "5432")
->>>>>>> develop
+    }
+}
+
+# read replicas of the default database, comma separated hosts
+DATABASE_REPLICAS = []
+for number, host in enumerate(filter(None, os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")), start=1):
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{number}")
+
+DATABASE_ROUTERS = ["airport_api.db_router.ReplicaRouter"]
+
+# seconds a user reads from the primary after a write
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "airport-api"),
     }
 }
 
@@ -174,18 +138,6 @@ DATABASES = {
 
 AUTH_PASSWORD_VALIDATORS = [
     {
-<<<<<<< HEAD
-        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
-=======
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
     },
     {
@@ -196,7 +148,6 @@ AUTH_PASSWORD_VALIDATORS = [
     },
     {
         "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
->>>>>>> develop
     },
 ]
 
@@ -204,15 +155,9 @@ AUTH_PASSWORD_VALIDATORS = [
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
-<<<<<<< HEAD
-LANGUAGE_CODE = 'en-us'
-
-TIME_ZONE = 'UTC'
-=======
 LANGUAGE_CODE = "en-us"
 
 TIME_ZONE = "UTC"
->>>>>>> develop
 
 USE_I18N = True
 
@@ -222,26 +167,60 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
-<<<<<<< HEAD
-STATIC_URL = 'static/'
-=======
-MEDIAL_ROOT = BASE_DIR / "uploads"
+MEDIA_ROOT = BASE_DIR / "uploads"
 MEDIA_URL = "/uploads/"
 
+# uploads are stored once per content under ab/cd/<sha256>.<ext>
+STORAGES = {
+    "default": {"BACKEND": "airport.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# "X-Accel-Redirect" (nginx) or "X-Sendfile" (Apache, lighttpd) lets the front server send the media files
+MEDIA_SENDFILE_HEADER = os.getenv("MEDIA_SENDFILE_HEADER", "")
+# internal nginx location aliasing MEDIA_ROOT
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-uploads/")
+
 STATIC_URL = "static/"
->>>>>>> develop
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
-<<<<<<< HEAD
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-=======
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# receipts and other mails of the background jobs (python manage.py run_workers)
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "airport@localhost")
+
+# how long a seat stays held during the checkout (POST /api/airport/flight/{id}/hold/)
+SEAT_HOLD_SECONDS = int(os.getenv("SEAT_HOLD_SECONDS", "300"))
+SEAT_HOLD_MAX_SEATS = int(os.getenv("SEAT_HOLD_MAX_SEATS", "10"))
+
+# how long the answer of an order created with an Idempotency-Key header is replayed to its retries
+IDEMPOTENCY_KEY_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_SECONDS", "86400"))
+
+# one JSON line per request with its timings, from airport_api.server_timing.ServerTimingMiddleware
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "airport_api.server_timing": {
+            "handlers": ["console"],
+            "level": os.getenv("SERVER_TIMING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+# the metrics of every worker process are summed from their files in METRICS_DIR, see airport_api.metrics
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "1"))
+# when set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=9999),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=15),
     "ROTATE_REFRESH_TOKENS": False
 }
->>>>>>> develop
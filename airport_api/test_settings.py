@@ -0,0 +1,37 @@
+"""
+Settings for running the tests on SQLite, without the Postgres of docker-compose:
+
+    python manage.py test --settings=airport_api.test_settings
+
+"replica" is a second SQLite database that is never synchronised with the
+primary, only the replica routing tests turn it on.
+"""
+import os
+import tempfile
+
+from airport_api.settings import *  # noqa: F401,F403
+
+SECRET_KEY = os.getenv("SECRET_KEY") or "airport-api-tests"
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+        # SQLite has no row locks (select_for_update is ignored), a transaction takes the write lock of the
+        # whole database when it starts, so concurrent bookings wait for each other instead of failing
+        "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 20},
+    },
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db_replica.sqlite3",
+    },
+}
+DATABASE_REPLICAS = []
+
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+# the request timings are not logged
+LOGGING["loggers"]["airport_api.server_timing"]["level"] = "WARNING"
+
+# the metrics files of the test runs are kept apart from those of a local server
+METRICS_DIR = os.path.join(tempfile.gettempdir(), "airport-api-test-metrics")
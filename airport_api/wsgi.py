@@ -11,10 +11,6 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
-<<<<<<< HEAD
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'airport_api.settings')
-=======
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "airport_api.settings")
->>>>>>> develop
 
 application = get_wsgi_application()
@@ -22,8 +22,8 @@ class UserSerializer(serializers.ModelSerializer):
         return get_user_model().objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
-        password = self.validated_data.pop("password")
-        user = super().update(instance, **validated_data)
+        password = validated_data.pop("password", None)
+        user = super().update(instance, validated_data)
         if password:
             user.set_password(password)
             user.save()